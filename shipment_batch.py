@@ -0,0 +1,175 @@
+import glob
+import os
+import re
+import sys
+from datetime import datetime
+
+# Export stamp in the file name, e.g. "MB EOD Update_Nov-12-2025-16-16-37.215.csv"
+_EXPORT_STAMP = re.compile(r'_([A-Za-z]{3}-\d{1,2}-\d{4})-(\d{1,2}-\d{1,2}-\d{1,2}(?:\.\d+)?)')
+
+
+def is_update2_file(path):
+    name = os.path.basename(path)
+    return 'EOD Update-2' in name or 'EOD Update_2' in name
+
+
+def find_input_files():
+    # Find all CSV files in the current directory
+    csv_files = glob.glob("*.csv")
+
+    if len(csv_files) == 0:
+        print("[ERROR] No CSV files found in the current directory.")
+        sys.exit(1)
+
+    # Separate main EOD file from EOD Update-2 file
+    eod_update2_file = None
+    main_csv_files = []
+
+    for f in csv_files:
+        if is_update2_file(f):
+            eod_update2_file = f
+        else:
+            main_csv_files.append(f)
+
+    if len(main_csv_files) == 1:
+        csv_file = main_csv_files[0]
+        print(f"[OK] Found main CSV file: {csv_file}")
+    elif len(main_csv_files) > 1:
+        # Multiple CSV files found - use the most recently modified one
+        csv_file = max(main_csv_files, key=os.path.getmtime)
+        print(f"[OK] Multiple CSV files found. Using most recent: {csv_file}")
+        print(f"[INFO] Other files in directory: {', '.join([f for f in main_csv_files if f != csv_file])}")
+    else:
+        print("[ERROR] No main CSV file found.")
+        sys.exit(1)
+
+    if eod_update2_file:
+        print(f"[OK] Found EOD Update-2 file: {eod_update2_file}")
+
+    return csv_file, eod_update2_file
+
+
+def resolve_inputs(csv_file=None, eod_update2_file=None):
+    """(main export, Update-2 export) from explicit paths or find_input_files().
+
+    Without csv_file the newest exports in the current directory are used.
+    With it, eod_update2_file defaults to the newest Update-2 export in the
+    same directory (None if there is none).
+    """
+    if csv_file is None:
+        found_csv, found_update2 = find_input_files()
+        return found_csv, eod_update2_file or found_update2
+
+    for path in (csv_file, eod_update2_file):
+        if path is not None and not os.path.isfile(path):
+            print(f"[ERROR] Input file not found: {path}")
+            sys.exit(1)
+    if eod_update2_file is None:
+        eod_update2_file = latest_exports(os.path.dirname(csv_file) or '.')[1]
+    return csv_file, eod_update2_file
+
+
+def latest_exports(directory):
+    """(newest main export, newest Update-2 export) in directory by mtime; either may be None."""
+    main_files, update2_files = [], []
+    for path in glob.glob(os.path.join(directory, '*.csv')):
+        (update2_files if is_update2_file(path) else main_files).append(path)
+    main_file = max(main_files, key=os.path.getmtime) if main_files else None
+    update2_file = max(update2_files, key=os.path.getmtime) if update2_files else None
+    return main_file, update2_file
+
+
+def export_stamp(path):
+    """(date, time text) from an export's file name, or None if it has no stamp."""
+    match = _EXPORT_STAMP.search(os.path.basename(path))
+    if match is None:
+        return None
+    try:
+        day = datetime.strptime(match.group(1), '%b-%d-%Y').date()
+    except ValueError:
+        return None
+    return day, match.group(2)
+
+
+def find_exports(source):
+    """CSV files in a directory, or matching a glob pattern."""
+    pattern = os.path.join(source, '*.csv') if os.path.isdir(source) else source
+    return sorted(glob.glob(pattern))
+
+
+def pair_exports(paths):
+    """Match each day's main EOD export with its Update-2 partner.
+
+    Files are grouped by the date stamped in their name; when a day has
+    several exports of one kind the latest stamp wins. Returns
+    (pairs, unmatched) where pairs is a date-ordered list of
+    (day, main file, Update-2 file or None) and unmatched lists the files
+    that were skipped (no stamp, superseded, or an Update-2 without a main
+    export).
+    """
+    latest = {}
+    unmatched = []
+    for path in paths:
+        stamp = export_stamp(path)
+        if stamp is None:
+            unmatched.append(path)
+            continue
+        day, time_text = stamp
+        key = (day, is_update2_file(path))
+        time_key = tuple(float(part) for part in time_text.split('-'))
+        if key in latest:
+            previous_time, previous = latest[key]
+            if previous_time >= time_key:
+                unmatched.append(path)
+                continue
+            unmatched.append(previous)
+        latest[key] = (time_key, path)
+
+    pairs = []
+    for (day, update2), (_, path) in sorted(latest.items()):
+        if update2:
+            if (day, False) not in latest:
+                unmatched.append(path)
+            continue
+        partner = latest.get((day, True))
+        pairs.append((day, path, partner[1] if partner else None))
+    return pairs, unmatched
+
+
+def _run_job(render, day, csv_file, eod_update2_file):
+    # Worker side: never raise, so one bad day cannot take the pool down
+    try:
+        return day, render(day, csv_file, eod_update2_file), None
+    except Exception as e:
+        return day, None, f"{type(e).__name__}: {e}"
+
+
+def run_batch(pairs, render, workers=None):
+    """Call render(day, csv_file, eod_update2_file) for each pair in a process pool.
+
+    render must be picklable (a module-level function or a partial of one)
+    and return the written file. Per-day results are printed as they
+    finish; returns a date-ordered list of (day, output file, error).
+    """
+    # Imported here: multiprocessing is a noticeable share of shipment_cli's startup
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    workers = workers or os.cpu_count() or 1
+    results = []
+    with ProcessPoolExecutor(max_workers=min(workers, max(len(pairs), 1))) as pool:
+        futures = {
+            pool.submit(_run_job, render, day, csv_file, eod_update2_file): day
+            for day, csv_file, eod_update2_file in pairs
+        }
+        for future in as_completed(futures):
+            try:
+                day, output_file, error = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed for memory)
+                day, output_file, error = futures[future], None, f"{type(e).__name__}: {e}"
+            if error is None:
+                print(f"[OK] {day}: {output_file}")
+            else:
+                print(f"[FAILED] {day}: {error}")
+            results.append((day, output_file, error))
+    return sorted(results, key=lambda result: result[0])
@@ -0,0 +1,172 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from shipment_synthetic import generate_exports, add_spec_arguments, spec_from_args
+from shipment_profile import StageTimer, peak_rss_mb
+
+DEFAULT_DATA_DIR = '.eod_bench'
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def exports_for(spec, data_dir=DEFAULT_DATA_DIR):
+    """Paths of the synthetic export pair for spec, generated on first use.
+
+    Each spec gets its own directory named after a digest of its
+    parameters, so every size and shape is generated once and reused.
+    """
+    key = hashlib.blake2b(json.dumps(spec.as_dict(), sort_keys=True).encode(), digest_size=8).hexdigest()
+    directory = os.path.join(data_dir, f"{spec.rows}-{key}")
+    if not os.path.isdir(directory):
+        print(f"[INFO] Generating {spec.rows} synthetic rows in {directory}")
+        tmp_dir = f"{directory}.tmp{os.getpid()}"
+        generate_exports(spec, tmp_dir)
+        os.replace(tmp_dir, directory)
+    return tuple(os.path.join(directory, name) for name in spec.file_names())
+
+
+def bench_once(csv_file, eod_update2_file, output_file, projected=False, engine='c', backend='openpyxl',
+               raw_data=True):
+    """Run the Excel dashboard pipeline stage by stage; returns the stage list.
+
+    Runs in a fresh worker process (see run_bench), so peak RSS belongs to
+    this run alone. Stages: parse, filter, pivots, CarMax, then one per
+    sheet and the save (with openpyxl the Raw Data rows are streamed into
+    the file during the save).
+    """
+    from shipment_dashboard_excel import render_excel
+    from shipment_ingest import read_eod, read_carmax
+    from shipment_metrics import prepare_eod, compute_dashboard
+
+    baseline = peak_rss_mb()
+    timer = StageTimer()
+    df = read_eod(csv_file, projected=projected, engine=engine)
+    initial_count = len(df)
+    timer.lap('parse', rows_out=initial_count)
+    df = prepare_eod(df)
+    timer.lap('filter', rows_in=initial_count, rows_out=len(df))
+    metrics = compute_dashboard(df, initial_count)
+    timer.lap('pivots', rows_in=len(df))
+    metrics.carmax_vins_by_date, metrics.carmax_unique_vins_total = read_carmax(eod_update2_file)
+    timer.lap('carmax')
+
+    df_raw = None
+    if raw_data:
+        df_raw = df
+        if projected:
+            # The Raw Data sheet needs every column
+            df_raw = prepare_eod(read_eod(csv_file, engine=engine))
+            timer.lap('parse raw data')
+
+    render_excel(metrics, df_raw, output_file, backend=backend, timer=timer)
+    return {
+        'stages': timer.as_dicts(),
+        'seconds': timer.total(),
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': peak_rss_mb(),
+        'input_bytes': os.path.getsize(csv_file) + os.path.getsize(eod_update2_file),
+        'output_bytes': os.path.getsize(output_file),
+    }
+
+
+def run_bench(spec, data_dir=DEFAULT_DATA_DIR, repeat=1, **options):
+    """bench_once for spec's exports, repeat times; returns the fastest run."""
+    csv_file, eod_update2_file = exports_for(spec, data_dir)
+    output_file = os.path.join(os.path.dirname(csv_file), 'bench_dashboard.xlsx')
+    best = None
+    for _ in range(repeat):
+        # One process per run, so earlier (or larger) runs cannot inflate peak RSS
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            result = pool.submit(bench_once, csv_file, eod_update2_file, output_file, **options).result()
+        if best is None or result['seconds'] < best['seconds']:
+            best = result
+    return best
+
+
+def previous_run(history_file, record):
+    # Last recorded run of the same spec and options, or None
+    if not history_file or not os.path.exists(history_file):
+        return None
+    previous = None
+    with open(history_file) as f:
+        for line in f:
+            entry = json.loads(line)
+            if entry.get('spec') == record['spec'] and entry.get('options') == record['options']:
+                previous = entry
+    return previous
+
+
+def print_result(record, previous=None):
+    before = {stage['stage']: stage['seconds'] for stage in previous['stages']} if previous else {}
+    print(f"\n[BENCH] {record['spec']['rows']} rows, {record['input_bytes'] / 1024 ** 2:.1f} MB in, "
+          f"{record['output_bytes'] / 1024 ** 2:.1f} MB out, peak RSS {_mb(record['peak_rss_mb'])} MB")
+    print(f"   {'Stage':<26} {'Seconds':>9} {'Peak RSS MB':>12} {'Previous':>9}")
+    for stage in record['stages'] + [{'stage': 'total', 'seconds': record['seconds'], 'peak_rss_mb': None}]:
+        name = stage['stage']
+        previous_seconds = previous['seconds'] if name == 'total' and previous else before.get(name)
+        print(f"   {name:<26} {stage['seconds']:>9.3f} {_mb(stage['peak_rss_mb']):>12} "
+              f"{'-' if previous_seconds is None else f'{previous_seconds:.3f}':>9}")
+
+
+def _mb(value):
+    return '-' if value is None else f"{value:.0f}"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Time each stage of the Excel dashboard on seeded synthetic exports.")
+    parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help="main export sizes to benchmark (default: 10000 100000 1000000)")
+    add_spec_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=1, help="runs per size; the fastest is kept (default: 1)")
+    parser.add_argument('--projected', action='store_true', help="parse only the dashboard columns")
+    parser.add_argument('--engine', choices=('c', 'pyarrow'), default='c', help="CSV parser (default: c)")
+    parser.add_argument('--backend', choices=('openpyxl', 'xlsxwriter'), default='openpyxl',
+                        help="Excel workbook writer (default: openpyxl)")
+    parser.add_argument('--no-raw-data', action='store_true', help="leave out the Raw Data sheet")
+    parser.add_argument('--data-dir', default=DEFAULT_DATA_DIR,
+                        help=f"where generated exports are kept between runs (default: {DEFAULT_DATA_DIR})")
+    parser.add_argument('--history', metavar='FILE',
+                        help="append each result to this JSON-lines file and compare with the last matching run")
+    parser.add_argument('--clean', action='store_true', help="delete the generated exports afterwards")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    options = dict(projected=args.projected, engine=args.engine, backend=args.backend,
+                   raw_data=not args.no_raw_data)
+
+    for rows in args.rows:
+        spec = spec_from_args(args, rows)
+        try:
+            result = run_bench(spec, args.data_dir, args.repeat, **options)
+        except Exception as e:
+            print(f"[FAILED] {rows} rows: {type(e).__name__}: {e}")
+            sys.exit(1)
+
+        record = dict(
+            timestamp=datetime.now().isoformat(timespec='seconds'),
+            spec=spec.as_dict(),
+            options=options,
+            python=sys.version.split()[0],
+            **result,
+        )
+        print_result(record, previous_run(args.history, record))
+        if args.history:
+            with open(args.history, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+    if args.history:
+        print(f"\n[OK] Results appended to {args.history}")
+    if args.clean:
+        shutil.rmtree(args.data_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
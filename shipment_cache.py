@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+
+# Bump whenever parsing or the prepare_eod row rules change, so stale
+# cache entries are never read back
+PARSER_VERSION = 1
+
+DEFAULT_CACHE_DIR = '.eod_cache'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+_METADATA_KEY = b'eod_cache'
+
+
+def file_digest(path, block_size=1024 * 1024):
+    """BLAKE2b hex digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def open_cache(args):
+    """ParsedFileCache for the --cache/--cache-dir/--cache-max-mb options, or None."""
+    if not args.cache:
+        return None
+    try:
+        return ParsedFileCache(args.cache_dir, args.cache_max_mb * 1024 ** 2)
+    except ImportError:
+        print("[INFO] pyarrow is not installed; parsed-file cache disabled")
+        return None
+
+
+class ParsedFileCache:
+    """Content-addressed cache of prepared EOD frames stored as Arrow IPC files.
+
+    Entries are keyed by the CSV's content hash, PARSER_VERSION and the ingest
+    variant, and are read back memory-mapped. The least recently used entries
+    are evicted once the directory grows past max_bytes. Requires pyarrow.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        import pyarrow  # noqa: F401 - fail early when the optional dependency is missing
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path_for(self, csv_file, variant):
+        name = f"{file_digest(csv_file)}-v{PARSER_VERSION}-{variant}.arrow"
+        return os.path.join(self.cache_dir, name)
+
+    def load(self, path):
+        """Return (df, initial_count) for a cached entry, or None on a miss.
+
+        An entry that cannot be read back (truncated, corrupt or without
+        its metadata) is deleted and counts as a miss, so it gets rebuilt.
+        """
+        import pyarrow.feather as feather
+
+        if not os.path.exists(path):
+            return None
+
+        try:
+            table = feather.read_table(path, memory_map=True)
+            metadata = table.schema.metadata or {}
+            if _METADATA_KEY not in metadata:
+                raise ValueError("no cache metadata")
+            info = json.loads(metadata[_METADATA_KEY])
+            df, initial_count = table.to_pandas(), info['initial_count']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNING] Discarding unreadable cache entry {path}: {e}")
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            return None
+
+        # Touch the entry so eviction sees it as recently used
+        os.utime(path)
+        return df, initial_count
+
+    def store(self, path, df, initial_count):
+        import pyarrow as pa
+        import pyarrow.feather as feather
+
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_METADATA_KEY] = json.dumps({'initial_count': initial_count}).encode()
+        table = table.replace_schema_metadata(metadata)
+
+        # Uncompressed so later reads can map the file instead of decoding it
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.arrow'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                # Evicted by another process (e.g. a --batch worker)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
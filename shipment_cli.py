@@ -0,0 +1,46 @@
+import argparse
+import importlib
+
+from shipment_batch import resolve_inputs
+from shipment_options import (add_excel_arguments, add_pdf_arguments, add_html_arguments, add_render_arguments,
+                              add_trend_arguments)
+
+# Subcommand -> (module, help, argument builder). A module is imported only
+# once its subcommand has parsed its arguments and found its input files,
+# so --help, usage errors and a missing CSV never load pandas, openpyxl,
+# matplotlib or pyarrow, and `excel` never loads matplotlib.
+COMMANDS = {
+    'excel': ('shipment_dashboard_excel', "Excel workbook dashboard", add_excel_arguments),
+    'pdf': ('shipment_dashboard_pdf', "PDF dashboard", add_pdf_arguments),
+    'html': ('shipment_dashboard', "interactive HTML dashboard", add_html_arguments),
+    'all': ('shipment_render', "load once and render Excel, PDF and HTML in parallel", add_render_arguments),
+    'trend': ('shipment_warehouse', "trend report from the daily aggregates recorded with --warehouse",
+              add_trend_arguments),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate shipment dashboards from the EOD CSV exports.",
+        epilog="Run 'shipment_cli.py COMMAND --help' for the options of a command.")
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND', required=True)
+    for name, (_, help_text, add_arguments) in COMMANDS.items():
+        add_arguments(commands.add_parser(name, help=help_text, description=f"Generate the {help_text}."))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # --batch and --watch find their own exports; trend reads the warehouse only
+    if hasattr(args, 'input') and not getattr(args, 'batch', None) and not getattr(args, 'watch', None):
+        args.input, update2 = resolve_inputs(args.input, getattr(args, 'update2', None))
+        if hasattr(args, 'update2'):
+            args.update2 = update2
+
+    module_name = COMMANDS[args.command][0]
+    importlib.import_module(module_name).run(args)
+
+
+if __name__ == '__main__':
+    main()
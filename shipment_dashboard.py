@@ -1,79 +1,40 @@
-import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from datetime import datetime
+import argparse
+import base64
+import glob
+import gzip
+import html
+import importlib.util
+import json
+import os
+import re
+import shutil
 import sys
+import urllib.parse
 
-# Read the CSV file
-csv_file = "MB EOD Update_Nov-12-2025-16-16-37.215.csv"
-
-try:
-    df = pd.read_csv(csv_file)
-    print(f"[OK] Loaded {len(df)} records from {csv_file}")
-except Exception as e:
-    print(f"Error reading file: {e}")
-    sys.exit(1)
-
-# Convert Created Date to datetime
-df['Created Date'] = pd.to_datetime(df['Created Date'])
-
-# Rule: Remove orders with tag "CSRM, Quote"
-initial_count = len(df)
-df = df[~df['Tags'].str.contains('Quote', case=False, na=False)]
-filtered_count = len(df)
-print(f"[OK] Filtered out {initial_count - filtered_count} records with 'Quote' tag")
-print(f"[OK] Working with {filtered_count} records")
-
-# Get today's date (from the data)
-today = df['Created Date'].max().date()
-print(f"[OK] Latest date in data: {today}")
-
-# Filter for today's shipments
-df_today = df[df['Created Date'].dt.date == today]
-total_today = len(df_today)
-
-# Calculate total shipments (all dates)
-total_all = len(df)
-
-# Calculate increase
-increase = total_today
-increase_pct = (increase / total_all * 100) if total_all > 0 else 0
-
-# Most shipped vehicle
-most_shipped_vehicle = df['Vehicle Info'].value_counts().head(1)
-most_shipped_vehicle_name = most_shipped_vehicle.index[0] if len(most_shipped_vehicle) > 0 else "N/A"
-most_shipped_vehicle_count = most_shipped_vehicle.values[0] if len(most_shipped_vehicle) > 0 else 0
-
-# Weighted average distance
-df['Distance'] = pd.to_numeric(df['Distance'], errors='coerce')
-weighted_avg_distance = df['Distance'].mean()
-
-# Create pivot table: Rows = Customer Business Name, Columns = Tags, Values = Count of VIN #
-pivot_table = pd.pivot_table(
-    df,
-    values='VIN #',
-    index='Customer Business Name',
-    columns='Tags',
-    aggfunc='count',
-    fill_value=0
-)
-
-# Sort by total shipments per customer
-pivot_table['Total'] = pivot_table.sum(axis=1)
-pivot_table = pivot_table.sort_values('Total', ascending=False)
-
-print(f"\n[OK] Pivot table created with {len(pivot_table)} customers and {len(pivot_table.columns)-1} tag types")
-
-# Create HTML Dashboard
-html_content = f"""
-<!DOCTYPE html>
+import numpy as np
+
+from shipment_metrics import compute_dashboard, print_key_metrics
+from shipment_ingest import load_eod
+from shipment_cache import open_cache
+from shipment_batch import resolve_inputs
+from shipment_options import add_html_arguments
+
+PLOTLY_CDN = "https://cdn.plot.ly/plotly-latest.min.js"
+
+# Pivot table rows per JSON chunk; the browser draws the first page once
+# the first chunk is decoded
+CHUNK_ROWS = 5_000
+
+# {plotly_js}, {table_chunks} and {table_script} are streamed into the file
+# (see render_html); every other field is a short value filled in with
+# str.format
+PAGE_TEMPLATE = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
     <title>Shipment Dashboard - {today}</title>
-    <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-    <style>
+{plotly_js}    <style>
         * {{
             margin: 0;
             padding: 0;
@@ -230,6 +191,8 @@ html_content = f"""
             position: sticky;
             top: 0;
             z-index: 10;
+            cursor: pointer;
+            user-select: none;
         }}
         
         td {{
@@ -246,6 +209,29 @@ html_content = f"""
             background-color: #e9ecef;
         }}
         
+        .table-controls {{
+            display: flex;
+            align-items: center;
+            gap: 10px;
+            margin-bottom: 15px;
+            color: #666;
+        }}
+        
+        .table-controls input {{
+            flex: 1;
+            max-width: 320px;
+        }}
+        
+        .table-controls input,
+        .table-controls select,
+        .table-controls button {{
+            padding: 8px 12px;
+            border: 1px solid #ced4da;
+            border-radius: 6px;
+            background: white;
+            font: inherit;
+        }}
+        
         .chart-container {{
             padding: 30px 40px;
         }}
@@ -262,7 +248,7 @@ html_content = f"""
     <div class="container">
         <div class="header">
             <h1>Shipment Dashboard</h1>
-            <div class="date">Report Date: {today.strftime('%B %d, %Y')}</div>
+            <div class="date">Report Date: {report_date}</div>
         </div>
         
         <div class="metrics">
@@ -293,32 +279,25 @@ html_content = f"""
         
         <div class="table-container">
             <div class="table-title">Shipments by Customer and Tag Type</div>
-            <table>
+            <div class="table-controls">
+                <input type="search" id="customerFilter" placeholder="Filter customers">
+                <select id="pageSize">
+                    <option>25</option>
+                    <option selected>50</option>
+                    <option>100</option>
+                    <option>500</option>
+                </select>
+                <button type="button" id="previousPage">&lsaquo; Previous</button>
+                <button type="button" id="nextPage">Next &rsaquo;</button>
+                <span id="pageInfo">Loading customers...</span>
+            </div>
+            <table id="pivotTable">
                 <thead>
                     <tr>
-                        <th>Customer Business Name</th>
-"""
-
-# Add column headers for each tag
-for col in pivot_table.columns:
-    html_content += f"                        <th>{col}</th>\n"
-
-html_content += """                    </tr>
+                        <th data-column="0">Customer Business Name</th>
+{tag_headers}                    </tr>
                 </thead>
-                <tbody>
-"""
-
-# Add table rows
-for customer, row in pivot_table.iterrows():
-    html_content += f"                    <tr>\n"
-    html_content += f"                        <td><strong>{customer}</strong></td>\n"
-    for col in pivot_table.columns:
-        value = row[col]
-        cell_class = 'total-column' if col == 'Total' else ''
-        html_content += f"                        <td class='{cell_class}'>{int(value) if value > 0 else ''}</td>\n"
-    html_content += f"                    </tr>\n"
-
-html_content += """                </tbody>
+                <tbody></tbody>
             </table>
         </div>
         
@@ -333,26 +312,14 @@ html_content += """                </tbody>
         </div>
     </div>
     
+    <script type="application/json" id="dashboard-data">{chart_data}</script>
     <script>
-"""
-
-# Create chart data for top customers
-top_customers = pivot_table.head(10).copy()
-top_customers = top_customers.drop('Total', axis=1)
-
-customer_names = list(top_customers.index)
-chart_data = []
+        performance.mark('dashboard-charts-start');
+        var data = JSON.parse(document.getElementById('dashboard-data').textContent);
 
-for col in top_customers.columns:
-    chart_data.append({
-        'x': customer_names,
-        'y': list(top_customers[col].values),
-        'name': col,
-        'type': 'bar'
-    })
-
-html_content += f"""
-        var customerData = {chart_data};
+        var customerData = data.tags.map(function (tag, i) {{
+            return {{x: data.customers, y: data.counts[i], name: tag, type: 'bar'}};
+        }});
         
         var customerLayout = {{
             barmode: 'stack',
@@ -361,7 +328,7 @@ html_content += f"""
                 tickangle: -45
             }},
             yaxis: {{
-                title: 'Number of Shipments'
+                title: {{text: 'Number of Shipments'}}
             }},
             margin: {{
                 b: 150
@@ -369,17 +336,10 @@ html_content += f"""
         }};
         
         Plotly.newPlot('customerChart', customerData, customerLayout);
-"""
-
-# Create pie chart for tag distribution
-tag_totals = df.groupby('Tags').size().sort_values(ascending=False)
-tag_names = list(tag_totals.index)
-tag_values = list(tag_totals.values)
 
-html_content += f"""
         var tagData = [{{
-            values: {tag_values},
-            labels: {tag_names},
+            values: data.tagTotals.values,
+            labels: data.tagTotals.labels,
             type: 'pie',
             textinfo: 'label+percent',
             textposition: 'auto',
@@ -392,22 +352,321 @@ html_content += f"""
         }};
         
         Plotly.newPlot('tagChart', tagData, tagLayout);
+        performance.measure('dashboard charts', 'dashboard-charts-start');
     </script>
-</body>
+    <script type="application/json" id="table-meta">{table_meta}</script>
+{table_chunks}{table_script}</body>
 </html>
 """
 
-# Save the HTML file
-output_file = f"shipment_dashboard_{today.strftime('%Y-%m-%d')}.html"
-with open(output_file, 'w', encoding='utf-8') as f:
-    f.write(html_content)
+# Pages, sorts and filters the pivot table rows in the browser. Only the
+# current page is in the DOM; the first chunk of rows is drawn as soon as
+# it is decoded and the rest load in the background. Written verbatim.
+TABLE_SCRIPT = """    <script>
+        (function () {
+            performance.mark('dashboard-table-start');
+            var meta = JSON.parse(document.getElementById('table-meta').textContent);
+            var blocks = document.querySelectorAll('script.table-chunk');
+            var tbody = document.querySelector('#pivotTable tbody');
+            var filter = document.getElementById('customerFilter');
+            var pageSize = document.getElementById('pageSize');
+            var pageInfo = document.getElementById('pageInfo');
+            var rows = [];
+            var view = rows;
+            var sortColumn = -1;
+            var descending = false;
+            var page = 0;
+            var sidecarCallbacks = {};
+
+            // Sidecar chunk files are scripts calling this, so they load from file:// too
+            window.dashboardTableChunk = function (index, chunk) {
+                sidecarCallbacks[index](chunk);
+            };
+
+            function loadChunk(index) {
+                if (meta.sidecar) {
+                    return new Promise(function (resolve, reject) {
+                        var script = document.createElement('script');
+                        sidecarCallbacks[index] = resolve;
+                        script.src = meta.sidecar + '/rows-' + String(index).padStart(5, '0') + '.js';
+                        script.onerror = function () {
+                            reject(new Error('could not load ' + script.src));
+                        };
+                        document.body.appendChild(script);
+                    });
+                }
+                // Inline chunks are gzip-compressed JSON in base64
+                var bytes = Uint8Array.from(atob(blocks[index].textContent), function (c) {
+                    return c.charCodeAt(0);
+                });
+                var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+                return new Response(stream).json();
+            }
+
+            function escapeHtml(text) {
+                return text.replace(/[&<>"']/g, function (c) {
+                    return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+                });
+            }
+
+            function update() {
+                var query = filter.value.trim().toLowerCase();
+                if (query) {
+                    view = rows.filter(function (row) {
+                        return row[0].toLowerCase().indexOf(query) >= 0;
+                    });
+                } else {
+                    view = sortColumn >= 0 ? rows.slice() : rows;
+                }
+                if (sortColumn >= 0) {
+                    var sign = descending ? -1 : 1;
+                    view.sort(function (a, b) {
+                        var x = a[sortColumn], y = b[sortColumn];
+                        return sign * (sortColumn === 0 ? x.localeCompare(y) : x - y);
+                    });
+                }
+                draw();
+            }
+
+            function draw() {
+                var size = Number(pageSize.value);
+                var pages = Math.max(1, Math.ceil(view.length / size));
+                page = Math.max(0, Math.min(page, pages - 1));
+                var html = [];
+                view.slice(page * size, (page + 1) * size).forEach(function (row) {
+                    html.push('<tr><td><strong>' + escapeHtml(row[0]) + '</strong></td>');
+                    for (var i = 1; i < row.length; i++) {
+                        html.push(i === meta.totalColumn ? "<td class='total-column'>" : '<td>');
+                        html.push(row[i] > 0 ? row[i] : '', '</td>');
+                    }
+                    html.push('</tr>');
+                });
+                tbody.innerHTML = html.join('');
+                var loading = rows.length < meta.rows
+                    ? ' (loaded ' + rows.length.toLocaleString() + ' of ' + meta.rows.toLocaleString() + ')' : '';
+                pageInfo.textContent = 'Page ' + (page + 1) + ' of ' + pages + ', '
+                    + view.length.toLocaleString() + ' customers' + loading;
+            }
+
+            filter.addEventListener('input', function () {
+                page = 0;
+                update();
+            });
+            pageSize.addEventListener('change', function () {
+                page = 0;
+                draw();
+            });
+            document.getElementById('previousPage').addEventListener('click', function () {
+                page -= 1;
+                draw();
+            });
+            document.getElementById('nextPage').addEventListener('click', function () {
+                page += 1;
+                draw();
+            });
+            document.querySelectorAll('#pivotTable th').forEach(function (th) {
+                th.addEventListener('click', function () {
+                    var column = Number(th.dataset.column);
+                    // Counts sort largest first, names A to Z; a second click reverses
+                    descending = column === sortColumn ? !descending : column > 0;
+                    sortColumn = column;
+                    page = 0;
+                    update();
+                });
+            });
+
+            function loadFrom(index) {
+                if (index >= meta.chunks) {
+                    update();
+                    return;
+                }
+                return loadChunk(index).then(function (chunk) {
+                    Array.prototype.push.apply(rows, chunk);
+                    if (index === 0) {
+                        update();
+                        performance.measure('dashboard table first page', 'dashboard-table-start');
+                    } else {
+                        draw();
+                    }
+                    return loadFrom(index + 1);
+                });
+            }
+
+            loadFrom(0).catch(function (e) {
+                pageInfo.textContent = 'Could not load the customer table: ' + e.message;
+            });
+        })();
+    </script>
+"""
+
+_STREAMED = re.compile(r'\{(plotly_js|table_chunks|table_script)\}')
+
+
+def plotly_bundle(path=None):
+    """Path of the Plotly.js bundle to inline: path, else the one shipped in the plotly package."""
+    if path is None:
+        spec = importlib.util.find_spec('plotly')
+        if spec is None:
+            raise FileNotFoundError("no Plotly.js bundle to inline: pip install plotly or pass --plotly-js FILE")
+        path = os.path.join(os.path.dirname(spec.origin), 'package_data', 'plotly.min.js')
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Plotly.js bundle not found: {path}")
+    return path
+
+
+def _script_json(value):
+    # Compact JSON without '<', so it can never close its <script> early
+    return json.dumps(value, separators=(',', ':')).replace('<', '\\u003c')
+
+
+def chart_json(metrics):
+    """Chart data as compact columnar JSON, safe to embed in a <script> element."""
+    top_customers = metrics.pivot_table.head(10).drop(columns='Total')
+    return _script_json({
+        'customers': [str(name) for name in top_customers.index],
+        'tags': [str(tag) for tag in top_customers.columns],
+        'counts': top_customers.to_numpy(dtype=np.int64).T.tolist(),
+        'tagTotals': {
+            'labels': [str(tag) for tag in metrics.tag_totals.index],
+            'values': metrics.tag_totals.to_numpy(dtype=np.int64).tolist(),
+        },
+    })
+
+
+def table_chunks(pivot_table, chunk_rows=CHUNK_ROWS):
+    """Yield the pivot table as JSON lists of [customer, count, ...] rows, chunk_rows rows each."""
+    names = [str(name) for name in pivot_table.index]
+    counts = pivot_table.to_numpy(dtype=np.int64)
+    for start in range(0, len(counts), chunk_rows):
+        rows = counts[start:start + chunk_rows].tolist()
+        yield _script_json([[name] + row for name, row in zip(names[start:start + chunk_rows], rows)])
+
+
+def _write_table_chunks(f, pivot_table, sidecar_dir=None):
+    # Inline: one base64 gzip block per chunk. Sidecar: one script per chunk
+    # in sidecar_dir, replacing the chunks of any earlier run
+    if sidecar_dir is None:
+        for chunk in table_chunks(pivot_table):
+            data = base64.b64encode(gzip.compress(chunk.encode(), compresslevel=6, mtime=0)).decode('ascii')
+            f.write(f'    <script type="application/octet-stream" class="table-chunk">{data}</script>\n')
+        return
+
+    os.makedirs(sidecar_dir, exist_ok=True)
+    for stale in glob.glob(os.path.join(sidecar_dir, 'rows-*.js')):
+        os.remove(stale)
+    for index, chunk in enumerate(table_chunks(pivot_table)):
+        with open(os.path.join(sidecar_dir, f"rows-{index:05d}.js"), 'w', encoding='utf-8') as chunk_file:
+            chunk_file.write(f"dashboardTableChunk({index},{chunk});\n")
+
+
+def render_html(metrics, output_file=None, plotly_js=None, table_data='inline'):
+    """Write the interactive HTML dashboard and return its file name.
+
+    The page is streamed to disk from PAGE_TEMPLATE. The customer table is
+    not HTML: its rows go out as CHUNK_ROWS-row JSON chunks that a small
+    script pages, sorts and filters in the browser, so the DOM and the
+    time to first paint do not grow with the customer count. With
+    table_data='inline' the chunks are gzip-compressed blocks in the page;
+    with 'sidecar' they are script files in a <page>_rows directory next
+    to it, loaded on demand, and the page itself stays the same size.
+
+    Plotly.js comes from the CDN, or with plotly_js (a bundle path, see
+    plotly_bundle) is inlined so the page works without network access.
+    """
+    today = metrics.today
+    pivot_table = metrics.pivot_table
+    if output_file is None:
+        output_file = f"shipment_dashboard_{today.strftime('%Y-%m-%d')}.html"
+    sidecar_dir = os.path.splitext(output_file)[0] + '_rows' if table_data == 'sidecar' else None
+
+    fields = {
+        'today': today,
+        'report_date': today.strftime('%B %d, %Y'),
+        'total_today': metrics.total_today,
+        'increase': metrics.increase,
+        'increase_pct': metrics.increase_pct,
+        'total_all': metrics.total_all,
+        'most_shipped_vehicle_count': metrics.most_shipped_vehicle_count,
+        'most_shipped_vehicle_name': html.escape(str(metrics.most_shipped_vehicle_name)),
+        'weighted_avg_distance': metrics.weighted_avg_distance,
+        'tag_headers': ''.join(f'                        <th data-column="{index}">{html.escape(str(column))}</th>\n'
+                               for index, column in enumerate(pivot_table.columns, 1)),
+        'chart_data': chart_json(metrics),
+        'table_meta': _script_json({
+            'rows': len(pivot_table),
+            'chunks': -(-len(pivot_table) // CHUNK_ROWS),
+            # Index of the Total column in a row, after the customer name
+            'totalColumn': pivot_table.columns.get_loc('Total') + 1 if 'Total' in pivot_table.columns else -1,
+            'sidecar': urllib.parse.quote(os.path.basename(sidecar_dir)) if sidecar_dir else None,
+        }),
+    }
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        parts = _STREAMED.split(PAGE_TEMPLATE)
+        # Even parts are template text, odd parts the names of streamed fields
+        for index, part in enumerate(parts):
+            if index % 2 == 0:
+                f.write(part.format(**fields))
+            elif part == 'table_chunks':
+                _write_table_chunks(f, pivot_table, sidecar_dir)
+            elif part == 'table_script':
+                f.write(TABLE_SCRIPT)
+            elif plotly_js is None:
+                f.write(f'    <script src="{PLOTLY_CDN}"></script>\n')
+            else:
+                f.write('    <script>\n')
+                with open(plotly_js, encoding='utf-8') as bundle:
+                    shutil.copyfileobj(bundle, f, 1024 * 1024)
+                f.write('\n    </script>\n')
+
+    return output_file
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the HTML shipment dashboard from the newest EOD CSV export.")
+    add_html_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Generate the dashboard for parsed options (see shipment_options.add_html_arguments)."""
+    plotly_js = None
+    if args.self_contained or args.plotly_js:
+        try:
+            plotly_js = plotly_bundle(args.plotly_js)
+        except FileNotFoundError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+
+    csv_file, _ = resolve_inputs(args.input)
+    try:
+        df, initial_count, cached = load_eod(csv_file, projected=args.projected, engine=args.engine,
+                                             cache=open_cache(args))
+        print(f"[OK] Loaded {initial_count} records from {csv_file}{' (cached)' if cached else ''}")
+    except Exception as e:
+        print(f"[ERROR] Failed to read file: {e}")
+        sys.exit(1)
+
+    metrics = compute_dashboard(df, initial_count)
+    print(f"[OK] Filtered out {metrics.initial_count - metrics.filtered_count} records with 'Quote' tag")
+    print(f"[OK] Working with {metrics.filtered_count} records")
+    print(f"[OK] Latest date in data: {metrics.today}")
+    print(f"\n[OK] Pivot table created with {len(metrics.pivot_table)} customers and {len(metrics.pivot_table.columns)-1} tag types")
+
+    output_file = render_html(metrics, args.output, plotly_js, args.table_data)
+
+    print(f"\n[SUCCESS] Dashboard created successfully: {output_file}")
+    if args.table_data == 'sidecar':
+        print(f"[INFO] Customer table rows are in {os.path.splitext(output_file)[0]}_rows/; keep it next to the page")
+    if plotly_js is not None:
+        print(f"[INFO] Plotly.js inlined from {plotly_js}; the page needs no network access")
+    print_key_metrics(metrics)
+    print(f"\n[INFO] Open the HTML file in your browser to view the interactive dashboard!")
+
+
+def main(argv=None):
+    run(parse_args(argv))
 
-print(f"\n[SUCCESS] Dashboard created successfully: {output_file}")
-print(f"\n[METRICS] Key Metrics:")
-print(f"   - Shipments Created Today: {total_today}")
-print(f"   - Total Shipments (All Time): {total_all}")
-print(f"   - Today's Percentage: {increase_pct:.1f}%")
-print(f"   - Most Shipped Vehicle: {most_shipped_vehicle_name} ({most_shipped_vehicle_count} units)")
-print(f"   - Average Distance: {weighted_avg_distance:.2f} miles")
-print(f"\n[INFO] Open the HTML file in your browser to view the interactive dashboard!")
 
+if __name__ == '__main__':
+    main()
@@ -1,660 +1,862 @@
 import pandas as pd
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.chart import BarChart, PieChart, Reference
 from datetime import datetime
+import argparse
+from functools import partial
+import math
 import sys
-import glob
 import os
+import time
 
-# Find all CSV files in the current directory
-csv_files = glob.glob("*.csv")
+from shipment_metrics import compute_dashboard, print_key_metrics, TOP_VEHICLES
+from shipment_xlsx_tables import TableSpec, register_table_styles, write_table
+from shipment_xlsx_stream import column_widths
+from shipment_xlsx_backends import open_workbook
+# The feature modules (pyarrow ingest and cache, streaming, batch, watch, VIN
+# index, warehouse, profiling) are imported where their flags are handled
+from shipment_options import (add_excel_arguments, raw_data_policy, DEFAULT_CHUNKSIZE, DEFAULT_VEHICLE_COUNTERS,
+                              DEFAULT_MAX_BYTES, DEFAULT_REPORT, MAX_RAW_SHEET_ROWS)
 
-if len(csv_files) == 0:
-    print("[ERROR] No CSV files found in the current directory.")
-    sys.exit(1)
+RAW_DATE_COLUMN = 'Created Date'
 
-# Separate main EOD file from EOD Update-2 file
-eod_update2_file = None
-main_csv_files = []
+# CarMax side-table count columns; New/Repeat VINs only exist with --vin-index
+CARMAX_COUNT_COLUMNS = ('Unique VINs', 'New VINs', 'Repeat VINs')
+RAW_DATE_FORMAT = 'mm/dd/yyyy'
+RAW_TITLE = 'Filtered Shipment Data (Quotes Removed)'
+# --raw-data policies that write the rows to a file next to the workbook
+RAW_SIDECAR_SUFFIX = {'parquet': '_raw.parquet', 'csv.gz': '_raw.csv.gz'}
+
+
+# Styles for the cells outside the tables (see shipment_xlsx_tables.TABLE_STYLES)
+DASHBOARD_STYLES = {
+    'Dashboard Title': dict(font=dict(size=24, bold=True, color='2c3e50'),
+                            alignment=dict(horizontal='center', vertical='center')),
+    'Report Date': dict(font=dict(size=12, color='7f8c8d'), alignment=dict(horizontal='center')),
+    'Metric Value': dict(font=dict(size=28, bold=True, color='2c3e50'),
+                         alignment=dict(horizontal='center', vertical='center')),
+    'Metric Subtitle': dict(font=dict(size=9, color='7f8c8d'),
+                            alignment=dict(horizontal='center', vertical='center')),
+    'Section Title': dict(font=dict(size=14, bold=True, color='2c3e50')),
+    'Summary Label': dict(font=dict(bold=True)),
+    'Sheet Title': dict(font=dict(size=16, bold=True, color='2c3e50')),
+    'Side Table Title': dict(font=dict(size=14, bold=True, color='2c3e50'),
+                             alignment=dict(horizontal='center', vertical='center')),
+    'No Data': dict(alignment=dict(horizontal='center', vertical='center')),
+    'Raw Header': dict(fill='667eea', font=dict(bold=True, color='FFFFFF', size=10),
+                       alignment=dict(horizontal='center', vertical='center', wrap_text=True)),
+    'Raw Date': dict(number_format=RAW_DATE_FORMAT),
+    'Link': dict(font=dict(color='0563C1', underline='single')),
+}
+
+METRIC_COLORS = ('667eea', 'f5576c', '00f2fe', '38f9d7')
+
+
+def _no_lap(name, rows_in=None, rows_out=None):
+    pass
+
+
+def render_excel(metrics, df=None, output_file=None, backend='openpyxl', timer=None, raw_policy='sheets',
+                 raw_sheet_rows=MAX_RAW_SHEET_ROWS):
+    """Write the Excel dashboard.
+
+    df is the prepared full-width frame for the Raw Data sheet; when it is
+    None that sheet is left out. raw_policy (see shipment_options.RAW_DATA)
+    decides where its rows go: sheets of at most raw_sheet_rows rows, only
+    the latest day's rows, or a sidecar file (raw_sidecar_file) linked
+    from the sheet. backend is one of shipment_xlsx_backends.BACKENDS.
+    timer is an optional shipment_profile.StageTimer that gets one lap per
+    sheet and one for the save.
+    """
+    lap = timer.lap if timer is not None else _no_lap
+    today = metrics.today
+    total_today = metrics.total_today
+    total_all = metrics.total_all
+    increase = metrics.increase
+    increase_pct = metrics.increase_pct
+    most_shipped_vehicle_name = metrics.most_shipped_vehicle_name
+    most_shipped_vehicle_count = metrics.most_shipped_vehicle_count
+    weighted_avg_distance = metrics.weighted_avg_distance
+    pivot_table = metrics.pivot_table
+    pivot_table_today = metrics.pivot_table_today
+    carmax_vins_by_date = metrics.carmax_vins_by_date
+    carmax_unique_vins_total = metrics.carmax_unique_vins_total
+
+    # Tag distribution
+    tag_distribution = metrics.tag_totals.reset_index(name='Count')
+
+    # Top vehicles
+    top_vehicles = metrics.top_vehicles.reset_index()
+    top_vehicles.columns = ['Vehicle', 'Count']
+
+    # Create Excel file
+    if output_file is None:
+        output_file = f"shipment_dashboard_{today.strftime('%Y-%m-%d')}.xlsx"
+
+    book = open_workbook(output_file, backend)
+    register_table_styles(book)
+    for name, attributes in DASHBOARD_STYLES.items():
+        book.add_style(name, **attributes)
+    for color in METRIC_COLORS:
+        book.add_style(f'Metric Label {color}', font=dict(size=10, bold=True, color='FFFFFF'), fill=color,
+                       alignment=dict(horizontal='center', vertical='center'))
+    lap('open workbook')
 
-for f in csv_files:
-    if 'EOD Update-2' in f or 'EOD Update_2' in f:
-        eod_update2_file = f
-    else:
-        main_csv_files.append(f)
-
-if len(main_csv_files) == 1:
-    csv_file = main_csv_files[0]
-    print(f"[OK] Found main CSV file: {csv_file}")
-elif len(main_csv_files) > 1:
-    # Multiple CSV files found - use the most recently modified one
-    csv_file = max(main_csv_files, key=os.path.getmtime)
-    print(f"[OK] Multiple CSV files found. Using most recent: {csv_file}")
-    print(f"[INFO] Other files in directory: {', '.join([f for f in main_csv_files if f != csv_file])}")
-else:
-    print("[ERROR] No main CSV file found.")
-    sys.exit(1)
-
-if eod_update2_file:
-    print(f"[OK] Found EOD Update-2 file: {eod_update2_file}")
-
-# Read the CSV file
-try:
-    df = pd.read_csv(csv_file)
-    print(f"[OK] Loaded {len(df)} records from {csv_file}")
-except Exception as e:
-    print(f"[ERROR] Failed to read file: {e}")
-    sys.exit(1)
-
-# Convert Created Date to datetime
-df['Created Date'] = pd.to_datetime(df['Created Date'])
-
-# Rule: Remove orders with tag "CSRM, Quote"
-initial_count = len(df)
-df = df[~df['Tags'].str.contains('Quote', case=False, na=False)]
-filtered_count = len(df)
-print(f"[OK] Filtered out {initial_count - filtered_count} records with 'Quote' tag")
-print(f"[OK] Working with {filtered_count} records")
-
-# Get today's date (from the data)
-today = df['Created Date'].max().date()
-print(f"[OK] Latest date in data: {today}")
-
-# Filter for today's shipments
-df_today = df[df['Created Date'].dt.date == today]
-total_today = len(df_today)
-
-# Calculate total shipments (all dates)
-total_all = len(df)
-
-# Calculate increase
-increase = total_today
-increase_pct = (increase / total_all * 100) if total_all > 0 else 0
-
-# Most shipped vehicle
-most_shipped_vehicle = df['Vehicle Info'].value_counts().head(1)
-most_shipped_vehicle_name = most_shipped_vehicle.index[0] if len(most_shipped_vehicle) > 0 else "N/A"
-most_shipped_vehicle_count = most_shipped_vehicle.values[0] if len(most_shipped_vehicle) > 0 else 0
-
-# Weighted average distance
-df['Distance'] = pd.to_numeric(df['Distance'], errors='coerce')
-weighted_avg_distance = df['Distance'].mean()
-
-# Create pivot table: Rows = Customer Business Name, Columns = Tags, Values = Count of VIN #
-pivot_table = pd.pivot_table(
-    df,
-    values='VIN #',
-    index='Customer Business Name',
-    columns='Tags',
-    aggfunc='count',
-    fill_value=0
-)
-
-# Sort by total shipments per customer
-pivot_table['Total'] = pivot_table.sum(axis=1)
-pivot_table = pivot_table.sort_values('Total', ascending=False)
-
-print(f"[OK] Pivot table created with {len(pivot_table)} customers and {len(pivot_table.columns)-1} tag types")
-
-# Create pivot table for TODAY's shipments only
-pivot_table_today = pd.pivot_table(
-    df_today,
-    values='VIN #',
-    index='Customer Business Name',
-    columns='Tags',
-    aggfunc='count',
-    fill_value=0
-)
-
-# Sort by total shipments per customer
-pivot_table_today['Total'] = pivot_table_today.sum(axis=1)
-pivot_table_today = pivot_table_today.sort_values('Total', ascending=False)
-
-print(f"[OK] Today's pivot table created with {len(pivot_table_today)} customers")
-
-# Tag distribution
-tag_distribution = df.groupby('Tags').size().reset_index(name='Count')
-tag_distribution = tag_distribution.sort_values('Count', ascending=False)
-
-# Top vehicles
-top_vehicles = df['Vehicle Info'].value_counts().head(10).reset_index()
-top_vehicles.columns = ['Vehicle', 'Count']
-
-# Process EOD Update-2 file for CarMax unique VINs with New status and no tags
-carmax_vins_by_date = pd.DataFrame()
-carmax_unique_vins_total = 0
-
-if eod_update2_file:
-    try:
-        df_update2 = pd.read_csv(eod_update2_file)
-        print(f"[OK] Loaded {len(df_update2)} records from EOD Update-2 file")
-        
-        # Filter for CarMax, New status, and no tags (empty/null/whitespace)
-        carmax_new_no_tags = df_update2[
-            (df_update2['Customer Business Name'].str.contains('CarMax', case=False, na=False)) & 
-            (df_update2['Vehicle Status'].str.contains('New', case=False, na=False)) &
-            (df_update2['Tags'].isna() | (df_update2['Tags'].str.strip() == ''))
-        ]
-        
-        if len(carmax_new_no_tags) > 0:
-            # Convert Created Date to datetime
-            carmax_new_no_tags = carmax_new_no_tags.copy()
-            carmax_new_no_tags['Created Date'] = pd.to_datetime(carmax_new_no_tags['Created Date'])
-            
-            # Group by Created Date and count unique VINs
-            carmax_vins_by_date = carmax_new_no_tags.groupby(
-                carmax_new_no_tags['Created Date'].dt.date
-            )['VIN #'].nunique().reset_index()
-            carmax_vins_by_date.columns = ['Created Date', 'Unique VINs']
-            carmax_vins_by_date = carmax_vins_by_date.sort_values('Created Date')
-            
-            # Calculate total unique VINs
-            carmax_unique_vins_total = carmax_new_no_tags['VIN #'].nunique()
-            
-            print(f"[OK] Found {carmax_unique_vins_total} unique CarMax VINs across {len(carmax_vins_by_date)} dates")
-    except Exception as e:
-        print(f"[WARNING] Could not process EOD Update-2 file: {e}")
-        carmax_unique_vins_total = 0
-
-# Create Excel file
-output_file = f"shipment_dashboard_{today.strftime('%Y-%m-%d')}.xlsx"
-
-# Create a Pandas Excel writer using openpyxl as the engine
-with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
-    
     # SHEET 1: Dashboard Summary
-    wb = writer.book
-    ws_summary = wb.create_sheet('Dashboard Summary', 0)
-    
+    ws_summary = book.add_sheet('Dashboard Summary')
+
     # Title
-    ws_summary['A1'] = 'SHIPMENT DASHBOARD'
-    ws_summary['A1'].font = Font(size=24, bold=True, color='2c3e50')
-    ws_summary['A1'].alignment = Alignment(horizontal='center', vertical='center')
-    ws_summary.merge_cells('A1:F1')
-    ws_summary.row_dimensions[1].height = 35
-    
+    ws_summary.write(1, 1, 'SHIPMENT DASHBOARD', 'Dashboard Title')
+    ws_summary.merge(1, 1, 1, 6)
+    ws_summary.set_row_height(1, 35)
+
     # Report Date
-    ws_summary['A2'] = f'Report Date: {today.strftime("%B %d, %Y")}'
-    ws_summary['A2'].font = Font(size=12, color='7f8c8d')
-    ws_summary['A2'].alignment = Alignment(horizontal='center')
-    ws_summary.merge_cells('A2:F2')
-    
+    ws_summary.write(2, 1, f'Report Date: {today.strftime("%B %d, %Y")}', 'Report Date')
+    ws_summary.merge(2, 1, 2, 6)
+
     # Key Metrics Headers
     row = 4
     metrics_data = [
-        ('SHIPMENTS CREATED TODAY', total_today, f'Date: {today}', '667eea'),
-        ('TODAY VS TOTAL', increase, f'{increase_pct:.1f}% of total ({total_all} total)', 'f5576c'),
-        ('MOST SHIPPED VEHICLE', most_shipped_vehicle_count, most_shipped_vehicle_name, '00f2fe'),
-        ('AVERAGE DISTANCE', f'{weighted_avg_distance:.0f}', 'miles per shipment', '38f9d7')
+        ('SHIPMENTS CREATED TODAY', total_today, f'Date: {today}'),
+        ('TODAY VS TOTAL', increase, f'{increase_pct:.1f}% of total ({total_all} total)'),
+        ('MOST SHIPPED VEHICLE', most_shipped_vehicle_count, most_shipped_vehicle_name),
+        ('AVERAGE DISTANCE', f'{weighted_avg_distance:.0f}', 'miles per shipment')
     ]
-    
-    for idx, (label, value, subtitle, color) in enumerate(metrics_data):
+
+    for idx, ((label, value, subtitle), color) in enumerate(zip(metrics_data, METRIC_COLORS)):
         col_offset = (idx % 2) * 3 + 1
         row_offset = (idx // 2) * 4 + row
-        
+
         # Label
-        cell = ws_summary.cell(row=row_offset, column=col_offset)
-        cell.value = label
-        cell.font = Font(size=10, bold=True, color='FFFFFF')
-        cell.fill = PatternFill(start_color=color, end_color=color, fill_type='solid')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws_summary.merge_cells(start_row=row_offset, start_column=col_offset, 
-                              end_row=row_offset, end_column=col_offset+1)
-        
+        ws_summary.write(row_offset, col_offset, label, f'Metric Label {color}')
+        ws_summary.merge(row_offset, col_offset, row_offset, col_offset + 1)
+
         # Value
-        cell = ws_summary.cell(row=row_offset+1, column=col_offset)
-        cell.value = value
-        cell.font = Font(size=28, bold=True, color='2c3e50')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws_summary.merge_cells(start_row=row_offset+1, start_column=col_offset, 
-                              end_row=row_offset+1, end_column=col_offset+1)
-        ws_summary.row_dimensions[row_offset+1].height = 40
-        
+        ws_summary.write(row_offset + 1, col_offset, value, 'Metric Value')
+        ws_summary.merge(row_offset + 1, col_offset, row_offset + 1, col_offset + 1)
+        ws_summary.set_row_height(row_offset + 1, 40)
+
         # Subtitle
-        cell = ws_summary.cell(row=row_offset+2, column=col_offset)
-        cell.value = subtitle
-        cell.font = Font(size=9, color='7f8c8d')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws_summary.merge_cells(start_row=row_offset+2, start_column=col_offset, 
-                              end_row=row_offset+2, end_column=col_offset+1)
-    
+        ws_summary.write(row_offset + 2, col_offset, subtitle, 'Metric Subtitle')
+        ws_summary.merge(row_offset + 2, col_offset, row_offset + 2, col_offset + 1)
+
     # Summary Information
     summary_row = 16
-    ws_summary[f'A{summary_row}'] = 'DATA SUMMARY'
-    ws_summary[f'A{summary_row}'].font = Font(size=14, bold=True, color='2c3e50')
-    ws_summary.merge_cells(f'A{summary_row}:F{summary_row}')
-    
+    ws_summary.write(summary_row, 1, 'DATA SUMMARY', 'Section Title')
+    ws_summary.merge(summary_row, 1, summary_row, 6)
+
     summary_info = [
-        ['Total Records Processed:', filtered_count],
-        ['Filtered Out (Quote tags):', initial_count - filtered_count],
-        ['Date Range:', f"{df['Created Date'].min().strftime('%m/%d/%Y')} to {df['Created Date'].max().strftime('%m/%d/%Y')}"],
+        ['Total Records Processed:', metrics.filtered_count],
+        ['Filtered Out (Quote tags):', metrics.initial_count - metrics.filtered_count],
+        ['Date Range:', f"{metrics.first_date.strftime('%m/%d/%Y')} to {metrics.last_date.strftime('%m/%d/%Y')}"],
         ['Number of Customers:', len(pivot_table)],
         ['Number of Tag Types:', len(pivot_table.columns)-1]
     ]
-    
+
     for idx, (label, value) in enumerate(summary_info):
         row_num = summary_row + idx + 1
-        ws_summary[f'A{row_num}'] = label
-        ws_summary[f'A{row_num}'].font = Font(bold=True)
-        ws_summary[f'B{row_num}'] = value
-    
+        ws_summary.write(row_num, 1, label, 'Summary Label')
+        ws_summary.write(row_num, 2, value)
+
+    # Week over week, from the warehouse (--warehouse)
+    widths = [30, 20, 5, 30, 20]
+    if metrics.week_over_week is not None:
+        week_row = summary_row + len(summary_info) + 2
+        ws_summary.write(week_row, 1, f"WEEK OVER WEEK (7 days to {today.strftime('%m/%d/%Y')} vs the 7 before)",
+                         'Section Title')
+        ws_summary.merge(week_row, 1, week_row, 6)
+        write_table(ws_summary, metrics.week_over_week, week_row + 1, 1,
+                    TableSpec(header_height=None, percent_columns=('Change %',), blank_non_positive=False))
+        # The spacer column holds the Last Week figures here
+        widths[2] = 14
+
     # Column widths
-    ws_summary.column_dimensions['A'].width = 30
-    ws_summary.column_dimensions['B'].width = 20
-    ws_summary.column_dimensions['C'].width = 5
-    ws_summary.column_dimensions['D'].width = 30
-    ws_summary.column_dimensions['E'].width = 20
-    
+    for col_num, width in enumerate(widths, start=1):
+        ws_summary.set_column_width(col_num, width)
+    lap('sheet: Dashboard Summary')
+
     # SHEET 2: Pivot Table
-    ws_pivot = wb.create_sheet('Pivot Table')
-    
-    # Define formatting
-    header_fill = PatternFill(start_color='667eea', end_color='667eea', fill_type='solid')
-    header_font = Font(bold=True, color='FFFFFF', size=11)
-    total_fill = PatternFill(start_color='ffd700', end_color='ffd700', fill_type='solid')
-    total_font = Font(bold=True, size=11)
-    thin_border = Border(
-        left=Side(style='thin', color='D3D3D3'),
-        right=Side(style='thin', color='D3D3D3'),
-        top=Side(style='thin', color='D3D3D3'),
-        bottom=Side(style='thin', color='D3D3D3')
-    )
-    
+    ws_pivot = book.add_sheet('Pivot Table')
+
     # TABLE 1: ALL SHIPMENTS
     current_row = 1
-    
+
     # Get date range
-    first_date = df['Created Date'].min().strftime('%m/%d/%Y')
-    last_date = df['Created Date'].max().strftime('%m/%d/%Y')
-    
+    first_date = metrics.first_date.strftime('%m/%d/%Y')
+    last_date = metrics.last_date.strftime('%m/%d/%Y')
+
     # Title with date range and total count
-    ws_pivot.cell(row=current_row, column=1).value = f'Count of VIN by Customer and Tag Type ({first_date} - {last_date}) - {total_all}'
-    ws_pivot.cell(row=current_row, column=1).font = Font(size=16, bold=True, color='2c3e50')
-    ws_pivot.merge_cells(start_row=current_row, start_column=1, 
-                        end_row=current_row, end_column=len(pivot_table.columns)+1)
+    ws_pivot.write(current_row, 1, f'Count of VIN by Customer and Tag Type ({first_date} - {last_date}) - {total_all}', 'Sheet Title')
+    ws_pivot.merge(current_row, 1, current_row, len(pivot_table.columns) + 1)
     current_row += 2
-    
-    # Headers
+
+    # Headers, data rows and TOTALS ROW
     pivot_reset = pivot_table.reset_index()
     headers = list(pivot_reset.columns)
-    for col_num, header in enumerate(headers, start=1):
-        cell = ws_pivot.cell(row=current_row, column=col_num)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-        cell.border = thin_border
-    
-    ws_pivot.row_dimensions[current_row].height = 30  # Set header row height
-    
-    current_row += 1
-    
-    # Data rows
-    for idx, row_data in pivot_reset.iterrows():
-        for col_num, value in enumerate(row_data, start=1):
-            cell = ws_pivot.cell(row=current_row, column=col_num)
-            cell.value = value if not isinstance(value, (int, float)) or value > 0 else ''
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Alternate row colors
-            if current_row % 2 == 0:
-                cell.fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-            
-            # Highlight Total column
-            if col_num == len(headers):
-                cell.font = Font(bold=True)
-                cell.fill = PatternFill(start_color='e9ecef', end_color='e9ecef', fill_type='solid')
-        
-        current_row += 1
-    
-    # TOTALS ROW for Table 1
-    cell = ws_pivot.cell(row=current_row, column=1)
-    cell.value = 'TOTAL'
-    cell.fill = total_fill
-    cell.font = total_font
-    cell.alignment = Alignment(horizontal='center', vertical='center')
-    cell.border = thin_border
-    
-    for col_num in range(2, len(headers) + 1):
-        col_name = headers[col_num - 1]
-        if col_name == 'Customer Business Name':
-            continue
-        total_value = pivot_table[col_name].sum()
-        cell = ws_pivot.cell(row=current_row, column=col_num)
-        cell.value = int(total_value)
-        cell.fill = total_fill
-        cell.font = total_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = thin_border
-    
+    totals = ['TOTAL'] + pivot_table.sum().tolist()
+    current_row = write_table(ws_pivot, pivot_reset, current_row, 1,
+                              TableSpec(total_column=headers[-1]), total_row=totals) - 1
+
     # SMALL TABLE: CarMax Unique VINs by Created Date (to the right of main table)
     carmax_table_start_col = len(headers) + 2  # Start 1 column after the main table
     carmax_table_row = 1  # Start at the top
-    
+
+    # Count columns: Unique VINs, plus New/Repeat VINs when a VIN index was used
+    count_columns = [column for column in CARMAX_COUNT_COLUMNS if column in carmax_vins_by_date] or ['Unique VINs']
+    carmax_table_end_col = carmax_table_start_col + len(count_columns)
+
     # Title for CarMax table
-    cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col)
-    cell.value = 'CarMax VINs - New Status (No Tags)'
-    cell.font = Font(size=14, bold=True, color='2c3e50')
-    cell.alignment = Alignment(horizontal='center', vertical='center')
-    ws_pivot.merge_cells(start_row=carmax_table_row, start_column=carmax_table_start_col,
-                        end_row=carmax_table_row, end_column=carmax_table_start_col + 1)
+    ws_pivot.write(carmax_table_row, carmax_table_start_col, 'CarMax VINs - New Status (No Tags)', 'Side Table Title')
+    ws_pivot.merge(carmax_table_row, carmax_table_start_col, carmax_table_row, carmax_table_end_col)
     carmax_table_row += 2
-    
-    # Headers for CarMax table
-    carmax_headers = ['Created Date', 'Unique VINs']
-    for col_offset, header in enumerate(carmax_headers):
-        cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col + col_offset)
-        cell.value = header
-        cell.fill = PatternFill(start_color='f5576c', end_color='f5576c', fill_type='solid')
-        cell.font = Font(bold=True, color='FFFFFF', size=11)
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = thin_border
-    
-    carmax_table_row += 1
-    
-    # Display unique VINs by date
+
+    # Headers, unique VINs by date and total row for CarMax table
+    carmax_table = pd.DataFrame({
+        'Created Date': [date.strftime('%m/%d/%Y') for date in carmax_vins_by_date.get('Created Date', [])],
+        **{column: [int(count) for count in carmax_vins_by_date.get(column, [])] for column in count_columns},
+    })
+    carmax_spec = TableSpec(
+        header_style='CarMax Header',
+        header_height=None,
+        column_styles={column: ('CarMax Count', 'CarMax Count Striped') for column in count_columns},
+        total_row_style='CarMax Total Row',
+        blank_non_positive=False,
+    )
+    carmax_total = None
     if len(carmax_vins_by_date) > 0:
-        for idx, row_data in carmax_vins_by_date.iterrows():
-            # Date column
-            cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col)
-            cell.value = row_data['Created Date'].strftime('%m/%d/%Y')
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            
-            # Unique VINs column
-            cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col + 1)
-            cell.value = int(row_data['Unique VINs'])
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.font = Font(bold=True, color='f5576c')
-            
-            if carmax_table_row % 2 == 0:
-                ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col).fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-                ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col + 1).fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-            
-            carmax_table_row += 1
-        
-        # Total row for CarMax table
-        cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col)
-        cell.value = 'TOTAL'
-        cell.fill = PatternFill(start_color='ffa502', end_color='ffa502', fill_type='solid')
-        cell.font = Font(bold=True, color='FFFFFF')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = thin_border
-        
-        cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col + 1)
-        cell.value = carmax_unique_vins_total
-        cell.fill = PatternFill(start_color='ffa502', end_color='ffa502', fill_type='solid')
-        cell.font = Font(bold=True, color='FFFFFF')
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = thin_border
-    else:
+        carmax_total = ['TOTAL', carmax_unique_vins_total]
+        if 'New VINs' in count_columns:
+            # A VIN is new on one date at most, so the per-date counts add up
+            new_total = int(carmax_vins_by_date['New VINs'].sum())
+            carmax_total += [new_total, carmax_unique_vins_total - new_total]
+    carmax_table_row = write_table(ws_pivot, carmax_table, carmax_table_row, carmax_table_start_col,
+                                   carmax_spec, total_row=carmax_total)
+
+    if len(carmax_vins_by_date) == 0:
         # No CarMax data
-        cell = ws_pivot.cell(row=carmax_table_row, column=carmax_table_start_col)
-        cell.value = 'No data found'
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        ws_pivot.merge_cells(start_row=carmax_table_row, start_column=carmax_table_start_col,
-                            end_row=carmax_table_row, end_column=carmax_table_start_col + 1)
-    
+        ws_pivot.write(carmax_table_row, carmax_table_start_col, 'No data found', 'No Data')
+        ws_pivot.merge(carmax_table_row, carmax_table_start_col, carmax_table_row, carmax_table_end_col)
+
     # Set column widths for CarMax table
-    ws_pivot.column_dimensions[chr(64 + carmax_table_start_col)].width = 25
-    ws_pivot.column_dimensions[chr(64 + carmax_table_start_col + 1)].width = 20
-    
+    ws_pivot.set_column_width(carmax_table_start_col, 25)
+    for col in range(carmax_table_start_col + 1, carmax_table_end_col + 1):
+        ws_pivot.set_column_width(col, 20)
+
     current_row += 3  # Add spacing
-    
+
     # TABLE 2: TODAY'S SHIPMENTS
     if len(pivot_table_today) > 0:
         # Calculate overall percentage
         overall_percentage = (total_today / total_all * 100) if total_all > 0 else 0
-        
+
         # Title with today's date, count, and percentage
-        ws_pivot.cell(row=current_row, column=1).value = f'Count of VIN Created Today ({today.strftime("%m/%d/%Y")}) - {total_today} ({overall_percentage:.1f}% Increase)'
-        ws_pivot.cell(row=current_row, column=1).font = Font(size=16, bold=True, color='2c3e50')
-        ws_pivot.merge_cells(start_row=current_row, start_column=1, 
-                            end_row=current_row, end_column=len(pivot_table_today.columns)+2)
+        ws_pivot.write(current_row, 1, f'Count of VIN Created Today ({today.strftime("%m/%d/%Y")}) - {total_today} ({overall_percentage:.1f}% Increase)', 'Sheet Title')
+        ws_pivot.merge(current_row, 1, current_row, len(pivot_table_today.columns) + 2)
         current_row += 2
-        
-        # Headers - add % Increase column
-        pivot_today_reset = pivot_table_today.reset_index()
-        headers_today = list(pivot_today_reset.columns) + ['% Increase']
-        for col_num, header in enumerate(headers_today, start=1):
-            cell = ws_pivot.cell(row=current_row, column=col_num)
-            cell.value = header
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-            cell.border = thin_border
-        
-        ws_pivot.row_dimensions[current_row].height = 30  # Set header row height
-        
-        current_row += 1
-        
-        # Data rows
-        for idx, row_data in pivot_today_reset.iterrows():
-            customer_name = row_data['Customer Business Name']
-            
-            for col_num, value in enumerate(row_data, start=1):
-                cell = ws_pivot.cell(row=current_row, column=col_num)
-                cell.value = value if not isinstance(value, (int, float)) or value > 0 else ''
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal='center', vertical='center')
-                
-                # Alternate row colors
-                if current_row % 2 == 0:
-                    cell.fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-                
-                # Highlight Total column
-                if col_num == len(pivot_today_reset.columns):
-                    cell.font = Font(bold=True)
-                    cell.fill = PatternFill(start_color='e9ecef', end_color='e9ecef', fill_type='solid')
-            
-            # Add percentage column
-            today_total = row_data['Total']
-            if customer_name in pivot_table.index:
-                all_time_total = pivot_table.loc[customer_name, 'Total']
-                percentage = (today_total / all_time_total) if all_time_total > 0 else 0
-            else:
-                percentage = 0
-            
-            cell = ws_pivot.cell(row=current_row, column=len(headers_today))
-            cell.value = percentage  # Store as numeric value (0.270 for 27%)
-            cell.border = thin_border
-            cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=False)
-            cell.font = Font(color='0066cc', bold=True, size=11)
-            cell.number_format = '0.0%'  # Format as percentage with 1 decimal
-            
-            if current_row % 2 == 0:
-                cell.fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-            else:
-                cell.fill = PatternFill(start_color='FFFFFF', end_color='FFFFFF', fill_type='solid')
-            
-            current_row += 1
-        
-        # TOTALS ROW for Table 2
-        cell = ws_pivot.cell(row=current_row, column=1)
-        cell.value = 'TOTAL'
-        cell.fill = total_fill
-        cell.font = total_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = thin_border
-        
-        for col_num in range(2, len(pivot_today_reset.columns) + 1):
-            col_name = pivot_today_reset.columns[col_num - 1]
-            if col_name == 'Customer Business Name':
-                continue
-            total_value = pivot_table_today[col_name].sum()
-            cell = ws_pivot.cell(row=current_row, column=col_num)
-            cell.value = int(total_value)
-            cell.fill = total_fill
-            cell.font = total_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-            cell.border = thin_border
-        
-        # Add overall percentage in the % Increase column
-        cell = ws_pivot.cell(row=current_row, column=len(headers_today))
-        cell.value = overall_percentage / 100  # Store as numeric value (0.135 for 13.5%)
-        cell.fill = total_fill
-        cell.font = total_font
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=False)
-        cell.border = thin_border
-        cell.number_format = '0.0%'  # Format as percentage with 1 decimal
-    
+
+        # Headers, data rows with % Increase column and TOTALS ROW
+        all_time_totals = pivot_table['Total'].reindex(pivot_table_today.index)
+        pivot_today_reset = pivot_table_today.assign(**{
+            '% Increase': (pivot_table_today['Total'] / all_time_totals).where(all_time_totals > 0, 0)
+        }).reset_index()
+        headers_today = list(pivot_today_reset.columns)
+        totals_today = ['TOTAL'] + pivot_table_today.sum().tolist() + [overall_percentage / 100]
+        today_spec = TableSpec(total_column='Total', percent_columns=('% Increase',))
+        current_row = write_table(ws_pivot, pivot_today_reset, current_row, 1,
+                                  today_spec, total_row=totals_today) - 1
+
     # Adjust column widths - set based on header content
-    ws_pivot.column_dimensions['A'].width = 45  # Customer Business Name (increased for long names)
-    
-    # Set width for each column in Table 1 based on header length
     for col_num, header in enumerate(headers, start=1):
-        col_letter = chr(64 + col_num) if col_num <= 26 else chr(64 + col_num // 26) + chr(64 + col_num % 26)
         if col_num == 1:
-            ws_pivot.column_dimensions[col_letter].width = 45  # Customer name (increased for long names)
+            ws_pivot.set_column_width(col_num, 45)  # Customer name (increased for long names)
         elif 'Total' in str(header):
-            ws_pivot.column_dimensions[col_letter].width = 12
+            ws_pivot.set_column_width(col_num, 12)
         else:
             # Adjust based on header text length
-            header_length = len(str(header))
-            ws_pivot.column_dimensions[col_letter].width = max(header_length + 3, 22)
-    
+            ws_pivot.set_column_width(col_num, max(len(str(header)) + 3, 22))
+
     # Set width for % Increase column if today's table exists
     if len(pivot_table_today) > 0:
-        increase_col = len(headers_today)
-        col_letter = chr(64 + increase_col) if increase_col <= 26 else chr(64 + increase_col // 26) + chr(64 + increase_col % 26)
-        ws_pivot.column_dimensions[col_letter].width = 15
-    
+        ws_pivot.set_column_width(len(headers_today), 15)
+    lap('sheet: Pivot Table')
+
     # SHEET 3: Tag Distribution
-    tag_distribution.to_excel(writer, sheet_name='Tag Distribution', index=False, startrow=2)
-    
-    ws_tags = writer.sheets['Tag Distribution']
-    
+    ws_tags = book.add_sheet('Tag Distribution')
+    list_spec = TableSpec(header_style='List Header', header_height=None,
+                          body_styles=('List Cell', 'List Cell Striped'), blank_non_positive=False)
+
     # Title
-    ws_tags['A1'] = 'Shipment Distribution by Tag Type'
-    ws_tags['A1'].font = Font(size=16, bold=True, color='2c3e50')
-    ws_tags.merge_cells('A1:B1')
-    
-    # Format header
-    for col_num in range(1, 3):
-        cell = ws_tags.cell(row=3, column=col_num)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Format data
-    for row_num in range(4, len(tag_distribution) + 4):
-        for col_num in range(1, 3):
-            cell = ws_tags.cell(row=row_num, column=col_num)
-            cell.border = thin_border
-            if row_num % 2 == 0:
-                cell.fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-    
-    ws_tags.column_dimensions['A'].width = 30
-    ws_tags.column_dimensions['B'].width = 15
-    
+    ws_tags.write(1, 1, 'Shipment Distribution by Tag Type', 'Sheet Title')
+    ws_tags.merge(1, 1, 1, 2)
+
+    write_table(ws_tags, tag_distribution, 3, 1, list_spec)
+    ws_tags.set_column_width(1, 30)
+    ws_tags.set_column_width(2, 15)
+
     # Add Pie Chart
-    pie = PieChart()
-    labels = Reference(ws_tags, min_col=1, min_row=4, max_row=len(tag_distribution) + 3)
-    data = Reference(ws_tags, min_col=2, min_row=3, max_row=len(tag_distribution) + 3)
-    pie.add_data(data, titles_from_data=True)
-    pie.set_categories(labels)
-    pie.title = "Tag Distribution"
-    pie.width = 15
-    pie.height = 10
-    ws_tags.add_chart(pie, "D3")
-    
+    ws_tags.add_chart('pie', 'D3', categories=(1, 4, len(tag_distribution) + 3),
+                      values=(2, 3, len(tag_distribution) + 3), title="Tag Distribution")
+    lap('sheet: Tag Distribution')
+
     # SHEET 4: Top Vehicles
-    top_vehicles.to_excel(writer, sheet_name='Top Vehicles', index=False, startrow=2)
-    
-    ws_vehicles = writer.sheets['Top Vehicles']
-    
+    ws_vehicles = book.add_sheet('Top Vehicles')
+
     # Title
-    ws_vehicles['A1'] = 'Top 10 Most Shipped Vehicles'
-    ws_vehicles['A1'].font = Font(size=16, bold=True, color='2c3e50')
-    ws_vehicles.merge_cells('A1:B1')
-    
-    # Format header
-    for col_num in range(1, 3):
-        cell = ws_vehicles.cell(row=3, column=col_num)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Format data
-    for row_num in range(4, len(top_vehicles) + 4):
-        for col_num in range(1, 3):
-            cell = ws_vehicles.cell(row=row_num, column=col_num)
-            cell.border = thin_border
-            if row_num % 2 == 0:
-                cell.fill = PatternFill(start_color='f8f9fa', end_color='f8f9fa', fill_type='solid')
-    
-    ws_vehicles.column_dimensions['A'].width = 35
-    ws_vehicles.column_dimensions['B'].width = 15
-    
+    ws_vehicles.write(1, 1, 'Top 10 Most Shipped Vehicles', 'Sheet Title')
+    ws_vehicles.merge(1, 1, 1, 2)
+
+    write_table(ws_vehicles, top_vehicles, 3, 1, list_spec)
+    if metrics.top_vehicles_error:
+        # Counts from a bounded --streaming/--incremental summary
+        ws_vehicles.write(len(top_vehicles) + 5, 1,
+                          f"Approximate: each count may be up to {metrics.top_vehicles_error} too high", 'Report Date')
+    ws_vehicles.set_column_width(1, 35)
+    ws_vehicles.set_column_width(2, 15)
+
     # Add Bar Chart
-    bar_chart = BarChart()
-    bar_chart.type = "col"
-    bar_chart.title = "Top Vehicles"
-    bar_chart.y_axis.title = 'Count'
-    bar_chart.x_axis.title = 'Vehicle'
-    
-    data = Reference(ws_vehicles, min_col=2, min_row=3, max_row=len(top_vehicles) + 3)
-    cats = Reference(ws_vehicles, min_col=1, min_row=4, max_row=len(top_vehicles) + 3)
-    bar_chart.add_data(data, titles_from_data=True)
-    bar_chart.set_categories(cats)
-    bar_chart.width = 15
-    bar_chart.height = 10
-    ws_vehicles.add_chart(bar_chart, "D3")
-    
+    ws_vehicles.add_chart('col', 'D3', categories=(1, 4, len(top_vehicles) + 3),
+                          values=(2, 3, len(top_vehicles) + 3), title="Top Vehicles",
+                          x_title='Vehicle', y_title='Count')
+    lap('sheet: Top Vehicles')
+
     # SHEET 5: Raw Data (Filtered)
-    df_export = df.copy()
-    df_export['Created Date'] = df_export['Created Date'].dt.strftime('%m/%d/%Y')
-    df_export.to_excel(writer, sheet_name='Raw Data', index=False, startrow=1)
-    
-    ws_raw = writer.sheets['Raw Data']
-    
-    # Title
-    ws_raw['A1'] = 'Filtered Shipment Data (Quotes Removed)'
-    ws_raw['A1'].font = Font(size=14, bold=True, color='2c3e50')
-    ws_raw.merge_cells('A1:W1')
-    
-    # Format header
-    for col_num in range(1, len(df_export.columns) + 1):
-        cell = ws_raw.cell(row=2, column=col_num)
-        cell.fill = header_fill
-        cell.font = Font(bold=True, color='FFFFFF', size=10)
-        cell.alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-    
-    # Auto-adjust column widths
-    for col_idx, column in enumerate(ws_raw.iter_cols(min_row=2, max_row=len(df_export)+2), start=1):
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if cell.value and len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws_raw.column_dimensions[column_letter].width = adjusted_width
-    
-    # Remove default sheet if it exists
-    if 'Sheet' in wb.sheetnames:
-        wb.remove(wb['Sheet'])
-
-print(f"\n[SUCCESS] Excel Dashboard created successfully: {output_file}")
-print(f"\n[METRICS] Key Metrics:")
-print(f"   - Shipments Created Today: {total_today}")
-print(f"   - Total Shipments (All Time): {total_all}")
-print(f"   - Today's Percentage: {increase_pct:.1f}%")
-print(f"   - Most Shipped Vehicle: {most_shipped_vehicle_name} ({most_shipped_vehicle_count} units)")
-print(f"   - Average Distance: {weighted_avg_distance:.2f} miles")
-if carmax_unique_vins_total > 0:
-    print(f"   - CarMax Unique VINs (New, No Tags): {carmax_unique_vins_total}")
-print(f"\n[SHEETS] Excel file contains 5 sheets:")
-print(f"   1. Dashboard Summary - Key metrics and overview")
-print(f"   2. Pivot Table - Customers x Tags breakdown + CarMax Unique VINs by Date")
-print(f"   3. Tag Distribution - Shipments by tag type (with chart)")
-print(f"   4. Top Vehicles - Most shipped vehicles (with chart)")
-print(f"   5. Raw Data - Complete filtered dataset")
-print(f"\n[INFO] Open the Excel file to view your interactive dashboard!")
+    if df is not None and raw_policy != 'none':
+        if raw_policy in RAW_SIDECAR_SUFFIX:
+            write_raw_sidecar(book, df, raw_sidecar_file(output_file, raw_policy), lap)
+        elif raw_policy == 'today':
+            write_raw_data(book, today_rows(df, today), lap, raw_sheet_rows,
+                           f'Filtered Shipment Data Created {today.strftime("%m/%d/%Y")} (Quotes Removed)')
+        else:
+            write_raw_data(book, df, lap, raw_sheet_rows)
+        lap('sheet: Raw Data')
+
+    book.close()
+    lap('save')
+    return output_file
+
+
+def raw_sheet_names(rows, sheet_rows=MAX_RAW_SHEET_ROWS):
+    """Names of the sheets that rows raw rows are split across."""
+    return ['Raw Data'] + [f'Raw Data {number}' for number in range(2, math.ceil(rows / sheet_rows) + 1)]
+
+
+def raw_sidecar_file(output_file, policy):
+    """The file next to the workbook that a sidecar policy writes the rows to."""
+    return os.path.splitext(output_file)[0] + RAW_SIDECAR_SUFFIX[policy]
+
+
+def today_rows(df, today):
+    """The rows of df created on the date today."""
+    start = pd.Timestamp(today)
+    dates = df[RAW_DATE_COLUMN]
+    return df[(dates >= start) & (dates < start + pd.Timedelta(days=1))]
+
+
+def write_raw_data(book, df, lap=_no_lap, sheet_rows=MAX_RAW_SHEET_ROWS, title=RAW_TITLE):
+    # Raw Data sheets: dates are real date cells shown as MM/DD/YYYY, and the
+    # rows are streamed by the backend instead of being held as cells. Rows
+    # past sheet_rows go on to Raw Data 2, 3, ..., so no sheet passes
+    # Excel's row limit
+    widths = column_widths(df, date_columns=[RAW_DATE_COLUMN])
+    lap('raw data widths', rows_in=len(df))
+
+    names = raw_sheet_names(len(df), sheet_rows)
+    for number, name in enumerate(names):
+        start = number * sheet_rows
+        part = df.iloc[start:start + sheet_rows]
+        ws_raw = book.add_sheet(name)
+
+        # Title
+        if len(names) > 1:
+            ws_raw.write(1, 1, f'{title}: rows {start + 1:,}-{start + len(part):,} of {len(df):,}', 'Section Title')
+        else:
+            ws_raw.write(1, 1, title, 'Section Title')
+        ws_raw.merge(1, 1, 1, 23)
+
+        # Format header
+        for col_num, column in enumerate(df.columns, start=1):
+            ws_raw.write(2, col_num, column, 'Raw Header')
+
+        # Auto-adjust column widths
+        for col_num, width in enumerate(widths, start=1):
+            ws_raw.set_column_width(col_num, width)
+
+        ws_raw.write_frame(part, first_row=3, date_style='Raw Date')
+
+
+def write_raw_sidecar(book, df, sidecar, lap=_no_lap):
+    # The rows go to a compressed file next to the workbook, and the Raw
+    # Data sheet only describes and links it, so the workbook stays small
+    # however long the history is
+    name = os.path.basename(sidecar)
+    if sidecar.endswith('.parquet'):
+        df.to_parquet(sidecar, compression='zstd', index=False)
+        reader = f"pandas.read_parquet('{name}')"
+    else:
+        # Formatting the text dominates; level 1 compresses ~3x for almost nothing
+        df.to_csv(sidecar, index=False, compression={'method': 'gzip', 'compresslevel': 1})
+        reader = f"pandas.read_csv('{name}')"
+    lap('raw data sidecar', rows_in=len(df))
+
+    ws_raw = book.add_sheet('Raw Data')
+    ws_raw.write(1, 1, RAW_TITLE, 'Section Title')
+    ws_raw.merge(1, 1, 1, 6)
+    details = [
+        ('Rows', len(df)),
+        ('Columns', ', '.join(map(str, df.columns))),
+        ('Read with', reader),
+    ]
+    ws_raw.write(3, 1, 'File', 'Summary Label')
+    ws_raw.write_link(3, 2, name, name, 'Link')
+    for row, (label, value) in enumerate(details, start=4):
+        ws_raw.write(row, 1, label, 'Summary Label')
+        ws_raw.write(row, 2, value)
+    ws_raw.set_column_width(1, 12)
+    ws_raw.set_column_width(2, 60)
+
+
+def render_day(day, csv_file, eod_update2_file, output_dir='.', backend='openpyxl', projected=False,
+               engine='c', raw_policy='sheets', raw_sheet_rows=MAX_RAW_SHEET_ROWS, streaming=False,
+               chunksize=DEFAULT_CHUNKSIZE, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES, warehouse=None,
+               vehicle_counters=DEFAULT_VEHICLE_COUNTERS):
+    """Build one day's dashboard from an export pair (batch worker).
+
+    Same pipeline as main() without the console output; the workbook is
+    named after the export's date, and the day is recorded in the
+    warehouse file when one is given. Returns the written file.
+    """
+    from shipment_ingest import load_eod, read_carmax_in_background
+
+    cache = None
+    if cache_dir is not None and not streaming:
+        from shipment_cache import ParsedFileCache
+        try:
+            cache = ParsedFileCache(cache_dir, cache_max_bytes)
+        except ImportError:
+            pass
+
+    carmax = read_carmax_in_background(eod_update2_file) if eod_update2_file else None
+
+    df = None
+    if streaming:
+        from shipment_streaming import stream_dashboard
+        metrics = stream_dashboard(csv_file, chunksize, projected=projected, vehicle_counters=vehicle_counters)[0]
+    else:
+        df, initial_count, _ = load_eod(csv_file, projected=projected, engine=engine, cache=cache)
+        metrics = compute_dashboard(df, initial_count)
+
+    if carmax is not None:
+        try:
+            metrics.carmax_vins_by_date, metrics.carmax_unique_vins_total = carmax.result()
+        except Exception as e:
+            print(f"[WARNING] Could not process EOD Update-2 file {eod_update2_file}: {e}")
+    if warehouse is not None:
+        from shipment_warehouse import record_dashboard
+        record_dashboard(warehouse, metrics, csv_file)
+
+    df_raw = None
+    if raw_policy != 'none' and not streaming:
+        df_raw = load_eod(csv_file, engine=engine, cache=cache)[0] if projected else df
+
+    output_file = os.path.join(output_dir, f"shipment_dashboard_{day.strftime('%Y-%m-%d')}.xlsx")
+    return render_excel(metrics, df_raw, output_file, backend=backend, raw_policy=raw_policy,
+                        raw_sheet_rows=raw_sheet_rows)
+
+
+def _signature(path):
+    stat = os.stat(path)
+    return path, stat.st_size, stat.st_mtime_ns
+
+
+class WarmDashboard:
+    """The dashboard pipeline for --watch, keeping the last run's parsed state.
+
+    The prepared frame and metrics of the main export and the CarMax table
+    of the Update-2 export are kept with the file's (path, size, mtime), so
+    a new Update-2 file only costs the CarMax read and the workbook, and an
+    unchanged pair is not rendered again.
+    """
+
+    __slots__ = (
+        'args',
+        'cache',
+        'vin_index',
+        'main_signature',
+        'metrics',
+        'df_raw',
+        'update2_signature',
+        'carmax',
+    )
+
+    def __init__(self, args):
+        self.args = args
+        self.cache = None
+        if not (args.streaming or args.incremental):
+            from shipment_cache import open_cache
+            self.cache = open_cache(args)
+        self.vin_index = None
+        if args.vin_index:
+            from shipment_vin_index import VinIndex
+            self.vin_index = VinIndex(args.vin_index)
+        self.main_signature = None
+        self.metrics = None
+        self.df_raw = None
+        self.update2_signature = None
+        self.carmax = (pd.DataFrame(), 0)
+
+    def run(self, csv_file, eod_update2_file):
+        """Regenerate the dashboard if either export changed; returns the file or None."""
+        from shipment_ingest import load_eod, read_carmax_in_background
+
+        args = self.args
+        main_signature = _signature(csv_file)
+        update2_signature = _signature(eod_update2_file) if eod_update2_file else None
+        if main_signature == self.main_signature and update2_signature == self.update2_signature:
+            return None
+
+        carmax = None
+        if update2_signature != self.update2_signature and eod_update2_file:
+            carmax = read_carmax_in_background(eod_update2_file, vin_index=self.vin_index)
+
+        if main_signature != self.main_signature:
+            self.main_signature, self.metrics, self.df_raw = None, None, None
+            if args.incremental:
+                from shipment_incremental import update_incremental
+                self.metrics = update_incremental(csv_file, args.state_file, args.chunksize, projected=args.projected,
+                                                  vehicle_counters=args.vehicle_counters)[0]
+            elif args.streaming:
+                from shipment_streaming import stream_dashboard
+                self.metrics = stream_dashboard(csv_file, args.chunksize, projected=args.projected,
+                                                vehicle_counters=args.vehicle_counters)[0]
+            else:
+                df, initial_count, _ = load_eod(csv_file, projected=args.projected, engine=args.engine, cache=self.cache)
+                self.metrics = compute_dashboard(df, initial_count)
+                if raw_data_policy(args) != 'none':
+                    self.df_raw = load_eod(csv_file, engine=args.engine, cache=self.cache)[0] if args.projected else df
+                del df
+            self.main_signature = main_signature
+            print(f"[OK] Loaded {self.metrics.initial_count} records from {csv_file}")
+        else:
+            print(f"[INFO] {csv_file} unchanged; reusing its parsed data")
+
+        if update2_signature != self.update2_signature:
+            self.carmax = (pd.DataFrame(), 0)
+            if carmax is not None:
+                try:
+                    self.carmax = carmax.result()
+                    print(f"[OK] Read CarMax VINs from {eod_update2_file}")
+                except Exception as e:
+                    print(f"[WARNING] Could not process EOD Update-2 file: {e}")
+            self.update2_signature = update2_signature
+
+        metrics = self.metrics
+        metrics.carmax_vins_by_date, metrics.carmax_unique_vins_total = self.carmax
+        if args.warehouse:
+            from shipment_warehouse import record_run
+            record_run(args.warehouse, metrics, csv_file)
+        output_file = os.path.join(args.output_dir, f"shipment_dashboard_{metrics.today.strftime('%Y-%m-%d')}.xlsx")
+        return render_excel(metrics, self.df_raw, output_file, backend=args.backend,
+                            raw_policy=raw_data_policy(args), raw_sheet_rows=args.raw_sheet_rows)
+
+
+def main_watch(args):
+    from shipment_batch import latest_exports
+    from shipment_watch import watch
+
+    inbox = args.watch
+    if not os.path.isdir(inbox):
+        print(f"[ERROR] {inbox} is not a directory")
+        sys.exit(1)
+    os.makedirs(args.output_dir, exist_ok=True)
+    dashboard = WarmDashboard(args)
+
+    def regenerate(changed):
+        csv_file, eod_update2_file = latest_exports(inbox)
+        if csv_file is None:
+            print(f"[INFO] No main EOD export in {inbox} yet")
+            return
+        start = time.perf_counter()
+        output_file = dashboard.run(csv_file, eod_update2_file)
+        if output_file is None:
+            print("[INFO] Newest exports unchanged; nothing to regenerate")
+        else:
+            print(f"[SUCCESS] {output_file} regenerated in {time.perf_counter() - start:.1f}s")
+
+    regenerate(None)
+    print(f"[INFO] Watching {inbox} for new exports (Ctrl+C to stop)")
+    try:
+        watch(inbox, regenerate, args.debounce, args.poll_interval, polling=args.poll)
+    except KeyboardInterrupt:
+        print("\n[INFO] Stopped watching")
+
+
+def main_batch(args):
+    from shipment_batch import find_exports, pair_exports, run_batch
+
+    pairs, unmatched = pair_exports(find_exports(args.batch))
+    if not pairs:
+        print(f"[ERROR] No dated EOD exports found in {args.batch}")
+        sys.exit(1)
+    print(f"[OK] Found {len(pairs)} daily exports ({pairs[0][0]} to {pairs[-1][0]})")
+    for day, csv_file, eod_update2_file in pairs:
+        if eod_update2_file is None:
+            print(f"[INFO] {day}: no EOD Update-2 file, CarMax table will be empty")
+    for path in unmatched:
+        print(f"[INFO] Skipping {path} (no date stamp, superseded or no main export for that day)")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    render = partial(
+        render_day,
+        output_dir=args.output_dir,
+        backend=args.backend,
+        projected=args.projected,
+        engine=args.engine,
+        raw_policy=raw_data_policy(args),
+        raw_sheet_rows=args.raw_sheet_rows,
+        streaming=args.streaming,
+        chunksize=args.chunksize,
+        vehicle_counters=args.vehicle_counters,
+        cache_dir=args.cache_dir if args.cache else None,
+        cache_max_bytes=args.cache_max_mb * 1024 ** 2,
+        warehouse=args.warehouse,
+    )
+    results = run_batch(pairs, render, args.workers)
+
+    failed = [(day, error) for day, _, error in results if error is not None]
+    print(f"\n[SUCCESS] {len(results) - len(failed)} of {len(results)} dashboards written to {args.output_dir}")
+    if failed:
+        print(f"[FAILED] {len(failed)} of {len(results)} days failed:")
+        for day, error in failed:
+            print(f"   - {day}: {error}")
+        sys.exit(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the Excel shipment dashboard from the newest EOD CSV export.")
+    add_excel_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run(args, argv=None):
+    """Generate the dashboard for parsed options (see shipment_options.add_excel_arguments)."""
+    if args.backend == 'xlsxwriter':
+        try:
+            import xlsxwriter  # noqa: F401
+        except ImportError:
+            print("[ERROR] --backend xlsxwriter needs xlsxwriter (pip install xlsxwriter)")
+            sys.exit(1)
+    raw_policy = raw_data_policy(args)
+    if raw_policy == 'parquet':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            print("[ERROR] --raw-data parquet needs pyarrow (pip install pyarrow)")
+            sys.exit(1)
+    if args.vehicle_counters < TOP_VEHICLES:
+        print(f"[ERROR] --vehicle-counters must be at least {TOP_VEHICLES}, the rows of the Top Vehicles sheet")
+        sys.exit(1)
+    if not 1 <= args.raw_sheet_rows <= MAX_RAW_SHEET_ROWS:
+        print(f"[ERROR] --raw-sheet-rows must be between 1 and {MAX_RAW_SHEET_ROWS} (Excel's row limit)")
+        sys.exit(1)
+    if (args.batch or args.watch) and (args.profile or args.profile_memory or args.profile_stage):
+        print("[ERROR] --profile times a single run and cannot be used with --batch or --watch")
+        sys.exit(1)
+
+    if args.batch:
+        if args.incremental:
+            print("[ERROR] --incremental keeps state for a single cumulative export and cannot be used with --batch")
+            sys.exit(1)
+        if args.vin_index:
+            print("[ERROR] --vin-index updates one index from a single process and cannot be used with --batch")
+            sys.exit(1)
+        if args.watch:
+            print("[ERROR] --watch and --batch cannot be combined")
+            sys.exit(1)
+        if args.input or args.output:
+            print("[ERROR] --batch finds its own exports and names its own dashboards; drop --input/--output")
+            sys.exit(1)
+        main_batch(args)
+        return
+
+    if args.watch:
+        if args.input or args.output:
+            print("[ERROR] --watch takes the newest exports in INBOX and writes to --output-dir; drop --input/--output")
+            sys.exit(1)
+        main_watch(args)
+        return
+
+    if (args.profile_memory or args.profile_stage) and not args.profile:
+        args.profile = DEFAULT_REPORT
+    timer = None
+    started = datetime.now().isoformat(timespec='seconds')
+    if args.profile:
+        from shipment_profile import StageTimer
+        timer = StageTimer(trace_memory=args.profile_memory, profile_stage=args.profile_stage,
+                           profile_file=args.profile_output)
+
+    from shipment_batch import resolve_inputs
+    from shipment_ingest import load_eod, read_carmax_in_background
+
+    csv_file, eod_update2_file = resolve_inputs(args.input, args.update2)
+
+    vin_index = None
+    if args.vin_index and eod_update2_file:
+        from shipment_vin_index import VinIndex
+        try:
+            vin_index = VinIndex(args.vin_index)
+        except Exception as e:
+            print(f"[WARNING] Could not open VIN index {args.vin_index}: {e}")
+
+    # The CarMax rows of the Update-2 file are read while the main export parses
+    carmax = read_carmax_in_background(eod_update2_file, vin_index=vin_index) if eod_update2_file else None
+    if timer is not None:
+        timer.lap('find inputs')
+
+    aggregate_only = args.streaming or args.incremental
+    if args.incremental:
+        # Parse only the tail appended since the saved state, if the prefix is unchanged
+        from shipment_incremental import update_incremental
+        try:
+            metrics, new_rows, rebuilt = update_incremental(csv_file, args.state_file, args.chunksize,
+                                                            projected=args.projected,
+                                                            vehicle_counters=args.vehicle_counters)
+        except Exception as e:
+            print(f"[ERROR] Failed to read file: {e}")
+            sys.exit(1)
+        if rebuilt:
+            print(f"[INFO] No matching incremental state in {args.state_file}; rebuilt it from the whole file")
+        print(f"[OK] Folded {new_rows} new records from {csv_file} ({metrics.initial_count} in total)")
+        if timer is not None:
+            timer.lap('incremental update', rows_in=new_rows, rows_out=metrics.filtered_count)
+        df = None
+    elif args.streaming:
+        # Fold the file chunk by chunk; the full frame is never held in memory
+        if args.engine != 'c':
+            print("[INFO] --streaming reads with the C parser; ignoring --engine")
+        from shipment_streaming import stream_dashboard
+        try:
+            metrics, chunks = stream_dashboard(csv_file, args.chunksize, projected=args.projected,
+                                               vehicle_counters=args.vehicle_counters)
+            print(f"[OK] Streamed {metrics.initial_count} records from {csv_file} in {chunks} chunks")
+        except Exception as e:
+            print(f"[ERROR] Failed to read file: {e}")
+            sys.exit(1)
+        if timer is not None:
+            timer.lap('stream aggregate', rows_in=metrics.initial_count, rows_out=metrics.filtered_count)
+        df = None
+    else:
+        from shipment_cache import open_cache
+        cache = open_cache(args)
+
+        # Read the CSV file
+        try:
+            df, initial_count, cached = load_eod(csv_file, projected=args.projected, engine=args.engine, cache=cache,
+                                                 timer=timer)
+            print(f"[OK] Loaded {initial_count} records from {csv_file}{' (cached)' if cached else ''}")
+        except Exception as e:
+            print(f"[ERROR] Failed to read file: {e}")
+            sys.exit(1)
+
+        metrics = compute_dashboard(df, initial_count)
+        if timer is not None:
+            timer.lap('pivots', rows_in=len(df))
+
+    if metrics.top_vehicles_error:
+        print(f"[INFO] More than {args.vehicle_counters} distinct vehicles: Top Vehicles counts may be up to "
+              f"{metrics.top_vehicles_error} too high (raise --vehicle-counters for exact counts)")
+    print(f"[OK] Filtered out {metrics.initial_count - metrics.filtered_count} records with 'Quote' tag")
+    print(f"[OK] Working with {metrics.filtered_count} records")
+    print(f"[OK] Latest date in data: {metrics.today}")
+    print(f"[OK] Pivot table created with {len(metrics.pivot_table)} customers and {len(metrics.pivot_table.columns)-1} tag types")
+    print(f"[OK] Today's pivot table created with {len(metrics.pivot_table_today)} customers")
+
+    # Process EOD Update-2 file for CarMax unique VINs with New status and no tags
+    if carmax is not None:
+        try:
+            metrics.carmax_vins_by_date, metrics.carmax_unique_vins_total = carmax.result()
+            if len(metrics.carmax_vins_by_date) > 0:
+                print(f"[OK] Found {metrics.carmax_unique_vins_total} unique CarMax VINs across {len(metrics.carmax_vins_by_date)} dates")
+            if vin_index is not None and 'New VINs' in metrics.carmax_vins_by_date:
+                new_vins = int(metrics.carmax_vins_by_date['New VINs'].sum())
+                print(f"[OK] {new_vins} CarMax VINs seen for the first time; {len(vin_index)} VINs in {args.vin_index}")
+        except Exception as e:
+            print(f"[WARNING] Could not process EOD Update-2 file: {e}")
+        if timer is not None:
+            # Only the wait: the file is read on a background thread
+            timer.lap('carmax wait')
+
+    if args.warehouse:
+        from shipment_warehouse import record_run
+        record_run(args.warehouse, metrics, csv_file)
+        if timer is not None:
+            timer.lap('warehouse')
+
+    # The Raw Data sheet needs every column, so a projected run reads the file again in full
+    df_raw = None
+    if aggregate_only:
+        print("[INFO] Raw Data sheet is not written in --streaming/--incremental mode")
+    elif raw_policy != 'none':
+        if args.projected:
+            df_raw = load_eod(csv_file, engine=args.engine, cache=cache)[0]
+            if timer is not None:
+                timer.lap('parse raw data', rows_out=len(df_raw))
+        else:
+            df_raw = df
+
+    output_file = render_excel(metrics, df_raw, args.output, backend=args.backend, timer=timer,
+                               raw_policy=raw_policy, raw_sheet_rows=args.raw_sheet_rows)
+
+    print(f"\n[SUCCESS] Excel Dashboard created successfully: {output_file}")
+    print_key_metrics(metrics)
+    if metrics.carmax_unique_vins_total > 0:
+        print(f"   - CarMax Unique VINs (New, No Tags): {metrics.carmax_unique_vins_total}")
+    raw_sheets = []
+    if df_raw is not None:
+        if raw_policy in RAW_SIDECAR_SUFFIX:
+            raw_sheets = [f"Raw Data - Link to {raw_sidecar_file(output_file, raw_policy)} ({len(df_raw)} filtered rows)"]
+        else:
+            rows = len(today_rows(df_raw, metrics.today)) if raw_policy == 'today' else len(df_raw)
+            names = raw_sheet_names(rows, args.raw_sheet_rows)
+            if raw_policy == 'today':
+                raw_sheets = [f"{name} - Filtered rows created {metrics.today}" for name in names]
+            elif len(names) == 1:
+                raw_sheets = ["Raw Data - Complete filtered dataset"]
+            else:
+                raw_sheets = [f"{name} - Filtered rows {number * args.raw_sheet_rows + 1}-"
+                              f"{min((number + 1) * args.raw_sheet_rows, rows)}" for number, name in enumerate(names)]
+    print(f"\n[SHEETS] Excel file contains {4 + len(raw_sheets)} sheets:")
+    print(f"   1. Dashboard Summary - Key metrics and overview")
+    print(f"   2. Pivot Table - Customers x Tags breakdown + CarMax Unique VINs by Date")
+    print(f"   3. Tag Distribution - Shipments by tag type (with chart)")
+    print(f"   4. Top Vehicles - Most shipped vehicles (with chart)")
+    for number, description in enumerate(raw_sheets, start=5):
+        print(f"   {number}. {description}")
+    print(f"\n[INFO] Open the Excel file to view your interactive dashboard!")
+
+    if timer is not None:
+        timer.close()
+        timer.print_report()
+        timer.write_report(
+            args.profile,
+            started=started,
+            argv=sys.argv[1:] if argv is None else list(argv),
+            input_file=csv_file,
+            update2_file=eod_update2_file,
+            output_file=output_file,
+            output_bytes=os.path.getsize(output_file),
+            rows_in=metrics.initial_count,
+            rows_out=metrics.filtered_count,
+        )
+        print(f"[OK] Run report written to {args.profile}")
+        if args.profile_stage:
+            if timer.profiled():
+                print(f"[OK] cProfile stats of '{args.profile_stage}' written to {timer.profile_file} (python -m pstats {timer.profile_file})")
+            else:
+                names = ', '.join(stage['stage'] for stage in timer.stages)
+                print(f"[WARNING] No stage named '{args.profile_stage}' ran; stages were: {names}")
+
+
+def main(argv=None):
+    run(parse_args(argv), argv)
+
 
+if __name__ == '__main__':
+    main()
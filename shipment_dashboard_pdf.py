@@ -1,90 +1,61 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
-from matplotlib.backends.backend_pdf import PdfPages
+import argparse
 from datetime import datetime
+import math
+import os
 import sys
+import tempfile
 import numpy as np
 
-# Read the CSV file
-csv_file = "MB EOD Update_Nov-12-2025-16-16-37.215.csv"
-
-try:
-    df = pd.read_csv(csv_file)
-    print(f"[OK] Loaded {len(df)} records from {csv_file}")
-except Exception as e:
-    print(f"Error reading file: {e}")
-    sys.exit(1)
-
-# Convert Created Date to datetime
-df['Created Date'] = pd.to_datetime(df['Created Date'])
-
-# Rule: Remove orders with tag "CSRM, Quote"
-initial_count = len(df)
-df = df[~df['Tags'].str.contains('Quote', case=False, na=False)]
-filtered_count = len(df)
-print(f"[OK] Filtered out {initial_count - filtered_count} records with 'Quote' tag")
-print(f"[OK] Working with {filtered_count} records")
-
-# Get today's date (from the data)
-today = df['Created Date'].max().date()
-print(f"[OK] Latest date in data: {today}")
-
-# Filter for today's shipments
-df_today = df[df['Created Date'].dt.date == today]
-total_today = len(df_today)
-
-# Calculate total shipments (all dates)
-total_all = len(df)
-
-# Calculate increase
-increase = total_today
-increase_pct = (increase / total_all * 100) if total_all > 0 else 0
-
-# Most shipped vehicle
-most_shipped_vehicle = df['Vehicle Info'].value_counts().head(1)
-most_shipped_vehicle_name = most_shipped_vehicle.index[0] if len(most_shipped_vehicle) > 0 else "N/A"
-most_shipped_vehicle_count = most_shipped_vehicle.values[0] if len(most_shipped_vehicle) > 0 else 0
-
-# Weighted average distance
-df['Distance'] = pd.to_numeric(df['Distance'], errors='coerce')
-weighted_avg_distance = df['Distance'].mean()
-
-# Create pivot table: Rows = Customer Business Name, Columns = Tags, Values = Count of VIN #
-pivot_table = pd.pivot_table(
-    df,
-    values='VIN #',
-    index='Customer Business Name',
-    columns='Tags',
-    aggfunc='count',
-    fill_value=0
-)
-
-# Sort by total shipments per customer
-pivot_table['Total'] = pivot_table.sum(axis=1)
-pivot_table = pivot_table.sort_values('Total', ascending=False)
-
-print(f"[OK] Pivot table created with {len(pivot_table)} customers and {len(pivot_table.columns)-1} tag types")
-
-# Create PDF
-output_file = f"shipment_dashboard_{today.strftime('%Y-%m-%d')}.pdf"
-
-# Set up the PDF with multiple pages
-with PdfPages(output_file) as pdf:
-    
-    # PAGE 1: Title and Key Metrics
-    fig = plt.figure(figsize=(11, 8.5))
+from shipment_metrics import compute_dashboard, print_key_metrics
+from shipment_ingest import load_eod
+from shipment_cache import open_cache
+from shipment_batch import resolve_inputs
+from shipment_options import DEFAULT_ROWS_PER_PAGE, add_pdf_arguments
+
+PAGE_SIZE = (11, 8.5)
+FONT_ADVANCE = 0.602    # monospace glyph width in ems (DejaVu Sans Mono; Courier is 0.600)
+MAX_NAME = 30           # customer names are truncated to this many characters
+MAX_LABEL = 18          # ... and tag labels to this many
+TABLE_WIDTH = 0.90
+TABLE_TOP, TABLE_HEIGHT = 0.90, 0.84
+# Below this many table pages a process pool costs more than it saves
+PARALLEL_MIN_PAGES = 8
+# Table pages use the PDF base-14 fonts (Helvetica, Courier): they need no
+# glyph embedding, which writes a text-heavy page about six times faster.
+# Pages with text outside their cp1252 encoding fall back to DejaVu.
+CORE_FONTS = {'pdf.use14corefonts': True, 'font.monospace': ['Courier'], 'font.weight': 'medium'}
+
+
+def _draw_summary(metrics):
+    """Page 1: title, key metric boxes and data summary."""
+    import matplotlib.patches as mpatches
+    from matplotlib.figure import Figure
+
+    today = metrics.today
+    total_today = metrics.total_today
+    total_all = metrics.total_all
+    increase = metrics.increase
+    increase_pct = metrics.increase_pct
+    most_shipped_vehicle_name = metrics.most_shipped_vehicle_name
+    most_shipped_vehicle_count = metrics.most_shipped_vehicle_count
+    weighted_avg_distance = metrics.weighted_avg_distance
+    pivot_table = metrics.pivot_table
+    initial_count = metrics.initial_count
+    filtered_count = metrics.filtered_count
+
+    fig = Figure(figsize=PAGE_SIZE)
     fig.patch.set_facecolor('white')
-    
+    ax = fig.add_subplot(111)
+
     # Title
-    plt.text(0.5, 0.95, 'SHIPMENT DASHBOARD', 
+    ax.text(0.5, 0.95, 'SHIPMENT DASHBOARD', 
              ha='center', va='top', fontsize=32, fontweight='bold',
              color='#2c3e50')
-    plt.text(0.5, 0.90, f'Report Date: {today.strftime("%B %d, %Y")}', 
+    ax.text(0.5, 0.90, f'Report Date: {today.strftime("%B %d, %Y")}', 
              ha='center', va='top', fontsize=16, color='#7f8c8d')
-    
+
     # Key Metrics Boxes
-    metrics = [
+    metric_boxes = [
         {
             'title': 'SHIPMENTS CREATED TODAY',
             'value': str(total_today),
@@ -114,8 +85,8 @@ with PdfPages(output_file) as pdf:
             'position': (0.55, 0.50)
         }
     ]
-    
-    for metric in metrics:
+
+    for metric in metric_boxes:
         x, y = metric['position']
         # Background box
         rect = mpatches.FancyBboxPatch((x-0.15, y-0.12), 0.3, 0.18,
@@ -125,111 +96,145 @@ with PdfPages(output_file) as pdf:
                                        alpha=0.9,
                                        transform=fig.transFigure)
         fig.patches.append(rect)
-        
+    
         # Text
-        plt.text(x, y + 0.04, metric['title'], 
+        fig.text(x, y + 0.04, metric['title'], 
                 ha='center', va='center', fontsize=9, fontweight='bold',
                 color='white', transform=fig.transFigure)
-        plt.text(x, y - 0.02, metric['value'], 
+        fig.text(x, y - 0.02, metric['value'], 
                 ha='center', va='center', fontsize=28, fontweight='bold',
                 color='white', transform=fig.transFigure)
-        plt.text(x, y - 0.08, metric['subtitle'], 
+        fig.text(x, y - 0.08, metric['subtitle'], 
                 ha='center', va='center', fontsize=8,
                 color='white', transform=fig.transFigure)
-    
+
     # Summary text at bottom
     summary_text = f"""
     Data Summary:
     • Total records processed: {filtered_count} shipments
     • Filtered out {initial_count - filtered_count} records with 'Quote' tag
-    • Date range: {df['Created Date'].min().strftime('%m/%d/%Y')} to {df['Created Date'].max().strftime('%m/%d/%Y')}
+    • Date range: {metrics.first_date.strftime('%m/%d/%Y')} to {metrics.last_date.strftime('%m/%d/%Y')}
     • Number of customers: {len(pivot_table)} unique customers
     • Number of tag types: {len(pivot_table.columns)-1}
     """
-    
-    plt.text(0.5, 0.25, summary_text, 
+
+    fig.text(0.5, 0.25, summary_text, 
             ha='center', va='top', fontsize=10,
             color='#2c3e50', transform=fig.transFigure,
             bbox=dict(boxstyle='round', facecolor='#f8f9fa', alpha=0.8, pad=1))
-    
-    plt.axis('off')
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.close()
-    
-    # PAGE 2: Pivot Table
-    fig = plt.figure(figsize=(11, 8.5))
-    fig.patch.set_facecolor('white')
-    
-    plt.text(0.5, 0.96, 'Shipments by Customer and Tag Type', 
-             ha='center', va='top', fontsize=18, fontweight='bold',
-             color='#2c3e50')
-    
-    # Prepare table data
-    table_data = []
-    headers = ['Customer'] + list(pivot_table.columns)
-    table_data.append(headers)
-    
-    for customer, row in pivot_table.iterrows():
-        row_data = [customer[:30]]  # Truncate long names
-        for col in pivot_table.columns:
-            val = row[col]
-            row_data.append(str(int(val)) if val > 0 else '')
-        table_data.append(row_data)
-    
-    # Create table
-    ax = plt.subplot(111)
-    ax.axis('tight')
+
     ax.axis('off')
-    
-    table = ax.table(cellText=table_data[1:], 
-                    colLabels=table_data[0],
-                    cellLoc='center',
-                    loc='center',
-                    bbox=[0, 0, 1, 0.85])
-    
-    table.auto_set_font_size(False)
-    table.set_fontsize(9)
-    table.scale(1, 2)
-    
-    # Style header row
-    for i in range(len(headers)):
-        cell = table[(0, i)]
-        cell.set_facecolor('#667eea')
-        cell.set_text_props(weight='bold', color='white')
-    
-    # Alternate row colors and highlight Total column
-    for i in range(1, len(table_data)):
-        for j in range(len(headers)):
-            cell = table[(i, j)]
-            if j == len(headers) - 1:  # Total column
-                cell.set_facecolor('#e9ecef')
-                cell.set_text_props(weight='bold')
-            elif i % 2 == 0:
-                cell.set_facecolor('#f8f9fa')
-    
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.close()
-    
-    # PAGE 3: Charts
-    fig = plt.figure(figsize=(11, 8.5))
+    return fig
+
+
+class PivotLayout:
+    """Column widths and font size shared by every table page.
+
+    Each row is drawn as one monospace text line rather than a table of
+    cells, so a page costs a few dozen text artists however many tags
+    there are, and every page lines up with the others.
+    """
+
+    __slots__ = ('labels', 'name_width', 'widths', 'rows_per_page', 'fontsize', 'row_height', 'char_width',
+                 'left', 'width')
+
+    def __init__(self, pivot_table, rows_per_page=DEFAULT_ROWS_PER_PAGE):
+        self.labels = [str(col)[:MAX_LABEL] for col in pivot_table.columns]
+        names = [str(name)[:MAX_NAME] for name in pivot_table.index]
+        self.name_width = max([len('Customer')] + [len(name) for name in names]) + 1
+        peaks = pivot_table.max() if len(pivot_table) else [0] * len(self.labels)
+        self.widths = [max(len(label), len(str(int(peak)))) + 2 for label, peak in zip(self.labels, peaks)]
+        self.rows_per_page = rows_per_page
+
+        # Fit the widest line to the page width and the rows to the page height
+        # (plus a character of padding), centred on the page
+        self.row_height = TABLE_HEIGHT / (rows_per_page + 1)
+        chars = self.name_width + sum(self.widths) + 1
+        self.fontsize = min(9, TABLE_WIDTH * PAGE_SIZE[0] * 72 / (chars * FONT_ADVANCE),
+                            self.row_height * PAGE_SIZE[1] * 72 * 0.75)
+        self.char_width = self.fontsize * FONT_ADVANCE / 72 / PAGE_SIZE[0]
+        self.width = chars * self.char_width
+        self.left = (1 - self.width) / 2
+
+    def page_count(self, customers):
+        return max(1, math.ceil(customers / self.rows_per_page))
+
+    def format_rows(self, rows):
+        """Split a slice of the pivot into (body, total) text lines."""
+        *widths, total_width = self.widths
+        cells = rows.to_numpy(dtype=np.int64).astype(str).astype(object)
+        cells[cells == '0'] = ''
+        lines = []
+        for name, values in zip(rows.index, cells.tolist()):
+            body = str(name)[:MAX_NAME].ljust(self.name_width)
+            body += ''.join(value.center(width) for value, width in zip(values, widths))
+            lines.append((body, values[-1].center(total_width)))
+        return lines
+
+
+def _draw_pivot_page(layout, rows, first, customers, page, pages):
+    """One page of the pivot table: rows are customers first..first+len(rows)-1."""
+    from matplotlib.figure import Figure
+    from matplotlib.patches import Rectangle
+
+    fig = Figure(figsize=PAGE_SIZE)
     fig.patch.set_facecolor('white')
-    
+    fig.text(0.5, 0.96, 'Shipments by Customer and Tag Type',
+             ha='center', va='top', fontsize=18, fontweight='bold', color='#2c3e50')
+    last = first + len(rows)
+    fig.text(0.5, 0.925, f'Page {page} of {pages} - customers {first + 1 if len(rows) else 0}-{last} of {customers}',
+             ha='center', va='top', fontsize=10, color='#7f8c8d')
+
+    row_height, left, table_width = layout.row_height, layout.left, layout.width
+    text_x = left + layout.char_width / 2
+    total_x = text_x + (layout.name_width + sum(layout.widths[:-1])) * layout.char_width
+    total_width = layout.widths[-1] * layout.char_width
+    bottom = TABLE_TOP - (len(rows) + 1) * row_height
+
+    # Header band, alternate row stripes and the shaded Total column
+    fig.patches.append(Rectangle((left, TABLE_TOP - row_height), table_width, row_height,
+                                 facecolor='#667eea', edgecolor='none', transform=fig.transFigure))
+    for i in range(2, len(rows) + 1, 2):
+        fig.patches.append(Rectangle((left, TABLE_TOP - (i + 1) * row_height), table_width, row_height,
+                                     facecolor='#f8f9fa', edgecolor='none', transform=fig.transFigure))
+    if len(rows):
+        fig.patches.append(Rectangle((total_x, bottom), total_width, TABLE_TOP - row_height - bottom,
+                                     facecolor='#e9ecef', edgecolor='none', transform=fig.transFigure))
+
+    text = dict(va='center', fontsize=layout.fontsize, fontfamily='monospace', color='#2c3e50')
+    header = 'Customer'.ljust(layout.name_width)
+    header += ''.join(label.center(width) for label, width in zip(layout.labels, layout.widths))
+    fig.text(text_x, TABLE_TOP - row_height / 2, header, **dict(text, color='white', fontweight='bold'))
+    for i, (body, total) in enumerate(layout.format_rows(rows), start=1):
+        y = TABLE_TOP - (i + 0.5) * row_height
+        fig.text(text_x, y, body, **text)
+        fig.text(total_x, y, total, fontweight='bold', **text)
+    return fig
+
+
+def _draw_charts(metrics):
+    """Last page: top 10 customers and tag distribution."""
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=PAGE_SIZE)
+    fig.patch.set_facecolor('white')
+
     # Top 10 Customers Bar Chart
-    ax1 = plt.subplot(2, 1, 1)
-    top_customers = pivot_table.head(10).copy()
+    ax1 = fig.add_subplot(2, 1, 1)
+    top_customers = metrics.pivot_table.head(10).copy()
     top_customers = top_customers.drop('Total', axis=1)
-    
+
     # Create stacked bar chart
     x_pos = np.arange(len(top_customers))
     bottom = np.zeros(len(top_customers))
     colors = ['#667eea', '#f5576c', '#00f2fe', '#38f9d7', '#ffa502']
-    
+
     for idx, col in enumerate(top_customers.columns):
         values = top_customers[col].values
         ax1.bar(x_pos, values, bottom=bottom, label=col, 
                color=colors[idx % len(colors)], alpha=0.8)
         bottom += values
-    
+
     ax1.set_xlabel('Customer', fontsize=11, fontweight='bold')
     ax1.set_ylabel('Number of Shipments', fontsize=11, fontweight='bold')
     ax1.set_title('Top 10 Customers by Shipment Volume', 
@@ -239,53 +244,179 @@ with PdfPages(output_file) as pdf:
                         rotation=45, ha='right', fontsize=8)
     ax1.legend(loc='upper right', fontsize=9)
     ax1.grid(axis='y', alpha=0.3)
-    
+
     # Tag Distribution Pie Chart
-    ax2 = plt.subplot(2, 1, 2)
-    tag_totals = df.groupby('Tags').size().sort_values(ascending=False)
-    
+    ax2 = fig.add_subplot(2, 1, 2)
+    tag_totals = metrics.tag_totals
+
     colors_pie = ['#667eea', '#f5576c', '#00f2fe', '#38f9d7', '#ffa502']
     wedges, texts, autotexts = ax2.pie(tag_totals.values, 
                                         labels=tag_totals.index,
                                         autopct='%1.1f%%',
                                         colors=colors_pie[:len(tag_totals)],
                                         startangle=90)
-    
+
     for text in texts:
         text.set_fontsize(10)
         text.set_fontweight('bold')
-    
+
     for autotext in autotexts:
         autotext.set_color('white')
         autotext.set_fontsize(9)
         autotext.set_fontweight('bold')
-    
+
     ax2.set_title('Shipment Distribution by Tag Type', 
                  fontsize=14, fontweight='bold', pad=20, color='#2c3e50')
-    
-    plt.tight_layout()
-    pdf.savefig(fig, bbox_inches='tight')
-    plt.close()
-    
-    # Set PDF metadata
-    d = pdf.infodict()
-    d['Title'] = f'Shipment Dashboard - {today}'
-    d['Author'] = 'Shipment Reporting System'
-    d['Subject'] = 'Daily Shipment Report'
-    d['Keywords'] = 'Shipments, Dashboard, Report'
-    d['CreationDate'] = datetime.now()
 
-print(f"\n[SUCCESS] PDF Dashboard created successfully: {output_file}")
-print(f"\n[METRICS] Key Metrics:")
-print(f"   - Shipments Created Today: {total_today}")
-print(f"   - Total Shipments (All Time): {total_all}")
-print(f"   - Today's Percentage: {increase_pct:.1f}%")
-print(f"   - Most Shipped Vehicle: {most_shipped_vehicle_name} ({most_shipped_vehicle_count} units)")
-print(f"   - Average Distance: {weighted_avg_distance:.2f} miles")
-print(f"\n[INFO] Open the PDF file to view your dashboard report!")
+    fig.tight_layout()
+    return fig
+
+
+def _pdf_pages(metrics, layout):
+    """Describe every page as (drawer, arguments, rcParams, savefig options), in order.
+
+    Table pages carry only their own slice of the pivot, so a worker
+    process is sent a few dozen rows rather than the whole table.
+    """
+    pivot_table = metrics.pivot_table
+    customers = len(pivot_table)
+    pages = layout.page_count(customers)
+    tight = {'bbox_inches': 'tight'}
+    core_header = _core_encodable(layout.labels)
+    specs = [(_draw_summary, (metrics,), {}, tight)]
+    for page in range(pages):
+        first = page * layout.rows_per_page
+        rows = pivot_table.iloc[first:first + layout.rows_per_page]
+        rc = CORE_FONTS if core_header and _core_encodable(rows.index) else {}
+        specs.append((_draw_pivot_page, (layout, rows, first, customers, page + 1, pages), rc, {}))
+    specs.append((_draw_charts, (metrics,), {}, tight))
+    return specs
+
+
+def _core_encodable(texts):
+    try:
+        ''.join(map(str, texts)).encode('cp1252')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _save_pages(output_file, specs, metadata=None):
+    """Draw pages into one PDF file; returns its name."""
+    import matplotlib
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    with PdfPages(output_file) as pdf:
+        for draw, arguments, rc, options in specs:
+            with matplotlib.rc_context(rc):
+                pdf.savefig(draw(*arguments), **options)
+        if metadata:
+            pdf.infodict().update(metadata)
+    return output_file
+
+
+def _render_batch(output_file, specs):
+    """Worker: draw a contiguous run of pages with the Agg backend."""
+    import matplotlib
+    matplotlib.use('Agg')
+    return _save_pages(output_file, specs)
+
+
+def _metadata(today):
+    return {
+        'Title': f'Shipment Dashboard - {today}',
+        'Author': 'Shipment Reporting System',
+        'Subject': 'Daily Shipment Report',
+        'Keywords': 'Shipments, Dashboard, Report',
+        'CreationDate': datetime.now(),
+    }
+
+
+def _have_pypdf():
+    import importlib.util
+    return importlib.util.find_spec('pypdf') is not None
+
+
+def render_pdf(metrics, output_file=None, workers=None, rows_per_page=DEFAULT_ROWS_PER_PAGE):
+    """Write the PDF dashboard and return its file name.
+
+    The pivot is split into pages of rows_per_page customers that repeat
+    the header. With more than one worker (default: number of CPUs) and
+    pypdf installed, contiguous runs of pages are drawn in a process pool
+    and merged in order; otherwise the pages are drawn in this process.
+    """
+    if output_file is None:
+        output_file = f"shipment_dashboard_{metrics.today.strftime('%Y-%m-%d')}.pdf"
+
+    layout = PivotLayout(metrics.pivot_table, rows_per_page)
+    specs = _pdf_pages(metrics, layout)
+    workers = min(workers or os.cpu_count() or 1, len(specs))
+    parallel = workers > 1 and len(specs) - 2 >= PARALLEL_MIN_PAGES
+    if parallel and not _have_pypdf():
+        print("[INFO] pypdf not installed; drawing the PDF pages in one process")
+        parallel = False
+
+    if not parallel:
+        # matplotlib is imported by the page drawers, so only PDF runs pay for it
+        return _save_pages(output_file, specs, _metadata(metrics.today))
+
+    from concurrent.futures import ProcessPoolExecutor
+    from pypdf import PdfWriter
+    # Loaded before the pool starts so forked workers inherit it
+    import matplotlib.backends.backend_pdf
+
+    # Two runs of pages per worker evens out pages of unequal cost
+    size = math.ceil(len(specs) / (workers * 2))
+    batches = [specs[i:i + size] for i in range(0, len(specs), size)]
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as tmp:
+        parts = [os.path.join(tmp, f'part{i:04d}.pdf') for i in range(len(batches))]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            parts = list(pool.map(_render_batch, parts, batches))
+
+        writer = PdfWriter()
+        for part in parts:
+            writer.append(part)
+        metadata = _metadata(metrics.today)
+        metadata['CreationDate'] = metadata['CreationDate'].strftime("D:%Y%m%d%H%M%S")
+        writer.add_metadata({f'/{key}': value for key, value in metadata.items()})
+        with open(output_file, 'wb') as f:
+            writer.write(f)
+    return output_file
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the PDF shipment dashboard from the newest EOD CSV export.")
+    add_pdf_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Generate the dashboard for parsed options (see shipment_options.add_pdf_arguments)."""
+    csv_file, _ = resolve_inputs(args.input)
+    try:
+        df, initial_count, cached = load_eod(csv_file, projected=args.projected, engine=args.engine,
+                                             cache=open_cache(args))
+        print(f"[OK] Loaded {initial_count} records from {csv_file}{' (cached)' if cached else ''}")
+    except Exception as e:
+        print(f"[ERROR] Failed to read file: {e}")
+        sys.exit(1)
+
+    metrics = compute_dashboard(df, initial_count)
+    print(f"[OK] Filtered out {metrics.initial_count - metrics.filtered_count} records with 'Quote' tag")
+    print(f"[OK] Working with {metrics.filtered_count} records")
+    print(f"[OK] Latest date in data: {metrics.today}")
+    print(f"[OK] Pivot table created with {len(metrics.pivot_table)} customers and {len(metrics.pivot_table.columns)-1} tag types")
 
+    output_file = render_pdf(metrics, args.output, args.workers, args.rows_per_page)
 
+    print(f"\n[SUCCESS] PDF Dashboard created successfully: {output_file}")
+    print_key_metrics(metrics)
+    print(f"\n[INFO] Open the PDF file to view your dashboard report!")
 
 
+def main(argv=None):
+    run(parse_args(argv))
 
 
+if __name__ == '__main__':
+    main()
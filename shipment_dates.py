@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+
+from shipment_filters import factorize_column
+
+# Timestamp formats seen in EOD exports, tried when pandas cannot guess one
+# from the first value
+EXPORT_FORMATS = (
+    '%m/%d/%Y %I:%M %p',
+    '%m/%d/%Y %H:%M',
+    '%m/%d/%Y',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%d',
+)
+
+# Day number of missing dates
+MISSING_DAY = np.iinfo(np.int32).min
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+# Formats that parsed earlier columns in this process; tried first, so a
+# streamed export's format is detected once rather than per chunk. The
+# CarMax reader thread shares the list, hence the lock
+_known_formats = []
+_known_formats_lock = threading.Lock()
+
+
+def detect_format(values, sample_size=1000):
+    """strftime format that parses every sampled string in values, or None."""
+    sample = pd.Series(values).dropna()
+    sample = sample[sample.astype(str).str.strip() != ''].head(sample_size).astype(str)
+    if len(sample) == 0:
+        return None
+
+    guessed = guess_datetime_format(sample.iloc[0])
+    with _known_formats_lock:
+        known = list(_known_formats)
+    for fmt in dict.fromkeys(known + [guessed, *EXPORT_FORMATS]):
+        if fmt is None:
+            continue
+        if pd.to_datetime(sample, format=fmt, errors='coerce').notna().all():
+            with _known_formats_lock:
+                if fmt not in _known_formats:
+                    _known_formats.insert(0, fmt)
+            return fmt
+    return None
+
+
+def parse_dates(values):
+    """pd.to_datetime(values) that parses each distinct string only once.
+
+    The format is detected on a sample of the distinct values (see
+    detect_format) and the parsed values are mapped back to the rows
+    through the factorized codes. Falls back to pandas' own inference
+    when no single format fits.
+    """
+    if values.dtype.kind == 'M':
+        return values
+
+    codes, uniques = factorize_column(values)
+    fmt = detect_format(uniques)
+    try:
+        parsed = pd.to_datetime(pd.Series(uniques), format=fmt) if fmt else pd.to_datetime(pd.Series(uniques))
+    except (ValueError, TypeError):
+        parsed = pd.to_datetime(pd.Series(uniques))
+
+    # code -1 (missing) becomes NaT
+    return pd.Series(parsed.array.take(codes, allow_fill=True), index=values.index, name=values.name)
+
+
+def day_numbers(dates):
+    """int32 days since 1970-01-01 of a datetime Series; MISSING_DAY for NaT."""
+    stamps = dates.to_numpy()
+    days = (stamps.astype('datetime64[D]') - _EPOCH).astype(np.int64)
+    days[np.isnat(stamps)] = MISSING_DAY
+    return days.astype(np.int32)
+
+
+def day_number(value):
+    """Day number of one timestamp or date."""
+    return int((np.datetime64(pd.Timestamp(value), 'D') - _EPOCH).astype(np.int64))
+
+
+def day_dates(days):
+    """datetime.date objects for an array of day numbers (not MISSING_DAY)."""
+    return list((_EPOCH + np.asarray(days, dtype=np.int64)).astype(object))
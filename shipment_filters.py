@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+OPERATORS = ('contains', 'equals', 'blank')
+
+
+class Rule:
+    """A row predicate on one column, evaluated once per distinct value.
+
+    op is 'contains' (case-insensitive literal substring), 'equals'
+    (case-insensitive) or 'blank' (missing, empty or whitespace only).
+    Missing and non-text values never contain or equal anything. negate
+    inverts the result, e.g. to exclude the rows that match.
+    """
+
+    __slots__ = ('column', 'op', 'value', 'negate')
+
+    def __init__(self, column, op, value=None, negate=False):
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown filter operator: {op}")
+        self.column = column
+        self.op = op
+        self.value = value.lower() if isinstance(value, str) else value
+        self.negate = negate
+
+    def __repr__(self):
+        return f"Rule({self.column!r}, {self.op!r}, {self.value!r}, negate={self.negate})"
+
+    def matches(self, value):
+        if self.op == 'blank':
+            hit = (not isinstance(value, str) and pd.isna(value)) or (isinstance(value, str) and value.strip() == '')
+        elif not isinstance(value, str):
+            hit = False
+        elif self.op == 'contains':
+            hit = self.value in value.lower()
+        else:
+            hit = value.lower() == self.value
+        return hit != self.negate
+
+
+def rules_from_config(specs):
+    """Rules from a list of dicts, e.g. loaded from JSON:
+    [{"column": "Tags", "op": "contains", "value": "Quote", "negate": true}]
+    """
+    return [Rule(**spec) for spec in specs]
+
+
+def factorize_column(values):
+    """(codes, distinct values) of a column; missing values get code -1.
+
+    Categorical columns (projected ingest) reuse their codes, so only their
+    categories are ever looked at.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy(), values.cat.categories
+    return pd.factorize(values)
+
+
+def rule_lookup(rule, uniques):
+    # One result per distinct value, plus a trailing entry for code -1 (missing)
+    hits = np.fromiter((rule.matches(value) for value in uniques), dtype=bool, count=len(uniques))
+    return np.append(hits, rule.matches(np.nan))
+
+
+def row_mask(df, rules):
+    """Boolean array of the rows of df that satisfy every rule.
+
+    Each referenced column is factorized once; the rules are evaluated on
+    its distinct values and mapped back to the rows through the codes, so
+    the per-row work is a single integer lookup per rule.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    factorized = {}
+    for rule in rules:
+        if rule.column not in factorized:
+            factorized[rule.column] = factorize_column(df[rule.column])
+        codes, uniques = factorized[rule.column]
+        mask &= rule_lookup(rule, uniques)[codes]
+    return mask
+
+
+def apply_rules(df, rules):
+    """The rows of df that satisfy every rule."""
+    return df[row_mask(df, rules)]
+
+
+def arrow_row_mask(batch, rules):
+    """row_mask for a pyarrow RecordBatch of string columns.
+
+    Each column is dictionary-encoded per batch, so the rules again only
+    look at distinct values and no pandas objects are built.
+    """
+    import pyarrow.compute as pc
+
+    mask = np.ones(batch.num_rows, dtype=bool)
+    factorized = {}
+    for rule in rules:
+        if rule.column not in factorized:
+            encoded = batch.column(rule.column).dictionary_encode()
+            codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False)
+            factorized[rule.column] = codes, encoded.dictionary.to_pylist()
+        codes, uniques = factorized[rule.column]
+        mask &= rule_lookup(rule, uniques)[codes]
+    return mask
@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+
+from shipment_metrics import appearance_counts
+from shipment_options import DEFAULT_VEHICLE_COUNTERS
+
+
+class SpaceSaving:
+    """Bounded-memory counts of the most frequent values of a stream.
+
+    At most `capacity` values keep a counter (the Space-Saving summary).
+    While the stream has no more distinct values than that, every count is
+    exact and floor is 0. Past it, the smallest counters are evicted
+    and the bounds below hold:
+
+    - count - error <= true count <= count for every counted value
+    - a value without a counter occurred at most floor times
+
+    update() counts a chunk exactly and merges it in; merge() combines
+    summaries of different chunks or processes under the same bounds.
+    Counters stay in order of first appearance, so a stable sort by count
+    breaks ties the way value_counts() does.
+    """
+
+    __slots__ = ('capacity', 'counts', 'errors', 'floor', 'total')
+
+    def __init__(self, capacity=DEFAULT_VEHICLE_COUNTERS):
+        self.capacity = capacity
+        self.counts = pd.Series([], dtype=np.int64)
+        self.errors = pd.Series([], dtype=np.int64)
+        self.floor = 0
+        self.total = 0
+
+    @property
+    def exact(self):
+        return self.floor == 0
+
+    def update(self, values):
+        """Count a Series of values; missing values are skipped."""
+        chunk = SpaceSaving(self.capacity)
+        chunk.counts = appearance_counts(values).astype(np.int64)
+        chunk.errors = pd.Series(0, index=chunk.counts.index, dtype=np.int64)
+        chunk.total = int(chunk.counts.sum())
+        chunk._evict()
+        return self.merge(chunk)
+
+    def merge(self, other):
+        # A value one side has no counter for may have occurred up to that
+        # side's floor times: it counts as floor, all of it possible error
+        new = other.counts.index[~other.counts.index.isin(self.counts.index)]
+        keys = self.counts.index.append(new)
+        self.counts = self.counts.reindex(keys, fill_value=self.floor) + other.counts.reindex(keys, fill_value=other.floor)
+        self.errors = self.errors.reindex(keys, fill_value=self.floor) + other.errors.reindex(keys, fill_value=other.floor)
+        self.floor += other.floor
+        self.total += other.total
+        self._evict()
+        return self
+
+    def _evict(self):
+        if len(self.counts) <= self.capacity:
+            return
+        # Keep the largest counters (earlier values win ties) in their order
+        order = np.argsort(-self.counts.to_numpy(), kind='stable')
+        keep = np.sort(order[:self.capacity])
+        self.floor = max(self.floor, int(self.counts.iloc[order[self.capacity:]].max()))
+        self.counts = self.counts.iloc[keep]
+        self.errors = self.errors.iloc[keep]
+
+    def top(self, k):
+        """The k largest counts, largest first (ties in order of first appearance)."""
+        return self.counts.sort_values(ascending=False, kind='stable').head(k)
+
+    def max_error(self, k):
+        """How much any of the top(k) counts may overstate its value."""
+        return int(self.errors.reindex(self.top(k).index).max()) if len(self.counts) else 0
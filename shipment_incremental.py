@@ -0,0 +1,192 @@
+import hashlib
+import io
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from shipment_cache import PARSER_VERSION
+from shipment_ingest import DASHBOARD_COLUMNS, DASHBOARD_DTYPES
+from shipment_metrics import DISTANCE_COLUMN
+from shipment_streaming import PartialAggregate, DEFAULT_CHUNKSIZE
+from shipment_options import DEFAULT_STATE_FILE, DEFAULT_VEHICLE_COUNTERS
+
+# Bump when the saved aggregates change shape (2: distance sums in the cube,
+# 3: vehicles in a SpaceSaving summary, 4: head/tail prefix fingerprint)
+STATE_VERSION = 4
+
+# Bytes hashed at each end of the processed prefix to recognise it
+FINGERPRINT_WINDOW = 64 * 1024
+
+
+class IncrementalState:
+    """Aggregates of the first `offset` bytes of a cumulative EOD export."""
+
+    __slots__ = (
+        'version',
+        'parser_version',
+        'projected',
+        'header',
+        'offset',
+        'fingerprint',
+        'partial',
+    )
+
+    def __init__(self, header, projected, vehicle_counters=DEFAULT_VEHICLE_COUNTERS):
+        self.version = STATE_VERSION
+        self.parser_version = PARSER_VERSION
+        self.projected = projected
+        self.header = header
+        self.offset = 0
+        self.fingerprint = None
+        self.partial = PartialAggregate(vehicle_counters)
+
+
+class _ByteRange(io.RawIOBase):
+    # File-like view of bytes [start, end) of a file, preceded by prefix, so
+    # pandas can parse the new tail of an export without loading it whole
+    def __init__(self, path, start, end, prefix=b''):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+        self._prefix = prefix
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        n = min(len(buffer), self._remaining)
+        data = self._file.read(n)
+        buffer[:len(data)] = data
+        self._remaining -= len(data)
+        return len(data)
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def _fingerprint(path, length, window=FINGERPRINT_WINDOW):
+    # BLAKE2b of the length and the first and last `window` bytes of
+    # [0, length), or None when the file is shorter. Bounded I/O: a rewrite
+    # of the middle of the prefix alone goes unnoticed, while rewritten or
+    # re-sorted exports change their first rows
+    if os.path.getsize(path) < length:
+        return None
+    digest = hashlib.blake2b(str(length).encode(), digest_size=20)
+    with open(path, 'rb') as f:
+        digest.update(f.read(min(window, length)))
+        tail_start = max(window, length - window)
+        if tail_start < length:
+            f.seek(tail_start)
+            digest.update(f.read(length - tail_start))
+    return digest.hexdigest()
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        return f.readline()
+
+
+def _complete_length(path, start=0, block_size=1024 * 1024):
+    # Offset just past the last complete record, scanning from start (a
+    # record boundary). A newline ends a record only outside quotes, i.e.
+    # after an even number of '"' (an escaped "" keeps the parity), so a
+    # quoted multi-line field is never split. A trailing partial record
+    # (export still being written) is left for the next run
+    end = start
+    quotes = 0
+    with open(path, 'rb') as f:
+        f.seek(start)
+        position = start
+        while block := f.read(block_size):
+            data = np.frombuffer(block, dtype=np.uint8)
+            seen = quotes + np.cumsum(data == ord('"'))
+            boundaries = np.flatnonzero((data == ord('\n')) & (seen % 2 == 0))
+            if len(boundaries):
+                end = position + int(boundaries[-1]) + 1
+            quotes = int(seen[-1])
+            position += len(block)
+    return end
+
+
+def load_state(state_file):
+    if not os.path.exists(state_file):
+        return None
+    try:
+        with open(state_file, 'rb') as f:
+            return pickle.load(f)
+    except Exception as e:
+        print(f"[WARNING] Could not read incremental state {state_file}: {e}")
+        return None
+
+
+def save_state(state, state_file):
+    directory = os.path.dirname(state_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_file = f"{state_file}.tmp{os.getpid()}"
+    with open(tmp_file, 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_file, state_file)
+
+
+def _state_matches(state, header, projected, vehicle_counters, prefix_fingerprint):
+    return (
+        state is not None
+        and getattr(state, 'version', 1) == STATE_VERSION
+        and state.parser_version == PARSER_VERSION
+        and state.projected == projected
+        and state.partial.vehicles.capacity == vehicle_counters
+        and state.header == header
+        and state.fingerprint is not None
+        and state.fingerprint == prefix_fingerprint
+    )
+
+
+def update_incremental(csv_file, state_file=DEFAULT_STATE_FILE, chunksize=DEFAULT_CHUNKSIZE, projected=False,
+                       vehicle_counters=DEFAULT_VEHICLE_COUNTERS):
+    """Fold the rows appended to a cumulative export since the last run.
+
+    The saved state records how many bytes were processed, up to a record
+    boundary, and a fingerprint of the start and end of that prefix. If
+    the file still has the same prefix only the tail is parsed; otherwise
+    the state is rebuilt from the whole file. Returns (metrics, new row
+    count, rebuilt).
+    """
+    header = _read_header(csv_file)
+
+    state = load_state(state_file)
+    prefix_fingerprint = _fingerprint(csv_file, state.offset) if state is not None else None
+    rebuilt = not _state_matches(state, header, projected, vehicle_counters, prefix_fingerprint)
+    if rebuilt:
+        state = IncrementalState(header, projected, vehicle_counters)
+        # The header line is part of the first read, not a prefix to add
+        start, prefix = 0, b''
+    else:
+        start, prefix = state.offset, header
+    end = _complete_length(csv_file, start)
+
+    new_rows = 0
+    if end > max(start, len(header)):
+        read_options = {'chunksize': chunksize}
+        if projected:
+            read_options['usecols'] = DASHBOARD_COLUMNS
+            read_options['dtype'] = {column: dtype for column, dtype in DASHBOARD_DTYPES.items() if column != DISTANCE_COLUMN}
+
+        with io.BufferedReader(_ByteRange(csv_file, start, end, prefix)) as tail:
+            for chunk in pd.read_csv(tail, **read_options):
+                state.partial.fold(chunk)
+                new_rows += len(chunk)
+
+    state.offset = end
+    state.fingerprint = _fingerprint(csv_file, end)
+    save_state(state, state_file)
+
+    return state.partial.to_metrics(), new_rows, rebuilt
@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from shipment_filters import apply_rules, arrow_row_mask
+from shipment_metrics import (
+    DATE_COLUMN, TAGS_COLUMN, CUSTOMER_COLUMN, VIN_COLUMN,
+    VEHICLE_COLUMN, DISTANCE_COLUMN, STATUS_COLUMN, CARMAX_RULES,
+    prepare_eod, carmax_rows, carmax_from_rows, index_carmax_rows,
+)
+
+# The only columns the dashboards read; everything else is for the Raw Data sheet
+DASHBOARD_COLUMNS = [
+    DATE_COLUMN,
+    TAGS_COLUMN,
+    CUSTOMER_COLUMN,
+    VIN_COLUMN,
+    VEHICLE_COLUMN,
+    DISTANCE_COLUMN,
+    STATUS_COLUMN,
+]
+
+# Low-cardinality text columns are loaded as categoricals, Distance as float32
+DASHBOARD_DTYPES = {
+    TAGS_COLUMN: 'category',
+    CUSTOMER_COLUMN: 'category',
+    VEHICLE_COLUMN: 'category',
+    STATUS_COLUMN: 'category',
+    DISTANCE_COLUMN: 'float32',
+}
+
+# The only Update-2 columns the CarMax table reads
+CARMAX_COLUMNS = [CUSTOMER_COLUMN, STATUS_COLUMN, TAGS_COLUMN, DATE_COLUMN, VIN_COLUMN]
+
+# Strings read_csv treats as missing by default (its na_values), so the
+# pyarrow reader turns the same cells into nulls
+NA_STRINGS = [
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+]
+
+# Rows per batch when pyarrow is not installed
+FALLBACK_CHUNKSIZE = 100_000
+
+
+def read_eod(csv_file, projected=False, engine='c'):
+    """Read an EOD export.
+
+    With projected=True only DASHBOARD_COLUMNS are parsed, using the pinned
+    DASHBOARD_DTYPES. engine='pyarrow' selects pyarrow's multithreaded parser.
+    """
+    if not projected:
+        return pd.read_csv(csv_file, engine=engine)
+
+    try:
+        return pd.read_csv(csv_file, engine=engine, usecols=DASHBOARD_COLUMNS, dtype=DASHBOARD_DTYPES)
+    except ValueError:
+        # Distance holds non-numeric values (e.g. "N/A"); parse it as a
+        # categorical and convert each distinct value once instead
+        dtypes = dict(DASHBOARD_DTYPES, **{DISTANCE_COLUMN: 'category'})
+        df = pd.read_csv(csv_file, engine=engine, usecols=DASHBOARD_COLUMNS, dtype=dtypes)
+        distance = df[DISTANCE_COLUMN].cat
+        values = pd.to_numeric(distance.categories.astype(str), errors='coerce').to_numpy(dtype='float32')
+        # Missing values have code -1, which picks the trailing NaN
+        df[DISTANCE_COLUMN] = np.append(values, np.float32('nan'))[distance.codes.to_numpy()]
+        return df
+
+
+def load_eod(csv_file, projected=False, engine='c', cache=None, timer=None):
+    """Read and prepare an EOD export; returns (df, initial_count, from_cache).
+
+    cache is an optional shipment_cache.ParsedFileCache. On a hit the
+    prepared frame is mapped from the cache instead of parsing the CSV.
+    timer is an optional shipment_profile.StageTimer.
+    """
+    path = None
+    if cache is not None:
+        path = cache.path_for(csv_file, f"{'projected' if projected else 'full'}-{engine}")
+        cached = cache.load(path)
+        if cached is not None:
+            df, initial_count = cached
+            if timer is not None:
+                timer.lap('load cached', rows_out=len(df))
+            return df, initial_count, True
+
+    df = read_eod(csv_file, projected=projected, engine=engine)
+    initial_count = len(df)
+    if timer is not None:
+        timer.lap('parse', rows_out=initial_count)
+    df = prepare_eod(df)
+    if timer is not None:
+        timer.lap('filter', rows_in=initial_count, rows_out=len(df))
+
+    if cache is not None:
+        try:
+            cache.store(path, df, initial_count)
+        except Exception as e:
+            print(f"[WARNING] Could not cache parsed file: {e}")
+        if timer is not None:
+            timer.lap('cache store', rows_in=len(df))
+
+    return df, initial_count, False
+
+
+def iter_eod(csv_file, chunksize, projected=False):
+    """Read an EOD export in chunks of chunksize rows (C parser).
+
+    Projected chunks keep the categorical text columns; Distance is left for
+    prepare_eod to coerce, since a float32 pin cannot be retried mid-stream.
+    """
+    if not projected:
+        return pd.read_csv(csv_file, chunksize=chunksize)
+
+    dtypes = {column: dtype for column, dtype in DASHBOARD_DTYPES.items() if column != DISTANCE_COLUMN}
+    return pd.read_csv(csv_file, chunksize=chunksize, usecols=DASHBOARD_COLUMNS, dtype=dtypes)
+
+
+def iter_matching(csv_file, columns, rules, block_size=1 << 22):
+    """Yield the rows of csv_file that pass rules, batch by batch, as frames.
+
+    Only columns are parsed, all as text (missing values as in
+    pd.read_csv). With pyarrow the rules are applied to each Arrow record
+    batch before conversion, so rows that do not match never become pandas
+    objects; otherwise pandas chunks of FALLBACK_CHUNKSIZE rows are
+    filtered.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.csv as pacsv
+    except ImportError:
+        for chunk in pd.read_csv(csv_file, usecols=columns, dtype=str, chunksize=FALLBACK_CHUNKSIZE):
+            yield apply_rules(chunk, rules)
+        return
+
+    reader = pacsv.open_csv(
+        csv_file,
+        read_options=pacsv.ReadOptions(block_size=block_size),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=columns,
+            column_types={column: pa.string() for column in columns},
+            null_values=NA_STRINGS,
+            strings_can_be_null=True,
+        ),
+    )
+    for batch in reader:
+        mask = arrow_row_mask(batch, rules)
+        if mask.any():
+            yield batch.filter(pa.array(mask)).to_pandas()
+
+
+def read_carmax(eod_update2_file, rules=CARMAX_RULES, vin_index=None):
+    """compute_carmax for an Update-2 file, reading only the matching rows.
+
+    Only CARMAX_COLUMNS are parsed and only the distinct (date, VIN) pairs
+    of matching rows are kept, so memory follows the CarMax rows rather
+    than the file. vin_index is updated with those rows (see
+    compute_carmax).
+    """
+    rows = None
+    for batch in iter_matching(eod_update2_file, CARMAX_COLUMNS, rules):
+        # Already filtered; carmax_rows only parses dates and de-duplicates
+        matched = carmax_rows(batch, rules=())
+        rows = matched if rows is None else pd.concat([rows, matched]).drop_duplicates()
+    if rows is None:
+        return pd.DataFrame(), 0
+    if vin_index is not None:
+        index_carmax_rows(vin_index, rows)
+    return carmax_from_rows(rows, vin_index)
+
+
+def read_carmax_in_background(eod_update2_file, rules=CARMAX_RULES, vin_index=None):
+    """Start read_carmax on a worker thread and return its Future.
+
+    pyarrow parses with the GIL released, so the Update-2 file is read
+    while the main export is being parsed instead of after it.
+    """
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(read_carmax, eod_update2_file, rules, vin_index)
+    executor.shutdown(wait=False)
+    return future
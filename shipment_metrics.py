@@ -0,0 +1,429 @@
+import numpy as np
+import pandas as pd
+
+from shipment_filters import Rule, apply_rules
+from shipment_dates import MISSING_DAY, parse_dates, day_numbers, day_number, day_dates
+
+# Columns the dashboards group and count on
+DATE_COLUMN = 'Created Date'
+CUSTOMER_COLUMN = 'Customer Business Name'
+TAGS_COLUMN = 'Tags'
+VIN_COLUMN = 'VIN #'
+VEHICLE_COLUMN = 'Vehicle Info'
+DISTANCE_COLUMN = 'Distance'
+STATUS_COLUMN = 'Vehicle Status'
+# Rows of the Top Vehicles sheet
+TOP_VEHICLES = 10
+
+# Row rules, evaluated once per distinct value (see shipment_filters).
+# Rows kept in every dashboard: remove orders with tag "CSRM, Quote"
+EOD_ROW_RULES = [
+    Rule(TAGS_COLUMN, 'contains', 'Quote', negate=True),
+]
+
+# Update-2 rows counted as CarMax VINs: CarMax, New status and no tags
+CARMAX_RULES = [
+    Rule(CUSTOMER_COLUMN, 'contains', 'CarMax'),
+    Rule(STATUS_COLUMN, 'contains', 'New'),
+    Rule(TAGS_COLUMN, 'blank'),
+]
+
+
+class DashboardMetrics:
+    """Every number the HTML, PDF and Excel dashboards display for one EOD export."""
+
+    __slots__ = (
+        'today',
+        'first_date',
+        'last_date',
+        'initial_count',
+        'filtered_count',
+        'total_today',
+        'total_all',
+        'increase',
+        'increase_pct',
+        'most_shipped_vehicle_name',
+        'most_shipped_vehicle_count',
+        'weighted_avg_distance',
+        'pivot_table',
+        'pivot_table_today',
+        'tag_totals',
+        'top_vehicles',
+        'top_vehicles_error',
+        'carmax_vins_by_date',
+        'carmax_unique_vins_total',
+        'cube',
+        'week_over_week',
+    )
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    # The CountCube (kept for shipment_warehouse) stays in the process that
+    # built it; pickled copies for render workers carry only what is shown
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'cube'}
+
+    def __setstate__(self, state):
+        for name in self.__slots__:
+            setattr(self, name, state.get(name))
+
+
+def prepare_eod(df, rules=EOD_ROW_RULES):
+    """Apply the dashboard row rules to a freshly read EOD frame.
+
+    Parses Created Date, keeps the rows that pass rules (by default: not
+    tagged 'Quote') and coerces Distance to numbers. The returned frame is
+    what the Raw Data sheet exports.
+    """
+    df[DATE_COLUMN] = parse_dates(df[DATE_COLUMN])
+    df = apply_rules(df, rules)
+
+    return df.assign(**{DISTANCE_COLUMN: pd.to_numeric(df[DISTANCE_COLUMN], errors='coerce')})
+
+
+def appearance_counts(values):
+    """Non-null value counts in order of first appearance (not sorted by count).
+
+    Sorting the result with a stable sort reproduces value_counts(), including
+    its tie order, for both plain and categorical columns.
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.value_counts(sort=False)
+    codes = values.cat.codes.to_numpy()
+    codes = codes[codes >= 0]
+    seen = pd.unique(codes)
+    counts = np.bincount(codes, minlength=len(values.cat.categories))[seen]
+    index = pd.Index(values.cat.categories[seen], name=values.name)
+    return pd.Series(counts, index=index, name='count')
+
+
+# Cubes with at most this many cells are counted with a dense bincount;
+# larger ones are compacted to their occupied cells first
+DENSE_CELLS = 1 << 22
+
+
+def _append_labels(labels, more):
+    # Index.append re-infers the dtype; labels must stay object (or datetime)
+    return pd.Index(np.concatenate([labels.to_numpy(), more.to_numpy()]), dtype=labels.dtype)
+
+
+def _factorize(values):
+    # Integer codes and labels; missing values get a label of their own
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy().astype(np.int64)
+        labels = pd.Index(values.cat.categories.astype(object), dtype=object)
+        missing = codes < 0
+        if missing.any():
+            codes[missing] = len(labels)
+            labels = _append_labels(labels, pd.Index([np.nan], dtype=object))
+        return codes, labels
+    codes, labels = pd.factorize(values, use_na_sentinel=False)
+    if labels.dtype.kind != 'M':
+        labels = pd.Index(labels.astype(object), dtype=object)
+    return codes.astype(np.int64), labels
+
+
+def _count_cells(shape, day_codes, customer_codes, tag_codes, size=None, count=None, distance_sum=None,
+                 distance_count=None):
+    # Sum size, count and the distance sum/count per (day, customer, tag)
+    # cell with bincounts over the combined code; returns the occupied
+    # cells' codes and sums
+    key = (day_codes * shape[1] + customer_codes) * shape[2] + tag_codes
+    dense = shape[0] * shape[1] * shape[2] <= DENSE_CELLS
+    if dense:
+        index, cells = key, shape[0] * shape[1] * shape[2]
+    else:
+        occupied, index = np.unique(key, return_inverse=True)
+        cells = len(occupied)
+
+    sizes = np.bincount(index, weights=size, minlength=cells).astype(np.int64)
+    counts = np.bincount(index, weights=count, minlength=cells).astype(np.int64)
+    distance_sums = np.bincount(index, weights=distance_sum, minlength=cells)
+    distance_counts = np.bincount(index, weights=distance_count, minlength=cells).astype(np.int64)
+    if dense:
+        occupied = np.flatnonzero(sizes)
+        sizes, counts = sizes[occupied], counts[occupied]
+        distance_sums, distance_counts = distance_sums[occupied], distance_counts[occupied]
+    return np.unravel_index(occupied, shape) + (sizes, counts, distance_sums, distance_counts)
+
+
+class CountCube:
+    """Rows, non-null VINs and distances per (day, customer, tag) of a prepared EOD frame.
+
+    Days are int32 day numbers (see shipment_dates). Each key is factorized
+    to integer codes (missing customers, tags and dates keep a code of their
+    own) and the rows are counted in one
+    bincount pass. Only occupied cells are stored. Both pivots, the tag
+    distribution and the totals are reductions of the cube, and merge()
+    combines cubes built from different chunks.
+    """
+
+    __slots__ = (
+        'days',
+        'customers',
+        'tags',
+        'day_codes',
+        'customer_codes',
+        'tag_codes',
+        'size',
+        'count',
+        'distance_sum',
+        'distance_count',
+    )
+
+    def __init__(self, days, customers, tags, day_codes, customer_codes, tag_codes, size, count,
+                 distance_sum, distance_count):
+        self.days = days
+        self.customers = customers
+        self.tags = tags
+        self.day_codes = day_codes
+        self.customer_codes = customer_codes
+        self.tag_codes = tag_codes
+        self.size = size
+        self.count = count
+        self.distance_sum = distance_sum
+        self.distance_count = distance_count
+
+    @property
+    def shape(self):
+        return len(self.days), len(self.customers), len(self.tags)
+
+    def total(self, day=None):
+        """Rows overall, or on one day (a Timestamp or date)."""
+        return int(self.size[self._on_day(day)].sum())
+
+    def merge(self, other):
+        # Labels are unioned in order of first appearance and the other
+        # cube's codes remapped onto them
+        labels = []
+        codes = []
+        for mine, theirs, my_codes, their_codes in (
+            (self.days, other.days, self.day_codes, other.day_codes),
+            (self.customers, other.customers, self.customer_codes, other.customer_codes),
+            (self.tags, other.tags, self.tag_codes, other.tag_codes),
+        ):
+            union = _append_labels(mine, theirs[mine.get_indexer(theirs) < 0])
+            labels.append(union)
+            codes.append(np.concatenate([my_codes, union.get_indexer(theirs)[their_codes]]))
+
+        shape = tuple(len(label) for label in labels)
+        sums = {name: np.concatenate([getattr(self, name), getattr(other, name)])
+                for name in ('size', 'count', 'distance_sum', 'distance_count')}
+        return CountCube(*labels, *_count_cells(shape, *codes, **sums))
+
+    def pivot(self, day=None):
+        """Count of VIN by customer and tag, optionally for one day.
+
+        Same shape and ordering as pd.pivot_table(..., aggfunc='count',
+        fill_value=0) followed by a descending sort on the Total column.
+        """
+        keep = (
+            self._on_day(day)
+            & self.customers.notna()[self.customer_codes]
+            & self.tags.notna()[self.tag_codes]
+        )
+        rows, row_index = self._sorted_labels(self.customers, self.customer_codes[keep])
+        columns, column_index = self._sorted_labels(self.tags, self.tag_codes[keep])
+
+        values = np.bincount(row_index * len(columns) + column_index, weights=self.count[keep],
+                             minlength=len(rows) * len(columns))
+        pivot = pd.DataFrame(
+            values.astype(np.int64).reshape(len(rows), len(columns)),
+            index=rows.rename(CUSTOMER_COLUMN),
+            columns=columns.rename(TAGS_COLUMN),
+        )
+        pivot['Total'] = pivot.sum(axis=1)
+        return pivot.sort_values('Total', ascending=False)
+
+    def tag_totals(self):
+        """Rows per tag (missing tags left out), largest first."""
+        keep = self.tags.notna()[self.tag_codes]
+        tags, tag_index = self._sorted_labels(self.tags, self.tag_codes[keep])
+        totals = np.bincount(tag_index, weights=self.size[keep], minlength=len(tags)).astype(np.int64)
+        return pd.Series(totals, index=tags.rename(TAGS_COLUMN), name='size').sort_values(ascending=False)
+
+    def _on_day(self, day):
+        if day is None:
+            return np.ones(len(self.size), dtype=bool)
+        return self.day_codes == self.days.get_indexer([day_number(day)])[0]
+
+    @staticmethod
+    def _sorted_labels(labels, codes):
+        # The labels used by codes in sorted order (as groupby sorts them),
+        # and each code's position among them
+        used = np.unique(codes)
+        used = used[labels[used].argsort()]
+        position = np.empty(len(labels), dtype=np.int64)
+        position[used] = np.arange(len(used))
+        return labels[used], position[codes]
+
+
+def count_cube(df):
+    """Build the CountCube of a prepared EOD frame (see CountCube)."""
+    day_codes, days = _factorize(pd.Series(day_numbers(df[DATE_COLUMN])))
+    customer_codes, customers = _factorize(df[CUSTOMER_COLUMN])
+    tag_codes, tags = _factorize(df[TAGS_COLUMN])
+    shape = (len(days), len(customers), len(tags))
+    vins = df[VIN_COLUMN].notna().to_numpy().astype(np.float64)
+    distances = df[DISTANCE_COLUMN].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(distances)
+    return CountCube(days, customers, tags, *_count_cells(shape, day_codes, customer_codes, tag_codes, count=vins,
+                                                          distance_sum=np.where(present, distances, 0.0),
+                                                          distance_count=present.astype(np.float64)))
+
+
+def carmax_rows(df_update2, rules=CARMAX_RULES):
+    """Distinct (Created Date, VIN #) pairs of the Update-2 rows that pass rules.
+
+    The default rules select CarMax orders with New status and no tags.
+    """
+    carmax_new_no_tags = apply_rules(df_update2, rules)
+
+    # Days are kept as int32 day numbers until carmax_from_rows; customer and
+    # status are kept for the VIN index
+    return pd.DataFrame({
+        'Created Date': day_numbers(parse_dates(carmax_new_no_tags[DATE_COLUMN])),
+        VIN_COLUMN: carmax_new_no_tags[VIN_COLUMN],
+        CUSTOMER_COLUMN: carmax_new_no_tags[CUSTOMER_COLUMN],
+        STATUS_COLUMN: carmax_new_no_tags[STATUS_COLUMN],
+    }).drop_duplicates()
+
+
+def carmax_from_rows(rows, vin_index=None):
+    """Unique VINs per Created Date and overall from carmax_rows() output.
+
+    With a shipment_vin_index.VinIndex that already holds these rows, the
+    per-date table also splits the VINs into 'New VINs' (first seen on that
+    date in any indexed export) and 'Repeat VINs'.
+    """
+    carmax_vins_by_date = pd.DataFrame()
+    carmax_unique_vins_total = 0
+
+    if len(rows) > 0:
+        # Group by Created Date and count unique VINs
+        dated = rows[rows['Created Date'] != MISSING_DAY]
+        carmax_vins_by_date = dated.groupby('Created Date')[VIN_COLUMN].nunique().reset_index()
+        carmax_vins_by_date.columns = ['Created Date', 'Unique VINs']
+        carmax_vins_by_date = carmax_vins_by_date.sort_values('Created Date')
+
+        if vin_index is not None:
+            first_seen = vin_index.first_seen_days(dated[VIN_COLUMN])
+            new = dated[first_seen == dated['Created Date'].to_numpy()]
+            new_vins = new.drop_duplicates(['Created Date', VIN_COLUMN])['Created Date'].value_counts()
+            carmax_vins_by_date['New VINs'] = (
+                new_vins.reindex(carmax_vins_by_date['Created Date'], fill_value=0).to_numpy())
+            carmax_vins_by_date['Repeat VINs'] = carmax_vins_by_date['Unique VINs'] - carmax_vins_by_date['New VINs']
+
+        carmax_vins_by_date['Created Date'] = day_dates(carmax_vins_by_date['Created Date'])
+
+        # Calculate total unique VINs
+        carmax_unique_vins_total = rows[VIN_COLUMN].nunique()
+
+    return carmax_vins_by_date, carmax_unique_vins_total
+
+
+def compute_carmax(df_update2, vin_index=None):
+    """Unique CarMax VINs with New status and no tags, per Created Date and overall.
+
+    vin_index (a shipment_vin_index.VinIndex) is updated with the rows and
+    adds the new/repeat split; see carmax_from_rows.
+    """
+    rows = carmax_rows(df_update2)
+    if vin_index is not None:
+        index_carmax_rows(vin_index, rows)
+    return carmax_from_rows(rows, vin_index)
+
+
+def index_carmax_rows(vin_index, rows):
+    """Record carmax_rows() output in a VinIndex; returns the number of new VINs."""
+    return vin_index.update(rows[VIN_COLUMN], rows['Created Date'].to_numpy(),
+                            rows[CUSTOMER_COLUMN], rows[STATUS_COLUMN])
+
+
+def metrics_from_counts(cube, vehicle_counts, distance_sum, distance_count,
+                        first_date, last_date, initial_count=None):
+    """Build DashboardMetrics from a CountCube and vehicle counts in order of first appearance.
+
+    Shared by the in-memory and streaming paths so both report identical
+    numbers. The CarMax fields start empty; see compute_carmax.
+    """
+    total_all = cube.total()
+
+    # Get today's date (from the data)
+    today = last_date.date()
+
+    # Pivot tables: Rows = Customer Business Name, Columns = Tags, Values = Count of VIN #
+    pivot_table = cube.pivot()
+    pivot_table_today = cube.pivot(last_date.normalize())
+
+    # Tag distribution
+    tag_totals = cube.tag_totals()
+
+    # Filter for today's shipments
+    total_today = cube.total(last_date.normalize())
+
+    # Calculate increase
+    increase = total_today
+    increase_pct = (increase / total_all * 100) if total_all > 0 else 0
+
+    # Most shipped vehicle
+    vehicle_counts = vehicle_counts.sort_values(ascending=False, kind='stable')
+    most_shipped_vehicle_name = vehicle_counts.index[0] if len(vehicle_counts) > 0 else "N/A"
+    most_shipped_vehicle_count = vehicle_counts.values[0] if len(vehicle_counts) > 0 else 0
+
+    # Weighted average distance
+    weighted_avg_distance = distance_sum / distance_count if distance_count > 0 else float('nan')
+
+    return DashboardMetrics(
+        today=today,
+        first_date=first_date,
+        last_date=last_date,
+        initial_count=total_all if initial_count is None else initial_count,
+        filtered_count=total_all,
+        total_today=total_today,
+        total_all=total_all,
+        increase=increase,
+        increase_pct=increase_pct,
+        most_shipped_vehicle_name=most_shipped_vehicle_name,
+        most_shipped_vehicle_count=most_shipped_vehicle_count,
+        weighted_avg_distance=weighted_avg_distance,
+        pivot_table=pivot_table,
+        pivot_table_today=pivot_table_today,
+        tag_totals=tag_totals,
+        top_vehicles=vehicle_counts.head(TOP_VEHICLES),
+        top_vehicles_error=0,
+        carmax_vins_by_date=pd.DataFrame(),
+        carmax_unique_vins_total=0,
+        cube=cube,
+    )
+
+
+def compute_dashboard(df, initial_count=None):
+    """Compute all dashboard metrics from a prepared EOD frame (see prepare_eod).
+
+    The rows are counted once into a CountCube by day, customer and tag; both
+    pivot tables, the tag distribution and the totals are reductions of it.
+    initial_count is the row count before the Quote filter, used for the
+    "Filtered Out" figures.
+    """
+    distances = df[DISTANCE_COLUMN].astype('float64')
+    return metrics_from_counts(
+        count_cube(df),
+        appearance_counts(df[VEHICLE_COLUMN]),
+        distances.sum(),
+        distances.count(),
+        df[DATE_COLUMN].min(),
+        df[DATE_COLUMN].max(),
+        initial_count,
+    )
+
+
+def print_key_metrics(metrics):
+    print(f"\n[METRICS] Key Metrics:")
+    print(f"   - Shipments Created Today: {metrics.total_today}")
+    print(f"   - Total Shipments (All Time): {metrics.total_all}")
+    print(f"   - Today's Percentage: {metrics.increase_pct:.1f}%")
+    print(f"   - Most Shipped Vehicle: {metrics.most_shipped_vehicle_name} ({metrics.most_shipped_vehicle_count} units)")
+    print(f"   - Average Distance: {metrics.weighted_avg_distance:.2f} miles")
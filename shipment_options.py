@@ -0,0 +1,206 @@
+import os
+
+from shipment_cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES
+from shipment_profile import DEFAULT_REPORT
+from shipment_watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL
+
+# Command-line options shared by the dashboard scripts and shipment_cli.
+# Besides the standard library, only the defaults of shipment_cache,
+# shipment_profile and shipment_watch are imported here (those modules load
+# nothing else at import time), so building a parser, --help and argument
+# errors never pay for pandas, pyarrow, openpyxl or plotting.
+
+ENGINES = ('c', 'pyarrow')
+BACKENDS = ('openpyxl', 'xlsxwriter')
+DEFAULT_CHUNKSIZE = 100_000
+# Vehicles counted exactly by --streaming/--incremental before the Top
+# Vehicles counts become bounded estimates (shipment_heavy_hitters)
+DEFAULT_VEHICLE_COUNTERS = 10_000
+DEFAULT_STATE_FILE = os.path.join(DEFAULT_CACHE_DIR, 'incremental_state.pkl')
+DEFAULT_INDEX_DIR = os.path.join(DEFAULT_CACHE_DIR, 'vin_index')
+DEFAULT_WAREHOUSE = os.path.join(DEFAULT_CACHE_DIR, 'warehouse.sqlite')
+PERIODS = ('day', 'week', 'month')
+DEFAULT_TREND_DAYS = 90
+FORMATS = ('xlsx', 'pdf', 'html')
+TABLE_DATA = ('inline', 'sidecar')
+DEFAULT_ROWS_PER_PAGE = 40
+# Where the Excel dashboard puts the filtered rows: numbered sheets, only
+# the latest day's rows, a compressed file next to the workbook, or nowhere
+RAW_DATA = ('sheets', 'today', 'parquet', 'csv.gz', 'none')
+# Excel's 1,048,576 rows minus the Raw Data title and header rows
+MAX_RAW_SHEET_ROWS = 1_048_576 - 2
+
+
+def add_input_arguments(parser, update2=True, output=True):
+    parser.add_argument('--input', metavar='CSV',
+                        help="main EOD export (default: the newest main CSV in the current directory)")
+    if update2:
+        parser.add_argument('--update2', metavar='CSV',
+                            help="EOD Update-2 export for the CarMax table (default: the newest one next to the main export)")
+    if output:
+        parser.add_argument('--output', metavar='FILE',
+                            help="dashboard file to write (default: shipment_dashboard_YYYY-MM-DD named after the data)")
+
+
+def add_load_arguments(parser, dashboard='dashboard'):
+    parser.add_argument('--projected', action='store_true',
+                        help=f"parse only the columns the {dashboard} needs, with categorical/float32 dtypes")
+    parser.add_argument('--engine', choices=ENGINES, default='c',
+                        help="CSV parser; 'pyarrow' uses pyarrow's multithreaded reader (default: c)")
+
+
+def add_cache_arguments(parser):
+    parser.add_argument('--cache', action='store_true',
+                        help="keep parsed CSVs in the parsed-file cache and reuse them on later runs (needs pyarrow)")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                        help=f"parsed-file cache directory for --cache (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_MAX_BYTES // 1024 ** 2,
+                        help="evict least recently used cache entries beyond this size")
+
+
+def add_raw_data_arguments(parser):
+    parser.add_argument('--raw-data', choices=RAW_DATA, default='sheets',
+                        help="filtered rows in the workbook: 'sheets' (Raw Data, Raw Data 2, ... of --raw-sheet-rows "
+                             "rows), 'today' (only the latest day's rows), 'parquet'/'csv.gz' (the full dataset in a "
+                             "compressed file next to the workbook, linked from the Raw Data sheet) or 'none' "
+                             "(default: sheets)")
+    parser.add_argument('--raw-sheet-rows', type=int, default=MAX_RAW_SHEET_ROWS, metavar='N',
+                        help=f"rows per Raw Data sheet (default and maximum: {MAX_RAW_SHEET_ROWS}, Excel's limit)")
+    parser.add_argument('--no-raw-data', action='store_true',
+                        help="leave out the Raw Data sheet (same as --raw-data none)")
+
+
+def raw_data_policy(args):
+    """The --raw-data policy, with --no-raw-data meaning 'none'."""
+    return 'none' if args.no_raw_data else args.raw_data
+
+
+def add_vin_index_argument(parser):
+    parser.add_argument('--vin-index', nargs='?', const=DEFAULT_INDEX_DIR, metavar='DIR',
+                        help=f"record CarMax VINs in a persistent index and split them into new/repeat per date (default DIR: {DEFAULT_INDEX_DIR})")
+
+
+def add_warehouse_argument(parser):
+    parser.add_argument('--warehouse', nargs='?', const=DEFAULT_WAREHOUSE, metavar='FILE',
+                        help=f"record the run's daily aggregates in a SQLite warehouse for trend reports and add "
+                             f"week-over-week changes to the Excel summary (default FILE: {DEFAULT_WAREHOUSE})")
+
+
+def add_excel_arguments(parser):
+    """Every option of the Excel dashboard (shipment_dashboard_excel.run)."""
+    add_input_arguments(parser)
+    add_load_arguments(parser)
+    parser.add_argument('--backend', choices=BACKENDS, default='openpyxl',
+                        help="workbook writer; 'xlsxwriter' uses its constant_memory mode but writes the Raw Data rows "
+                             "about 4x slower than openpyxl at the same peak memory (default: openpyxl)")
+    parser.add_argument('--batch', metavar='DIR_OR_GLOB',
+                        help="render every dated EOD export (paired with its Update-2 file by date) in parallel")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for --batch (default: number of CPUs)")
+    parser.add_argument('--output-dir', default='.',
+                        help="directory for the --batch/--watch dashboards (default: current directory)")
+    parser.add_argument('--watch', metavar='INBOX',
+                        help="stay running and regenerate the dashboard whenever a new export lands in INBOX")
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE,
+                        help=f"seconds without changes before --watch regenerates (default: {DEFAULT_DEBOUNCE:g})")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help=f"seconds between directory scans when --watch polls (default: {DEFAULT_POLL_INTERVAL:g})")
+    parser.add_argument('--poll', action='store_true',
+                        help="make --watch poll the inbox even where inotify is available (e.g. network shares)")
+    add_raw_data_arguments(parser)
+    parser.add_argument('--streaming', action='store_true',
+                        help="aggregate the CSV in fixed-size chunks so memory stays bounded (no Raw Data sheet)")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                        help=f"rows per chunk in --streaming/--incremental mode (default: {DEFAULT_CHUNKSIZE})")
+    parser.add_argument('--vehicle-counters', type=int, default=DEFAULT_VEHICLE_COUNTERS, metavar='N',
+                        help="distinct vehicles --streaming/--incremental count exactly; beyond N the Top Vehicles "
+                             f"counts are upper bounds with a reported error (default: {DEFAULT_VEHICLE_COUNTERS})")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only parse rows appended to a cumulative export since the last run (no Raw Data sheet)")
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE,
+                        help=f"aggregate state kept between --incremental runs (default: {DEFAULT_STATE_FILE})")
+    add_vin_index_argument(parser)
+    add_warehouse_argument(parser)
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_REPORT, metavar='REPORT',
+                        help=f"time each stage and write a JSON run report (default REPORT: {DEFAULT_REPORT})")
+    parser.add_argument('--profile-memory', action='store_true',
+                        help="with --profile, also trace each stage's own peak allocations (tracemalloc; slower)")
+    parser.add_argument('--profile-stage', metavar='STAGE',
+                        help="with --profile, dump cProfile stats of this stage (e.g. parse, 'sheet: Raw Data', save)")
+    parser.add_argument('--profile-output', metavar='FILE',
+                        help="cProfile stats file for --profile-stage (default: STAGE.prof)")
+    add_cache_arguments(parser)
+
+
+def add_single_arguments(parser):
+    """Options of the PDF and HTML dashboards (one export in, one file out)."""
+    add_input_arguments(parser, update2=False)
+    add_load_arguments(parser)
+    add_cache_arguments(parser)
+
+
+def add_pdf_arguments(parser):
+    """Options of the PDF dashboard (shipment_dashboard_pdf.run)."""
+    add_single_arguments(parser)
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes drawing the customer table pages (default: number of CPUs; "
+                             "needs pypdf to merge them)")
+    parser.add_argument('--rows-per-page', type=int, default=DEFAULT_ROWS_PER_PAGE,
+                        help=f"customers per PDF table page (default: {DEFAULT_ROWS_PER_PAGE})")
+
+
+def add_page_arguments(parser):
+    parser.add_argument('--table-data', choices=TABLE_DATA, default='inline',
+                        help="where the HTML customer table rows go: compressed blocks in the page, or chunk files "
+                             "in a PAGE_rows directory next to it that keep the page size constant (default: inline)")
+    parser.add_argument('--self-contained', action='store_true',
+                        help="inline Plotly.js into the HTML page so it opens without network access")
+    parser.add_argument('--plotly-js', metavar='FILE',
+                        help="Plotly.js bundle to inline (implies --self-contained; default: the one shipped with the plotly package)")
+
+
+def add_html_arguments(parser):
+    """Options of the HTML dashboard (shipment_dashboard.run)."""
+    add_single_arguments(parser)
+    add_page_arguments(parser)
+
+
+def add_render_arguments(parser):
+    """Options of shipment_render.run: several formats from one load."""
+    add_input_arguments(parser, output=False)
+    parser.add_argument('--formats', nargs='+', choices=FORMATS, default=list(FORMATS),
+                        help=f"dashboards to render (default: {' '.join(FORMATS)})")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default: one per format)")
+    parser.add_argument('--output-dir', default='.',
+                        help="directory for the dashboards (default: current directory)")
+    add_load_arguments(parser, 'dashboards')
+    parser.add_argument('--backend', choices=BACKENDS, default='openpyxl',
+                        help="Excel workbook writer (default: openpyxl)")
+    add_raw_data_arguments(parser)
+    add_vin_index_argument(parser)
+    add_warehouse_argument(parser)
+    add_page_arguments(parser)
+    add_cache_arguments(parser)
+
+
+def add_trend_arguments(parser):
+    """Options of the warehouse trend report (shipment_warehouse.run)."""
+    parser.add_argument('--warehouse', default=DEFAULT_WAREHOUSE, metavar='FILE',
+                        help=f"warehouse recorded with --warehouse (default: {DEFAULT_WAREHOUSE})")
+    parser.add_argument('--days', type=int, default=DEFAULT_TREND_DAYS,
+                        help=f"days to report, ending with --end (default: {DEFAULT_TREND_DAYS})")
+    parser.add_argument('--end', metavar='YYYY-MM-DD',
+                        help="last day to report (default: the newest recorded day)")
+    parser.add_argument('--by', choices=PERIODS, default='day',
+                        help="sum the days per day, week (Monday to Sunday) or month (default: day)")
+    parser.add_argument('--customer', metavar='TEXT',
+                        help="only customers whose name contains TEXT (case-insensitive)")
+    parser.add_argument('--tag', metavar='TEXT',
+                        help="only tags containing TEXT (case-insensitive)")
+    parser.add_argument('--carmax', action='store_true',
+                        help="report the CarMax VINs (New status, no tags) instead of shipments")
+    parser.add_argument('--top', type=int, metavar='N',
+                        help="report the N customers with the most shipments over the range instead")
+    parser.add_argument('--csv', metavar='FILE',
+                        help="also write the report to a CSV file")
@@ -0,0 +1,130 @@
+import cProfile
+import json
+import re
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_REPORT = 'dashboard_profile.json'
+# Width of the stage column in print_report
+STAGE_WIDTH = 34
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far in MB, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+class StageTimer:
+    """Wall time, row counts and memory of consecutive pipeline stages.
+
+    lap(name) closes the stage that started at the previous lap (or at
+    construction/restart), so a long function can be split into stages by
+    dropping lap() calls between its sections. Each stage records the
+    process's peak RSS when it ended (a high-water mark, so it only grows)
+    and, with trace_memory, the peak of memory allocated during the stage
+    itself according to tracemalloc, which is exact but slows the run.
+
+    With profile_stage, every stage runs under cProfile and the stats of the
+    stage with that name are written to profile_file (view them with
+    python -m pstats). The profiler's overhead shows in all timings.
+    """
+
+    __slots__ = ('stages', 'trace_memory', 'profile_stage', 'profile_file', '_mark', '_profiler')
+
+    def __init__(self, trace_memory=False, profile_stage=None, profile_file=None):
+        self.stages = []
+        self.trace_memory = trace_memory
+        self.profile_stage = profile_stage
+        self.profile_file = profile_file or re.sub(r'[^\w.-]+', '_', str(profile_stage)) + '.prof'
+        self._profiler = None
+        if trace_memory:
+            tracemalloc.start()
+        self.restart()
+
+    def restart(self):
+        """Start the next stage now, leaving out the time since the last lap."""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        if self.profile_stage is not None:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        self._mark = time.perf_counter()
+
+    def lap(self, name, rows_in=None, rows_out=None):
+        seconds = time.perf_counter() - self._mark
+        if self._profiler is not None:
+            self._profiler.disable()
+            if name == self.profile_stage:
+                self._profiler.dump_stats(self.profile_file)
+
+        rows = rows_in if rows_in is not None else rows_out
+        self.stages.append({
+            'stage': name,
+            'seconds': seconds,
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'rows_per_second': rows / seconds if rows is not None and seconds > 0 else None,
+            'peak_rss_mb': peak_rss_mb(),
+            'traced_peak_mb': tracemalloc.get_traced_memory()[1] / 1024 ** 2 if self.trace_memory else None,
+        })
+        self.restart()
+
+    @contextmanager
+    def stage(self, name):
+        self.restart()
+        yield
+        self.lap(name)
+
+    def close(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler = None
+        if self.trace_memory:
+            tracemalloc.stop()
+            self.trace_memory = False
+
+    def total(self):
+        return sum(stage['seconds'] for stage in self.stages)
+
+    def profiled(self):
+        """True when the profile_stage stage ran and its stats were written."""
+        return any(stage['stage'] == self.profile_stage for stage in self.stages)
+
+    def as_dicts(self):
+        return list(self.stages)
+
+    def report(self, **details):
+        """Machine-readable run report: details plus totals and every stage."""
+        return dict(details, seconds=self.total(), peak_rss_mb=peak_rss_mb(), stages=self.as_dicts())
+
+    def write_report(self, path, **details):
+        with open(path, 'w') as f:
+            json.dump(self.report(**details), f, indent=2, default=str)
+
+    def print_report(self):
+        traced = any(stage['traced_peak_mb'] is not None for stage in self.stages)
+        # The header and the rows share the indent and column widths
+        print("\n[PROFILE] Stage timings:")
+        header = f"   {'Stage':<{STAGE_WIDTH}} {'Seconds':>9} {'Rows/s':>11} {'Peak RSS MB':>12}"
+        print(f"{header} {'Stage peak MB':>13}" if traced else header)
+        for stage in self.stages:
+            rate = stage['rows_per_second']
+            line = (f"   {stage['stage']:<{STAGE_WIDTH}} {stage['seconds']:>9.3f} "
+                    f"{'-' if rate is None else f'{rate:,.0f}':>11} {_mb(stage['peak_rss_mb']):>12}")
+            print(f"{line} {_mb(stage['traced_peak_mb']):>13}" if traced else line)
+        print(f"   {'total':<{STAGE_WIDTH}} {self.total():>9.3f}")
+
+
+def _mb(value):
+    return '-' if value is None else f"{value:.0f}"
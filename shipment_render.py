@@ -0,0 +1,166 @@
+import argparse
+import importlib
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from shipment_metrics import compute_dashboard, print_key_metrics
+from shipment_ingest import load_eod, read_carmax_in_background
+from shipment_batch import resolve_inputs
+from shipment_options import add_render_arguments, raw_data_policy
+
+# Format -> (module, renderer). Each module is imported only in the worker
+# that renders it, so neither the parent nor the other workers pay for
+# openpyxl, matplotlib or plotly
+RENDERERS = {
+    'xlsx': ('shipment_dashboard_excel', 'render_excel'),
+    'pdf': ('shipment_dashboard_pdf', 'render_pdf'),
+    'html': ('shipment_dashboard', 'render_html'),
+}
+
+
+def render_format(fmt, metrics, output_file=None, raw_data=None, backend='openpyxl', plotly_js=None,
+                  table_data='inline'):
+    """Render one format from precomputed metrics; returns (file, seconds).
+
+    raw_data is (csv_file, engine, cache_dir, cache_max_bytes, raw_policy,
+    raw_sheet_rows) for the Excel Raw Data sheet, or None to leave that
+    sheet out. The frame is mapped
+    from the parse cache in this process rather than sent by the caller.
+    plotly_js and table_data are passed to the HTML renderer.
+    """
+    start = time.perf_counter()
+    module_name, function_name = RENDERERS[fmt]
+    render = getattr(importlib.import_module(module_name), function_name)
+
+    if fmt == 'xlsx':
+        df, raw_options = None, {}
+        if raw_data is not None:
+            csv_file, engine, cache_dir, cache_max_bytes, raw_policy, raw_sheet_rows = raw_data
+            cache = None
+            if cache_dir:
+                from shipment_cache import ParsedFileCache
+                cache = ParsedFileCache(cache_dir, cache_max_bytes)
+            df = load_eod(csv_file, engine=engine, cache=cache)[0]
+            raw_options = dict(raw_policy=raw_policy, raw_sheet_rows=raw_sheet_rows)
+        output_file = render(metrics, df, output_file, backend=backend, **raw_options)
+    elif fmt == 'html':
+        output_file = render(metrics, output_file, plotly_js, table_data)
+    else:
+        output_file = render(metrics, output_file)
+    return output_file, time.perf_counter() - start
+
+
+def render_formats(metrics, formats, output_dir='.', raw_data=None, backend='openpyxl', workers=None,
+                   plotly_js=None, table_data='inline'):
+    """Render several formats concurrently, one worker process per format.
+
+    Workers receive only the pickled DashboardMetrics (plus the Raw Data
+    source for Excel). Results are printed as they finish; returns a list
+    of (format, output file, error) in the order requested.
+    """
+    stem = os.path.join(output_dir, f"shipment_dashboard_{metrics.today.strftime('%Y-%m-%d')}")
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(workers or len(formats), len(formats))) as pool:
+        futures = {
+            pool.submit(render_format, fmt, metrics, f"{stem}.{fmt}",
+                        raw_data if fmt == 'xlsx' else None, backend, plotly_js, table_data): fmt
+            for fmt in formats
+        }
+        for future in as_completed(futures):
+            fmt = futures[future]
+            try:
+                output_file, seconds = future.result()
+            except Exception as e:
+                print(f"[FAILED] {fmt}: {type(e).__name__}: {e}")
+                results[fmt] = (fmt, None, f"{type(e).__name__}: {e}")
+                continue
+            print(f"[OK] {fmt}: {output_file} ({seconds:.1f}s)")
+            results[fmt] = (fmt, output_file, None)
+    return [results[fmt] for fmt in formats]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load the newest EOD export once and render the Excel, PDF and HTML dashboards in parallel.")
+    add_render_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Render the dashboards for parsed options (see shipment_options.add_render_arguments)."""
+    formats = list(dict.fromkeys(args.formats))
+    plotly_js = None
+    if 'html' in formats and (args.self_contained or args.plotly_js):
+        from shipment_dashboard import plotly_bundle
+        try:
+            plotly_js = plotly_bundle(args.plotly_js)
+        except FileNotFoundError as e:
+            print(f"[ERROR] {e}")
+            sys.exit(1)
+    csv_file, eod_update2_file = resolve_inputs(args.input, args.update2)
+
+    cache = None
+    if args.cache:
+        from shipment_cache import open_cache
+        cache = open_cache(args)
+    cache_max_bytes = args.cache_max_mb * 1024 ** 2
+
+    # Load and aggregate once; the renderers only see the metrics. The
+    # CarMax rows of the Update-2 file are read while the main export parses
+    start = time.perf_counter()
+    vin_index = None
+    if args.vin_index and eod_update2_file:
+        from shipment_vin_index import VinIndex
+        try:
+            vin_index = VinIndex(args.vin_index)
+        except Exception as e:
+            print(f"[WARNING] Could not open VIN index {args.vin_index}: {e}")
+    carmax = read_carmax_in_background(eod_update2_file, vin_index=vin_index) if eod_update2_file else None
+    try:
+        df, initial_count, cached = load_eod(csv_file, projected=args.projected, engine=args.engine, cache=cache)
+        print(f"[OK] Loaded {initial_count} records from {csv_file}{' (cached)' if cached else ''}")
+    except Exception as e:
+        print(f"[ERROR] Failed to read file: {e}")
+        sys.exit(1)
+
+    metrics = compute_dashboard(df, initial_count)
+    del df
+
+    if carmax is not None:
+        try:
+            metrics.carmax_vins_by_date, metrics.carmax_unique_vins_total = carmax.result()
+        except Exception as e:
+            print(f"[WARNING] Could not process EOD Update-2 file: {e}")
+    print(f"[OK] Aggregated {metrics.filtered_count} records in {time.perf_counter() - start:.1f}s")
+    if args.warehouse:
+        from shipment_warehouse import record_run
+        record_run(args.warehouse, metrics, csv_file)
+
+    raw_data = None
+    if 'xlsx' in formats and raw_data_policy(args) != 'none':
+        raw_data = (csv_file, args.engine, args.cache_dir if cache is not None else None, cache_max_bytes,
+                    raw_data_policy(args), args.raw_sheet_rows)
+        if cache is None or args.projected:
+            print("[INFO] The Excel worker parses the CSV again in full for the Raw Data sheet")
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    start = time.perf_counter()
+    results = render_formats(metrics, formats, args.output_dir, raw_data, args.backend, args.workers,
+                             plotly_js, args.table_data)
+
+    failed = [fmt for fmt, _, error in results if error is not None]
+    print(f"\n[SUCCESS] Rendered {len(results) - len(failed)} of {len(results)} formats in {time.perf_counter() - start:.1f}s")
+    print_key_metrics(metrics)
+    if failed:
+        print(f"[FAILED] Could not render: {', '.join(failed)}")
+        sys.exit(1)
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+import pandas as pd
+
+from shipment_metrics import DATE_COLUMN, VEHICLE_COLUMN, DISTANCE_COLUMN, prepare_eod, count_cube, metrics_from_counts
+from shipment_heavy_hitters import SpaceSaving
+from shipment_ingest import iter_eod
+from shipment_options import DEFAULT_CHUNKSIZE, DEFAULT_VEHICLE_COUNTERS
+
+
+class PartialAggregate:
+    """Mergeable dashboard aggregates for part of an EOD export.
+
+    fold() adds a raw chunk as read from the CSV; merge() combines partials
+    built from different chunks or processes. Memory grows with the number of
+    distinct customers, tags and days, not with the row count. Vehicles are
+    counted in a SpaceSaving summary of vehicle_counters counters, exact
+    until there are more distinct vehicles than that.
+    """
+
+    __slots__ = (
+        'initial_count',
+        'cube',
+        'vehicles',
+        'distance_sum',
+        'distance_count',
+        'first_date',
+        'last_date',
+    )
+
+    def __init__(self, vehicle_counters=DEFAULT_VEHICLE_COUNTERS):
+        self.initial_count = 0
+        self.cube = None
+        self.vehicles = SpaceSaving(vehicle_counters)
+        self.distance_sum = 0.0
+        self.distance_count = 0
+        self.first_date = pd.NaT
+        self.last_date = pd.NaT
+
+    def fold(self, chunk):
+        self.initial_count += len(chunk)
+        chunk = prepare_eod(chunk)
+
+        distances = chunk[DISTANCE_COLUMN].astype('float64')
+        self.vehicles.update(chunk[VEHICLE_COLUMN])
+        self._add(
+            count_cube(chunk),
+            distances.sum(),
+            int(distances.count()),
+            chunk[DATE_COLUMN].min(),
+            chunk[DATE_COLUMN].max(),
+        )
+        return self
+
+    def merge(self, other):
+        self.initial_count += other.initial_count
+        self.vehicles.merge(other.vehicles)
+        if other.cube is not None:
+            self._add(other.cube, other.distance_sum, other.distance_count, other.first_date, other.last_date)
+        return self
+
+    def _add(self, cube, distance_sum, distance_count, first_date, last_date):
+        self.cube = cube if self.cube is None else self.cube.merge(cube)
+        self.distance_sum += distance_sum
+        self.distance_count += distance_count
+        # min()/max() skip NaT, so empty chunks leave the range untouched
+        self.first_date = pd.Series([self.first_date, first_date]).min()
+        self.last_date = pd.Series([self.last_date, last_date]).max()
+
+    def to_metrics(self):
+        metrics = metrics_from_counts(
+            self.cube,
+            self.vehicles.counts,
+            self.distance_sum,
+            self.distance_count,
+            self.first_date,
+            self.last_date,
+            self.initial_count,
+        )
+        metrics.top_vehicles_error = self.vehicles.max_error(len(metrics.top_vehicles))
+        return metrics
+
+
+def stream_dashboard(csv_file, chunksize=DEFAULT_CHUNKSIZE, projected=False, vehicle_counters=DEFAULT_VEHICLE_COUNTERS):
+    """Aggregate an EOD export chunk by chunk; returns (metrics, chunk count)."""
+    partial = PartialAggregate(vehicle_counters)
+    chunks = 0
+    for chunk in iter_eod(csv_file, chunksize, projected=projected):
+        partial.fold(chunk)
+        chunks += 1
+    return partial.to_metrics(), chunks
+
@@ -0,0 +1,223 @@
+import argparse
+import itertools
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from shipment_metrics import (
+    DATE_COLUMN, TAGS_COLUMN, CUSTOMER_COLUMN, VIN_COLUMN,
+    VEHICLE_COLUMN, DISTANCE_COLUMN, STATUS_COLUMN,
+)
+
+DEFAULT_DAY = date(2025, 11, 12)
+
+# Rows generated and written at a time; each chunk has its own seeded
+# generator, so a file only depends on the parameters and this size
+CHUNK_ROWS = 250_000
+
+TAG_VOCABULARY = (
+    'CSRM', 'Dealer', 'Fleet', 'Rush', 'Auction', 'Lease Return',
+    'Retail', 'Wholesale', 'Enclosed', 'Inop', 'Expedite', 'Repo',
+)
+CARMAX_CUSTOMERS = ('CarMax Auto Superstores', 'CARMAX #7159', 'Carmax - Wholesale')
+STATUSES = ('New', 'New - Hold', 'Picked Up', 'Delivered', 'Cancelled')
+STATUS_WEIGHTS = (0.35, 0.05, 0.25, 0.30, 0.05)
+MAKES = ('Toyota', 'Honda', 'Ford', 'Chevrolet', 'Nissan', 'Hyundai', 'Kia', 'Subaru',
+         'Jeep', 'Ram', 'GMC', 'BMW', 'Mercedes-Benz', 'Tesla', 'Mazda', 'Volkswagen')
+MODELS = ('Sedan', 'SUV', 'Pickup', 'Coupe', 'Hatchback', 'Van')
+CITIES = tuple(f"City {i:03d}" for i in range(120))
+MAX_DISTANCE = 3000
+
+
+def _zipf_weights(count, skew):
+    # Rank-frequency weights 1 / rank**skew; skew=0 is uniform
+    weights = 1.0 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def tag_combinations(count):
+    """count distinct Tags values: untagged first, then single tags, pairs, ..."""
+    combinations = ['']
+    for size in range(1, len(TAG_VOCABULARY) + 1):
+        for combination in itertools.combinations(TAG_VOCABULARY, size):
+            if len(combinations) >= count:
+                return combinations
+            combinations.append(', '.join(combination))
+    return combinations
+
+
+class ExportSpec:
+    """Shape of a synthetic EOD export pair; see generate_exports."""
+
+    __slots__ = (
+        'rows',
+        'seed',
+        'day',
+        'days',
+        'customers',
+        'customer_skew',
+        'tag_combinations',
+        'quote_share',
+        'carmax_share',
+        'update2_share',
+    )
+
+    def __init__(self, rows, seed=0, day=DEFAULT_DAY, days=30, customers=200, customer_skew=1.1,
+                 tag_combinations=12, quote_share=0.15, carmax_share=0.05, update2_share=0.5):
+        self.rows = rows
+        self.seed = seed
+        self.day = day
+        self.days = days
+        self.customers = customers
+        self.customer_skew = customer_skew
+        self.tag_combinations = tag_combinations
+        self.quote_share = quote_share
+        self.carmax_share = carmax_share
+        self.update2_share = update2_share
+
+    def as_dict(self):
+        return {name: str(getattr(self, name)) if name == 'day' else getattr(self, name) for name in self.__slots__}
+
+    def file_names(self):
+        """(main export, Update-2 export) names, stamped like real exports."""
+        stamp = self.day.strftime('%b-%d-%Y')
+        return f"MB EOD Update_{stamp}-16-16-37.215.csv", f"MB EOD Update-2_{stamp}-16-20-00.000.csv"
+
+
+class _Labels:
+    # The distinct values of every generated column; rows only carry codes
+    def __init__(self, spec):
+        customers = [f"Customer {i:04d}" for i in range(spec.customers)]
+        self.customers = np.array(customers + list(CARMAX_CUSTOMERS), dtype=object)
+        self.customer_weights = _zipf_weights(spec.customers, spec.customer_skew)
+
+        # Quote variants follow the plain combinations: code + len(combinations)
+        combinations = tag_combinations(spec.tag_combinations)
+        quoted = [f"{tags}, Quote" if tags else 'Quote' for tags in combinations]
+        self.tags = np.array(combinations + quoted, dtype=object)
+        self.tag_weights = _zipf_weights(len(combinations), 1.0)
+
+        vehicles = [f"{year} {make} {model}" for year in range(2015, 2026) for make in MAKES for model in MODELS]
+        self.vehicles = np.array(vehicles, dtype=object)
+        self.vehicle_weights = _zipf_weights(len(vehicles), 0.8)
+
+        # One label per minute of the date range
+        first = pd.Timestamp(spec.day - timedelta(days=spec.days - 1))
+        minutes = pd.date_range(first, periods=spec.days * 1440, freq='min')
+        self.dates = minutes.strftime('%m/%d/%Y %I:%M %p').to_numpy(dtype=object)
+
+        self.distances = np.array([str(d) for d in range(1, MAX_DISTANCE + 1)] + ['N/A'], dtype=object)
+        self.statuses = np.array(STATUSES, dtype=object)
+        self.cities = np.array(CITIES, dtype=object)
+
+
+def _column(labels, codes):
+    return pd.Categorical.from_codes(codes, categories=labels, validate=False)
+
+
+def _chunk(spec, labels, start, rows, rng):
+    customer = rng.choice(len(labels.customer_weights), rows, p=labels.customer_weights)
+    carmax = rng.random(rows) < spec.carmax_share
+    customer[carmax] = spec.customers + rng.integers(0, len(CARMAX_CUSTOMERS), int(carmax.sum()))
+
+    tags = rng.choice(len(labels.tag_weights), rows, p=labels.tag_weights)
+    tags[rng.random(rows) < spec.quote_share] += len(labels.tag_weights)
+
+    distance = np.minimum(rng.gamma(2.0, 350.0, rows).astype(np.int64), MAX_DISTANCE - 1)
+    distance[rng.random(rows) < 0.01] = MAX_DISTANCE
+
+    # VINs are drawn from a pool the size of the export, so some repeat
+    vins = pd.Series(rng.integers(0, max(spec.rows, 1), rows)).astype(str).str.zfill(12)
+
+    return pd.DataFrame({
+        'Order ID': np.arange(start, start + rows) + 1_000_000,
+        DATE_COLUMN: _column(labels.dates, rng.integers(0, len(labels.dates), rows)),
+        TAGS_COLUMN: _column(labels.tags, tags),
+        CUSTOMER_COLUMN: _column(labels.customers, customer),
+        VIN_COLUMN: '1SYN0' + vins,
+        VEHICLE_COLUMN: _column(labels.vehicles, rng.choice(len(labels.vehicles), rows, p=labels.vehicle_weights)),
+        DISTANCE_COLUMN: _column(labels.distances, distance),
+        STATUS_COLUMN: _column(labels.statuses, rng.choice(len(STATUSES), rows, p=STATUS_WEIGHTS)),
+        'Pickup City': _column(labels.cities, rng.integers(0, len(CITIES), rows)),
+        'Delivery City': _column(labels.cities, rng.integers(0, len(CITIES), rows)),
+        'Price': np.round(rng.gamma(2.0, 400.0, rows), 2),
+    })
+
+
+def generate_exports(spec, output_dir='.'):
+    """Write the main and Update-2 exports described by spec; returns both paths.
+
+    The files are written CHUNK_ROWS at a time, so memory stays flat up to
+    10M+ rows. Customers follow a Zipf distribution (customer_skew, 0 is
+    uniform), Tags take tag_combinations distinct values plus their Quote
+    variants (quote_share of rows), and carmax_share of rows belong to
+    CarMax customers. The Update-2 export is update2_share of the main rows
+    with their status re-drawn and a tenth of their tags blanked.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    main_name, update2_name = spec.file_names()
+    main_file = os.path.join(output_dir, main_name)
+    update2_file = os.path.join(output_dir, update2_name)
+    labels = _Labels(spec)
+
+    with open(main_file, 'w', newline='') as main_out, open(update2_file, 'w', newline='') as update2_out:
+        for index, start in enumerate(range(0, spec.rows, CHUNK_ROWS)):
+            rows = min(CHUNK_ROWS, spec.rows - start)
+            rng = np.random.default_rng([spec.seed, index])
+            chunk = _chunk(spec, labels, start, rows, rng)
+            chunk.to_csv(main_out, header=index == 0, index=False)
+
+            update2 = chunk[rng.random(rows) < spec.update2_share].copy()
+            update2[STATUS_COLUMN] = _column(labels.statuses, rng.choice(len(STATUSES), len(update2), p=STATUS_WEIGHTS))
+            untagged = rng.random(len(update2)) < 0.1
+            update2[TAGS_COLUMN] = update2[TAGS_COLUMN].cat.add_categories(['  ']).where(~untagged, '  ')
+            update2.to_csv(update2_out, header=index == 0, index=False)
+
+    return main_file, update2_file
+
+
+def add_spec_arguments(parser):
+    """Add the ExportSpec options (all but the row count) to an argparse parser."""
+    parser.add_argument('--seed', type=int, default=0, help="random seed (default: 0)")
+    parser.add_argument('--day', type=date.fromisoformat, default=DEFAULT_DAY,
+                        help=f"export date, YYYY-MM-DD (default: {DEFAULT_DAY})")
+    parser.add_argument('--days', type=int, default=30, help="days of Created Dates up to --day (default: 30)")
+    parser.add_argument('--customers', type=int, default=200, help="non-CarMax customers (default: 200)")
+    parser.add_argument('--customer-skew', type=float, default=1.1,
+                        help="Zipf exponent of customer volume; 0 is uniform (default: 1.1)")
+    parser.add_argument('--tag-combinations', type=int, default=12,
+                        help="distinct Tags values before Quote variants (default: 12)")
+    parser.add_argument('--quote-share', type=float, default=0.15, help="share of rows tagged Quote (default: 0.15)")
+    parser.add_argument('--carmax-share', type=float, default=0.05, help="share of CarMax rows (default: 0.05)")
+    parser.add_argument('--update2-share', type=float, default=0.5,
+                        help="share of the main rows repeated in the Update-2 export (default: 0.5)")
+
+
+def spec_from_args(args, rows):
+    return ExportSpec(rows, seed=args.seed, day=args.day, days=args.days, customers=args.customers,
+                      customer_skew=args.customer_skew, tag_combinations=args.tag_combinations,
+                      quote_share=args.quote_share, carmax_share=args.carmax_share,
+                      update2_share=args.update2_share)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic MB EOD Update / Update-2 export pair.")
+    parser.add_argument('--rows', type=int, default=100_000, help="rows in the main export (default: 100000)")
+    add_spec_arguments(parser)
+    parser.add_argument('--output-dir', default='.', help="directory for the CSV files (default: current directory)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    start = time.perf_counter()
+    for path in generate_exports(spec_from_args(args, args.rows), args.output_dir):
+        print(f"[OK] Wrote {path} ({os.path.getsize(path) / 1024 ** 2:.1f} MB)")
+    print(f"[SUCCESS] Generated {args.rows} rows in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from shipment_dates import MISSING_DAY
+from shipment_options import DEFAULT_INDEX_DIR
+
+# Bump when the key hashing or the file layout changes
+INDEX_VERSION = 1
+
+_MANIFEST = 'index.json'
+
+# Per-VIN arrays, one .npy file each, all in key order
+_ARRAYS = ('keys', 'first_seen', 'last_seen', 'customer', 'status')
+
+
+def vin_keys(vins):
+    """uint64 keys of VIN strings (stripped, upper-cased).
+
+    A 64-bit hash rather than the VIN itself, so the index is a handful of
+    fixed-width arrays; the chance of two VINs sharing a key is about
+    n**2 / 2**65 (under 1e-7 for a million VINs).
+    """
+    return pd.util.hash_array(_normalize(vins).to_numpy(dtype=object), categorize=False)
+
+
+def _normalize(vins):
+    return pd.Series(vins, dtype='str').reset_index(drop=True).str.strip().str.upper()
+
+
+class VinIndex:
+    """Persistent first/last-seen dates, customer and status of every VIN.
+
+    The index lives in a directory of memory-mapped .npy arrays sorted by
+    VIN key (see vin_keys), so membership is a binary search per VIN and
+    nothing has to be rescanned. Dates are int32 day numbers (see
+    shipment_dates). Customer and status are codes into label lists kept in
+    the manifest, from the latest sighting of the VIN.
+
+    update() writes a new generation of the arrays and then switches the
+    manifest with os.replace, so readers never see a half-written index.
+    There must be only one writer at a time.
+    """
+
+    __slots__ = (
+        'directory',
+        'generation',
+        'keys',
+        'first_seen',
+        'last_seen',
+        'customer',
+        'status',
+        'customers',
+        'statuses',
+    )
+
+    def __init__(self, directory=DEFAULT_INDEX_DIR):
+        self.directory = directory
+        self.generation = 0
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.first_seen = np.empty(0, dtype=np.int32)
+        self.last_seen = np.empty(0, dtype=np.int32)
+        self.customer = np.empty(0, dtype=np.int32)
+        self.status = np.empty(0, dtype=np.int32)
+        self.customers = []
+        self.statuses = []
+
+        manifest_file = os.path.join(directory, _MANIFEST)
+        if not os.path.exists(manifest_file):
+            return
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+        if manifest.get('version') != INDEX_VERSION:
+            raise ValueError(f"VIN index {directory} has version {manifest.get('version')}, expected {INDEX_VERSION}")
+
+        self.generation = manifest['generation']
+        self.customers = manifest['customers']
+        self.statuses = manifest['statuses']
+        for name in _ARRAYS:
+            setattr(self, name, np.load(self._path(name, self.generation), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _path(self, name, generation):
+        return os.path.join(self.directory, f"{name}.{generation}.npy")
+
+    def lookup(self, vins):
+        """Position of each VIN in the index arrays, -1 where it is not indexed.
+
+        The query keys are searched in sorted order, which keeps the binary
+        searches cache friendly; a million VINs take a fraction of a second.
+        """
+        return self._positions(vin_keys(vins))
+
+    def _positions(self, keys):
+        positions = np.full(len(keys), -1, dtype=np.int64)
+        if len(self.keys) == 0 or len(keys) == 0:
+            return positions
+        order = np.argsort(keys)
+        found = np.searchsorted(self.keys, keys[order])
+        found[found == len(self.keys)] = 0
+        hit = self.keys[found] == keys[order]
+        positions[order[hit]] = found[hit]
+        return positions
+
+    def first_seen_days(self, vins):
+        """First-seen day number of each VIN, MISSING_DAY if it is not indexed."""
+        positions = self.lookup(vins)
+        days = np.full(len(positions), MISSING_DAY, dtype=np.int32)
+        known = positions >= 0
+        days[known] = self.first_seen[positions[known]]
+        return days
+
+    def update(self, vins, days, customers=None, statuses=None):
+        """Record sightings of VINs on day numbers and save a new generation.
+
+        Rows without a VIN or a date are ignored. First/last seen are the
+        min/max over all sightings, and customer/status come from the
+        latest one, so the result does not depend on the order exports are
+        indexed in, and indexing an export twice changes nothing.
+        Returns the number of VINs that were not indexed before.
+        """
+        vins = _normalize(vins)
+        days = np.asarray(days, dtype=np.int32)
+        keep = vins.notna().to_numpy() & (vins != '').to_numpy() & (days != MISSING_DAY)
+        keys = vin_keys(vins[keep])
+        days = days[keep]
+        customer = _label_codes(customers, keep, self.customers)
+        status = _label_codes(statuses, keep, self.statuses)
+        if len(keys) == 0:
+            return 0
+
+        # One entry per key: earliest and latest day, labels of the latest row
+        order = np.lexsort((days, keys))
+        keys, days, customer, status = keys[order], days[order], customer[order], status[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)] - 1
+        keys, first, last = keys[starts], days[starts], days[ends]
+        customer, status = customer[ends], status[ends]
+
+        arrays = {name: np.array(getattr(self, name)) for name in _ARRAYS}
+        positions = self._positions(keys)
+        known = positions >= 0
+
+        at = positions[known]
+        arrays['first_seen'][at] = np.minimum(arrays['first_seen'][at], first[known])
+        newer = last[known] >= arrays['last_seen'][at]
+        arrays['last_seen'][at[newer]] = last[known][newer]
+        arrays['customer'][at[newer]] = customer[known][newer]
+        arrays['status'][at[newer]] = status[known][newer]
+
+        new = ~known
+        insert_at = np.searchsorted(arrays['keys'], keys[new])
+        for name, values in zip(_ARRAYS, (keys, first, last, customer, status)):
+            arrays[name] = np.insert(arrays[name], insert_at, values[new])
+
+        self._save(arrays)
+        return int(new.sum())
+
+    def _save(self, arrays):
+        os.makedirs(self.directory, exist_ok=True)
+        generation = self.generation + 1
+        for name in _ARRAYS:
+            np.save(self._path(name, generation), arrays[name])
+
+        manifest = {
+            'version': INDEX_VERSION,
+            'generation': generation,
+            'vins': len(arrays['keys']),
+            'customers': self.customers,
+            'statuses': self.statuses,
+        }
+        manifest_file = os.path.join(self.directory, _MANIFEST)
+        tmp_file = f"{manifest_file}.tmp{os.getpid()}"
+        with open(tmp_file, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_file, manifest_file)
+
+        self.generation = generation
+        for name in _ARRAYS:
+            setattr(self, name, np.load(self._path(name, generation), mmap_mode='r'))
+
+        # Earlier generations; one still mapped by a reader is retried next time
+        current = {os.path.basename(self._path(name, generation)) for name in _ARRAYS}
+        for file_name in os.listdir(self.directory):
+            if file_name.endswith('.npy') and file_name not in current:
+                try:
+                    os.remove(os.path.join(self.directory, file_name))
+                except OSError:
+                    pass
+
+
+def _label_codes(values, keep, labels):
+    # Codes of values in the append-only label list (extended in place); -1 when missing
+    if values is None:
+        return np.full(int(keep.sum()), -1, dtype=np.int32)
+    codes, uniques = pd.factorize(pd.Series(values).reset_index(drop=True)[keep])
+    positions = {label: code for code, label in enumerate(labels)}
+    for label in uniques:
+        if label not in positions:
+            positions[label] = len(labels)
+            labels.append(str(label))
+    lookup = np.append(np.array([positions[label] for label in uniques], dtype=np.int32), np.int32(-1))
+    return lookup[codes]
@@ -0,0 +1,395 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from shipment_dates import MISSING_DAY, day_dates
+from shipment_options import DEFAULT_WAREHOUSE, add_trend_arguments
+
+# Bump when the tables change; stored as SQLite's user_version
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS customers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS exports (
+    report_date TEXT PRIMARY KEY,
+    source TEXT,
+    recorded_at TEXT NOT NULL,
+    first_date TEXT,
+    initial_count INTEGER NOT NULL,
+    filtered_count INTEGER NOT NULL,
+    total_today INTEGER NOT NULL,
+    distance_sum REAL NOT NULL,
+    distance_count INTEGER NOT NULL,
+    most_shipped_vehicle TEXT,
+    most_shipped_vehicle_count INTEGER,
+    carmax_unique_vins INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT PRIMARY KEY,
+    report_date TEXT NOT NULL,
+    shipments INTEGER NOT NULL,
+    vins INTEGER NOT NULL,
+    distance_sum REAL NOT NULL,
+    distance_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_counts (
+    day TEXT NOT NULL,
+    customer_id INTEGER NOT NULL REFERENCES customers (id),
+    tag_id INTEGER NOT NULL REFERENCES tags (id),
+    shipments INTEGER NOT NULL,
+    vins INTEGER NOT NULL,
+    distance_sum REAL NOT NULL,
+    distance_count INTEGER NOT NULL,
+    PRIMARY KEY (day, customer_id, tag_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS daily_counts_customer ON daily_counts (customer_id, day);
+CREATE TABLE IF NOT EXISTS daily_tags (
+    day TEXT NOT NULL,
+    tag_id INTEGER NOT NULL REFERENCES tags (id),
+    shipments INTEGER NOT NULL,
+    vins INTEGER NOT NULL,
+    distance_sum REAL NOT NULL,
+    distance_count INTEGER NOT NULL,
+    PRIMARY KEY (day, tag_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS carmax_daily (
+    day TEXT PRIMARY KEY,
+    report_date TEXT NOT NULL,
+    unique_vins INTEGER NOT NULL,
+    new_vins INTEGER,
+    repeat_vins INTEGER
+);
+"""
+
+# Period start of an ISO day, per --by
+_PERIODS = {
+    'day': "day",
+    'week': "date(day, 'weekday 0', '-6 days')",
+    'month': "strftime('%Y-%m-01', day)",
+}
+
+
+def _contains(text):
+    # LIKE pattern matching text anywhere; its own % and _ are literal
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _sum_lists(sums):
+    # executemany parameters: shipments, VINs and distance counts are whole numbers
+    shipments, vins, distance_sum, distance_count = sums
+    return [np.asarray(shipments).astype(np.int64).tolist(), np.asarray(vins).astype(np.int64).tolist(),
+            np.asarray(distance_sum).tolist(), np.asarray(distance_count).astype(np.int64).tolist()]
+
+
+class Warehouse:
+    """Daily dashboard aggregates of every recorded export, in one SQLite file.
+
+    daily_counts holds shipments, non-null VINs and the distance sum/count
+    per (day, customer, tag), with customers and tags as dimension tables;
+    daily_tags and daily_totals roll them up per (day, tag) and per day;
+    carmax_daily has the CarMax VINs per date and exports one row of
+    headline numbers per export. Days are ISO dates.
+
+    A day's numbers come from the newest export (by report date) that
+    covers it, so exports can be recorded in any order and recording one
+    again changes nothing. Writers take SQLite's lock in turn, so --batch
+    workers can share a warehouse.
+    """
+
+    __slots__ = ('path', 'db')
+
+    def __init__(self, path=DEFAULT_WAREHOUSE, create=True):
+        if not create and not os.path.exists(path):
+            raise FileNotFoundError(f"No warehouse at {path}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.db = sqlite3.connect(path, timeout=60, isolation_level='IMMEDIATE')
+        version = self.db.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0:
+            with self.db:
+                self.db.executescript(_SCHEMA)
+                self.db.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        elif version != SCHEMA_VERSION:
+            raise ValueError(f"Warehouse {path} has version {version}, expected {SCHEMA_VERSION}")
+
+    def close(self):
+        self.db.close()
+
+    def record(self, metrics, source=None):
+        """Upsert an export's aggregates (DashboardMetrics with its cube).
+
+        Returns the number of days whose numbers came from this export.
+        Undated rows only count towards the export's headline numbers.
+        """
+        cube = metrics.cube
+        report_date = metrics.today.isoformat()
+        day_labels = cube.days.to_numpy().astype(np.int64)
+        dated = day_labels != MISSING_DAY
+        day_names = np.array([''] * len(day_labels), dtype=object)
+        day_names[dated] = [day.isoformat() for day in day_dates(day_labels[dated])]
+
+        with self.db:
+            self.db.execute(
+                'INSERT OR REPLACE INTO exports VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (report_date, source, datetime.now().isoformat(timespec='seconds'),
+                 metrics.first_date.date().isoformat() if pd.notna(metrics.first_date) else None,
+                 int(metrics.initial_count), int(metrics.filtered_count), int(metrics.total_today),
+                 float(cube.distance_sum.sum()), int(cube.distance_count.sum()),
+                 str(metrics.most_shipped_vehicle_name), int(metrics.most_shipped_vehicle_count),
+                 int(metrics.carmax_unique_vins_total)))
+
+            # Days this export supplies: not yet recorded, or recorded from an older export
+            days = day_names[dated].tolist()
+            owners = dict(self.db.execute(
+                'SELECT day, report_date FROM daily_totals WHERE day BETWEEN ? AND ?',
+                (min(days), max(days)))) if days else {}
+            own = np.array([name != '' and owners.get(name, '') <= report_date for name in day_names], dtype=bool)
+
+            if own.any():
+                self._replace_days(cube, day_names, own, report_date)
+            self._record_carmax(metrics.carmax_vins_by_date, report_date)
+        return int(own.sum())
+
+    def _replace_days(self, cube, day_names, own, report_date):
+        cells = own[cube.day_codes]
+        customer_ids = self._ids('customers', cube.customers)[cube.customer_codes[cells]]
+        tag_ids = self._ids('tags', cube.tags)[cube.tag_codes[cells]]
+        day_codes = cube.day_codes[cells]
+        sums = [cube.size[cells], cube.count[cells], cube.distance_sum[cells], cube.distance_count[cells]]
+
+        replaced = day_names[own].tolist()
+        for table in ('daily_counts', 'daily_tags'):
+            self.db.executemany(f'DELETE FROM {table} WHERE day = ?', [(day,) for day in replaced])
+
+        # Inserting in primary key order appends to the tables instead of
+        # splitting pages all over them
+        day_rank = day_names.argsort().argsort()
+        order = np.lexsort((tag_ids, customer_ids, day_rank[day_codes]))
+        self.db.executemany(
+            'INSERT INTO daily_counts VALUES (?, ?, ?, ?, ?, ?, ?)',
+            zip(day_names[day_codes[order]].tolist(), customer_ids[order].tolist(), tag_ids[order].tolist(),
+                *_sum_lists(values[order] for values in sums)))
+
+        # Per-day rollups for the tag-only and unfiltered reports
+        names = ['shipments', 'vins', 'distance_sum', 'distance_count']
+        tag_cells = pd.DataFrame(dict(zip(names, sums)))
+        tag_cells = tag_cells.groupby([day_names[day_codes], tag_ids]).sum()
+        self.db.executemany(
+            'INSERT INTO daily_tags VALUES (?, ?, ?, ?, ?, ?)',
+            zip(tag_cells.index.get_level_values(0).tolist(), tag_cells.index.get_level_values(1).tolist(),
+                *_sum_lists(tag_cells[name].to_numpy() for name in names)))
+
+        totals = [np.bincount(day_codes, weights=values, minlength=len(day_names))[own] for values in sums]
+        self.db.executemany(
+            'INSERT OR REPLACE INTO daily_totals VALUES (?, ?, ?, ?, ?, ?)',
+            zip(replaced, [report_date] * len(replaced), *_sum_lists(totals)))
+
+    def _ids(self, table, labels):
+        # Dimension ids of cube labels; missing labels are stored as ''
+        names = ['' if pd.isna(label) else str(label) for label in labels]
+        self.db.executemany(f'INSERT OR IGNORE INTO {table} (name) VALUES (?)', [(name,) for name in names])
+        ids = dict(self.db.execute(f'SELECT name, id FROM {table}'))
+        return np.array([ids[name] for name in names], dtype=np.int64)
+
+    def _record_carmax(self, carmax_vins_by_date, report_date):
+        if len(carmax_vins_by_date) == 0:
+            return
+        count_columns = [carmax_vins_by_date.get(column) for column in ('Unique VINs', 'New VINs', 'Repeat VINs')]
+        rows = [
+            (day.isoformat(), report_date, *(None if values is None else int(values.iloc[i]) for values in count_columns))
+            for i, day in enumerate(carmax_vins_by_date['Created Date'])
+        ]
+        self.db.executemany(
+            'INSERT INTO carmax_daily VALUES (?, ?, ?, ?, ?) ON CONFLICT (day) DO UPDATE SET '
+            'report_date = excluded.report_date, unique_vins = excluded.unique_vins, '
+            'new_vins = excluded.new_vins, repeat_vins = excluded.repeat_vins '
+            'WHERE excluded.report_date >= carmax_daily.report_date', rows)
+
+    def last_day(self):
+        """The newest recorded day (a date), or None for an empty warehouse."""
+        day = self.db.execute('SELECT max(day) FROM daily_totals').fetchone()[0]
+        return date.fromisoformat(day) if day else None
+
+    def trend(self, start, end, period='day', customer=None, tag=None):
+        """Shipments, VINs and average distance per period from start to end (dates).
+
+        customer and tag are case-insensitive substrings. Only a customer
+        filter reads the per-customer counts; the other reports come from
+        the per-day rollups.
+        """
+        where, params = ['day BETWEEN ? AND ?'], [start.isoformat(), end.isoformat()]
+        table = 'daily_counts' if customer is not None else 'daily_tags' if tag is not None else 'daily_totals'
+        if customer is not None:
+            where.append("customer_id IN (SELECT id FROM customers WHERE name LIKE ? ESCAPE '\\')")
+            params.append(_contains(customer))
+        if tag is not None:
+            where.append("tag_id IN (SELECT id FROM tags WHERE name LIKE ? ESCAPE '\\')")
+            params.append(_contains(tag))
+        return self._query(
+            f"SELECT {_PERIODS[period]} AS Period, sum(shipments) AS Shipments, sum(vins) AS VINs, "
+            f"round(sum(distance_sum) / nullif(sum(distance_count), 0), 1) AS 'Avg Distance' "
+            f"FROM {table} WHERE {' AND '.join(where)} GROUP BY Period ORDER BY Period", params)
+
+    def carmax_trend(self, start, end, period='day'):
+        """CarMax VINs (New status, no tags) per period; sums of the per-date unique counts.
+
+        The New/Repeat columns are only there when runs used --vin-index.
+        """
+        report = self._query(
+            f"SELECT {_PERIODS[period]} AS Period, sum(unique_vins) AS 'Unique VINs', "
+            f"sum(new_vins) AS 'New VINs', sum(repeat_vins) AS 'Repeat VINs' "
+            f"FROM carmax_daily WHERE day BETWEEN ? AND ? GROUP BY Period ORDER BY Period",
+            [start.isoformat(), end.isoformat()])
+        return report.dropna(axis=1, how='all')
+
+    def top_customers(self, start, end, limit=10, customer=None, tag=None):
+        """The customers with the most shipments from start to end."""
+        where, params = ['day BETWEEN ? AND ?'], [start.isoformat(), end.isoformat()]
+        if customer is not None:
+            where.append("customer_id IN (SELECT id FROM customers WHERE name LIKE ? ESCAPE '\\')")
+            params.append(_contains(customer))
+        if tag is not None:
+            where.append("tag_id IN (SELECT id FROM tags WHERE name LIKE ? ESCAPE '\\')")
+            params.append(_contains(tag))
+        # Names are joined to the per-customer sums, not to every cell
+        return self._query(
+            f"SELECT c.name AS Customer, Shipments, VINs, round(distance_sum / nullif(distance_count, 0), 1) "
+            f"AS 'Avg Distance' FROM (SELECT customer_id, sum(shipments) AS Shipments, sum(vins) AS VINs, "
+            f"sum(distance_sum) AS distance_sum, sum(distance_count) AS distance_count FROM daily_counts "
+            f"WHERE {' AND '.join(where)} GROUP BY customer_id) JOIN customers c ON c.id = customer_id "
+            f"WHERE c.name != '' ORDER BY Shipments DESC LIMIT ?", params + [limit])
+
+    def week_over_week(self, end, days=7):
+        """The `days` days to end against the `days` before them.
+
+        Returns a frame of Metric, This Week, Last Week, Change and Change %
+        (a fraction), or None when the earlier week has no recorded days.
+        """
+        weeks = []
+        for offset in (0, days):
+            last = end - timedelta(days=offset)
+            first = last - timedelta(days=days - 1)
+            span = (first.isoformat(), last.isoformat())
+            shipments, vins, distance_sum, distance_count, covered = self.db.execute(
+                'SELECT sum(shipments), sum(vins), sum(distance_sum), sum(distance_count), count(*) '
+                'FROM daily_totals WHERE day BETWEEN ? AND ?', span).fetchone()
+            carmax = self.db.execute(
+                'SELECT sum(unique_vins) FROM carmax_daily WHERE day BETWEEN ? AND ?', span).fetchone()[0]
+            weeks.append((covered, [
+                shipments or 0,
+                vins or 0,
+                round(distance_sum / distance_count, 1) if distance_count else float('nan'),
+                carmax or 0,
+            ]))
+        if weeks[1][0] == 0:
+            return None
+
+        this_week, last_week = weeks[0][1], weeks[1][1]
+        frame = pd.DataFrame({
+            'Metric': ['Shipments', 'VINs', 'Avg Distance (miles)', 'CarMax VINs (New, No Tags)'],
+            'This Week': this_week,
+            'Last Week': last_week,
+        })
+        frame['Change'] = (frame['This Week'] - frame['Last Week']).round(1)
+        frame['Change %'] = (frame['Change'] / frame['Last Week']).where(frame['Last Week'] != 0)
+        return frame
+
+    def _query(self, sql, params):
+        return pd.read_sql_query(sql, self.db, params=params)
+
+
+def record_dashboard(path, metrics, source=None):
+    """Record metrics in the warehouse at path and set metrics.week_over_week.
+
+    Returns the number of days the export supplied.
+    """
+    warehouse = Warehouse(path)
+    try:
+        days = warehouse.record(metrics, source)
+        metrics.week_over_week = warehouse.week_over_week(metrics.today)
+    finally:
+        warehouse.close()
+    return days
+
+
+def record_run(path, metrics, source=None):
+    """record_dashboard with console output; a failure only warns."""
+    try:
+        days = record_dashboard(path, metrics, source)
+    except Exception as e:
+        print(f"[WARNING] Could not record the run in warehouse {path}: {e}")
+        return
+    print(f"[OK] Recorded {days} days in warehouse {path}")
+    if metrics.week_over_week is None:
+        print("[INFO] The warehouse has no days from the week before; week-over-week changes left out")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Trend reports from the warehouse of recorded dashboard runs.")
+    add_trend_arguments(parser)
+    return parser.parse_args(argv)
+
+
+def run(args):
+    """Print a trend report for parsed options (see shipment_options.add_trend_arguments)."""
+    start_time = time.perf_counter()
+    try:
+        warehouse = Warehouse(args.warehouse, create=False)
+    except (FileNotFoundError, ValueError, sqlite3.DatabaseError) as e:
+        print(f"[ERROR] {e} (record runs with --warehouse first)")
+        sys.exit(1)
+
+    end = date.fromisoformat(args.end) if args.end else warehouse.last_day()
+    if end is None:
+        print(f"[ERROR] Warehouse {args.warehouse} has no recorded days yet")
+        sys.exit(1)
+    start = end - timedelta(days=args.days - 1)
+
+    if args.top:
+        report = warehouse.top_customers(start, end, args.top, args.customer, args.tag)
+        filters = [f"customer ~ '{args.customer}'" if args.customer else None,
+                   f"tag ~ '{args.tag}'" if args.tag else None]
+        subject = f"Top {args.top} customers" + ''.join(f", {text}" for text in filters if text)
+    elif args.carmax:
+        report = warehouse.carmax_trend(start, end, args.by)
+        subject = f"CarMax VINs per {args.by}"
+    else:
+        report = warehouse.trend(start, end, args.by, args.customer, args.tag)
+        filters = [f"customer ~ '{args.customer}'" if args.customer else None,
+                   f"tag ~ '{args.tag}'" if args.tag else None]
+        subject = f"Shipments per {args.by}" + ''.join(f", {text}" for text in filters if text)
+    warehouse.close()
+    elapsed = (time.perf_counter() - start_time) * 1000
+
+    print(f"[OK] {subject} from {start} to {end}: {len(report)} rows in {elapsed:.0f} ms")
+    if len(report) == 0:
+        print("[INFO] Nothing recorded for that range")
+    else:
+        print(report.to_string(index=False))
+    if args.csv:
+        report.to_csv(args.csv, index=False)
+        print(f"[OK] Report written to {args.csv}")
+
+
+def main(argv=None):
+    run(parse_args(argv))
+
+
+if __name__ == '__main__':
+    main()
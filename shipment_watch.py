@@ -0,0 +1,150 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 5.0
+
+# A file that has not changed for this long is processed even without a
+# trailing newline
+STALE_SECONDS = 30.0
+
+# inotify(7) event masks
+_IN_MODIFY = 0x002
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_CREATE = 0x100
+_EVENT = struct.Struct('iIII')
+
+
+class InotifyWatcher:
+    """Changed file names in a directory from Linux inotify (via libc, no extra package)."""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    def wait(self, timeout=None):
+        """Names changed within timeout seconds (None blocks until something changes)."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        names = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return names
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                names.add(os.fsdecode(data[offset:offset + length].rstrip(b'\0')))
+                offset += length
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed file names in a directory from periodic (size, mtime) snapshots."""
+
+    def __init__(self, directory, interval=DEFAULT_POLL_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for entry in os.scandir(self.directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def wait(self, timeout=None):
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        snapshot = self._scan()
+        names = {name for name, signature in snapshot.items() if self.snapshot.get(name) != signature}
+        self.snapshot = snapshot
+        return names
+
+    def close(self):
+        pass
+
+
+def open_watcher(directory, poll_interval=DEFAULT_POLL_INTERVAL, polling=False):
+    """InotifyWatcher on Linux, else (or when polling is set) PollingWatcher."""
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"[INFO] inotify unavailable ({e}); polling every {poll_interval:g}s instead")
+    return PollingWatcher(directory, poll_interval)
+
+
+def file_ready(path, quiet_seconds):
+    """True when a CSV export looks completely written.
+
+    The caller has seen no change to it for quiet_seconds; it must also end
+    with a newline (a copy still in progress usually stops mid-row), unless
+    it has been left alone for STALE_SECONDS.
+    """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b'\n':
+                return True
+    except OSError:
+        return False
+    return quiet_seconds >= STALE_SECONDS
+
+
+def watch(directory, on_change, debounce=DEFAULT_DEBOUNCE, poll_interval=DEFAULT_POLL_INTERVAL, polling=False):
+    """Call on_change(paths) whenever CSV files in directory settle after changing.
+
+    Bursts are debounced: on_change runs once no CSV has changed for
+    debounce seconds and every changed file is completely written (see
+    file_ready). Exceptions from on_change are reported and the watch goes
+    on. Runs until interrupted.
+    """
+    watcher = open_watcher(directory, poll_interval, polling)
+    pending = {}  # path -> time of its last change
+    try:
+        while True:
+            changed = watcher.wait(debounce if pending else None)
+            now = time.monotonic()
+            for name in changed:
+                if name.lower().endswith('.csv'):
+                    pending[os.path.join(directory, name)] = now
+            if not pending or changed & {os.path.basename(path) for path in pending}:
+                continue
+
+            # Quiet for a whole debounce interval: drop vanished files, wait on partial ones
+            pending = {path: changed_at for path, changed_at in pending.items() if os.path.exists(path)}
+            if not pending or not all(file_ready(path, now - changed_at) for path, changed_at in pending.items()):
+                continue
+            paths = sorted(pending)
+            pending = {}
+            try:
+                on_change(paths)
+            except Exception as e:
+                print(f"[FAILED] {type(e).__name__}: {e}")
+    finally:
+        watcher.close()
@@ -0,0 +1,318 @@
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.chart import BarChart, PieChart, Reference
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+from shipment_xlsx_stream import DEFAULT_CHUNK_ROWS, ILLEGAL_XML, frame_rows_xml, splice_sheet_rows
+
+
+def open_workbook(output_file, backend='openpyxl'):
+    """Return a workbook writer for output_file using the named backend.
+
+    Both backends take the same calls with 1-based rows and columns:
+    add_style(name, font=, fill=, alignment=, border=, number_format=) with
+    openpyxl-style keyword dicts and hex colours, add_sheet(name), then on
+    each sheet write(), write_link(), merge(), set_column_width(),
+    set_row_height(), add_chart() and write_frame(); close() saves the file.
+    """
+    if backend == 'openpyxl':
+        return OpenpyxlWorkbook(output_file)
+    if backend == 'xlsxwriter':
+        return XlsxWriterWorkbook(output_file)
+    raise ValueError(f"Unknown Excel backend: {backend}")
+
+
+def _column_values(values):
+    # Cell values for one column of a frame chunk; missing values are None
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    present = values.notna().to_numpy().copy()
+    kind = values.dtype.kind
+    if kind == 'M':
+        out = np.array(values.dt.to_pydatetime(), dtype=object)
+    elif kind == 'f':
+        present &= np.isfinite(values.to_numpy())
+        out = values.to_numpy(dtype=object)
+    elif pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        out = values.astype(str).str.replace(ILLEGAL_XML, '', regex=True).to_numpy(dtype=object)
+    else:
+        out = values.to_numpy(dtype=object)
+    out[~present] = None
+    return out.tolist()
+
+
+class OpenpyxlWorkbook:
+    """openpyxl backend: styles become shared named styles.
+
+    Frames passed to write_frame are streamed into the sheet XML after the
+    workbook is saved (see shipment_xlsx_stream), not held as cells.
+    """
+
+    def __init__(self, output_file):
+        self.output_file = output_file
+        self.book = Workbook()
+        self.book.remove(self.book.active)
+        self._frames = []
+
+    def add_style(self, name, font=None, fill=None, alignment=None, border=None, number_format=None):
+        if name in self.book.named_styles:
+            return
+        side = Side(style='thin', color=border) if border else None
+        self.book.add_named_style(NamedStyle(
+            name=name,
+            # Cells without an explicit font or border keep the workbook defaults
+            font=Font(**font) if font else DEFAULT_FONT,
+            fill=PatternFill(start_color=fill, end_color=fill, fill_type='solid') if fill else None,
+            alignment=Alignment(**alignment) if alignment else None,
+            border=Border(left=side, right=side, top=side, bottom=side) if side else DEFAULT_BORDER,
+            number_format=number_format,
+        ))
+
+    def add_sheet(self, name):
+        return OpenpyxlSheet(self, self.book.create_sheet(name))
+
+    def close(self):
+        self.book.save(self.output_file)
+        if not self._frames:
+            return
+        sheets = {}
+        for ws, df, first_row, date_style in self._frames:
+            last_cell = f"{get_column_letter(max(len(df.columns), 1))}{first_row + len(df) - 1}"
+            rows = frame_rows_xml(df, first_row=first_row, date_style=date_style)
+            sheets[ws.path] = (rows, f"A1:{last_cell}", first_row)
+        splice_sheet_rows(self.output_file, sheets)
+
+
+class OpenpyxlSheet:
+    def __init__(self, workbook, ws):
+        self._workbook = workbook
+        self.ws = ws
+
+    def write(self, row, column, value, style=None):
+        cell = self.ws.cell(row=row, column=column, value=value)
+        if style is not None:
+            cell.style = style
+
+    def write_link(self, row, column, target, text, style=None):
+        """Write text as a hyperlink to target (a URL or a path relative to the workbook)."""
+        self.write(row, column, text, style)
+        self.ws.cell(row=row, column=column).hyperlink = target
+
+    def merge(self, first_row, first_column, last_row, last_column):
+        self.ws.merge_cells(start_row=first_row, start_column=first_column,
+                            end_row=last_row, end_column=last_column)
+
+    def set_column_width(self, column, width):
+        self.ws.column_dimensions[get_column_letter(column)].width = width
+
+    def set_row_height(self, row, height):
+        self.ws.row_dimensions[row].height = height
+
+    def add_chart(self, kind, anchor, categories, values, title, width=15, height=10,
+                  x_title=None, y_title=None):
+        """Add a 'pie' or 'col' chart.
+
+        categories is (column, first_row, last_row); values is (column,
+        header_row, last_row) with the series name in header_row. width and
+        height are in cm.
+        """
+        if kind == 'pie':
+            chart = PieChart()
+        else:
+            chart = BarChart()
+            chart.type = kind
+        chart.title = title
+        if y_title is not None:
+            chart.y_axis.title = y_title
+        if x_title is not None:
+            chart.x_axis.title = x_title
+
+        data = Reference(self.ws, min_col=values[0], min_row=values[1], max_row=values[2])
+        labels = Reference(self.ws, min_col=categories[0], min_row=categories[1], max_row=categories[2])
+        chart.add_data(data, titles_from_data=True)
+        chart.set_categories(labels)
+        chart.width = width
+        chart.height = height
+        self.ws.add_chart(chart, anchor)
+
+    def write_frame(self, df, first_row, date_style):
+        """Write df's rows from first_row down; must be the sheet's last rows.
+
+        Datetime columns use the named style date_style. The rows are
+        written when the workbook is closed.
+        """
+        # Register the date style on a placeholder cell; the streamed rows
+        # replace everything from first_row on
+        date_style_id = 0
+        date_columns = [idx for idx, column in enumerate(df.columns, start=1) if df[column].dtype.kind == 'M']
+        if date_columns:
+            cell = self.ws.cell(row=first_row, column=date_columns[0])
+            cell.style = date_style
+            date_style_id = cell.style_id
+        self._workbook._frames.append((self.ws, df, first_row, date_style_id))
+
+
+class XlsxWriterWorkbook:
+    """xlsxwriter backend in constant_memory mode (requires xlsxwriter).
+
+    constant_memory only accepts cells in row order, so the small dashboard
+    sheets are buffered and written sorted; write_frame streams its rows
+    straight to xlsxwriter's per-sheet temporary file.
+    """
+
+    def __init__(self, output_file):
+        import xlsxwriter
+
+        self.output_file = output_file
+        self.book = xlsxwriter.Workbook(output_file, {
+            'constant_memory': True,
+            'strings_to_formulas': False,
+            'strings_to_urls': False,
+        })
+        self._formats = {}
+        self._sheets = []
+
+    def add_style(self, name, font=None, fill=None, alignment=None, border=None, number_format=None):
+        if name in self._formats:
+            return
+        properties = {}
+        if font:
+            if font.get('bold'):
+                properties['bold'] = True
+            if font.get('color'):
+                properties['font_color'] = f"#{font['color']}"
+            if font.get('size'):
+                properties['font_size'] = font['size']
+            if font.get('underline'):
+                properties['underline'] = 1
+        if fill:
+            properties.update(pattern=1, bg_color=f'#{fill}')
+        if alignment:
+            if alignment.get('horizontal'):
+                properties['align'] = alignment['horizontal']
+            if alignment.get('vertical'):
+                properties['valign'] = 'vcenter' if alignment['vertical'] == 'center' else alignment['vertical']
+            if alignment.get('wrap_text'):
+                properties['text_wrap'] = True
+        if border:
+            properties.update(border=1, border_color=f'#{border}')
+        if number_format:
+            properties['num_format'] = number_format
+        self._formats[name] = self.book.add_format(properties)
+
+    def add_sheet(self, name):
+        sheet = XlsxWriterSheet(self, self.book.add_worksheet(name))
+        self._sheets.append(sheet)
+        return sheet
+
+    def close(self):
+        for sheet in self._sheets:
+            sheet.flush()
+        self.book.close()
+
+
+class XlsxWriterSheet:
+    def __init__(self, workbook, ws):
+        self._workbook = workbook
+        self.ws = ws
+        self._cells = {}
+        self._links = {}
+        self._merges = {}
+        self._heights = {}
+
+    def write(self, row, column, value, style=None):
+        self._cells[(row - 1, column - 1)] = (value, style)
+
+    def write_link(self, row, column, target, text, style=None):
+        self.write(row, column, text, style)
+        # Local files need xlsxwriter's external: prefix
+        self._links[(row - 1, column - 1)] = target if '://' in target else f'external:{target}'
+
+    def merge(self, first_row, first_column, last_row, last_column):
+        self._merges[(first_row - 1, first_column - 1)] = (last_row - 1, last_column - 1)
+
+    def set_column_width(self, column, width):
+        self.ws.set_column(column - 1, column - 1, width)
+
+    def set_row_height(self, row, height):
+        self._heights[row - 1] = height
+
+    def add_chart(self, kind, anchor, categories, values, title, width=15, height=10,
+                  x_title=None, y_title=None):
+        chart = self._workbook.book.add_chart({'type': 'pie' if kind == 'pie' else 'column'})
+        name = self.ws.get_name()
+        chart.add_series({
+            'name': [name, values[1] - 1, values[0] - 1],
+            'categories': [name, categories[1] - 1, categories[0] - 1, categories[2] - 1, categories[0] - 1],
+            'values': [name, values[1], values[0] - 1, values[2] - 1, values[0] - 1],
+        })
+        chart.set_title({'name': title})
+        if x_title is not None:
+            chart.set_x_axis({'name': x_title})
+        if y_title is not None:
+            chart.set_y_axis({'name': y_title})
+        # cm to pixels at 96 dpi
+        chart.set_size({'width': round(width / 2.54 * 96), 'height': round(height / 2.54 * 96)})
+        self.ws.insert_chart(anchor, chart)
+
+    def flush(self):
+        """Write the buffered cells in row order (merges must be single-row)."""
+        formats = self._workbook._formats
+        merged = {}
+        for (row, column), (last_row, last_column) in self._merges.items():
+            for col in range(column, last_column + 1):
+                merged[(row, col)] = (row, column)
+            self._cells.setdefault((row, column), ('', None))
+
+        current_row = None
+        for row, column in sorted(set(self._cells) | {(row, -1) for row in self._heights}):
+            if row != current_row:
+                current_row = row
+                if row in self._heights:
+                    self.ws.set_row(row, self._heights[row])
+            if column < 0:
+                continue
+            value, style = self._cells[(row, column)]
+            cell_format = formats.get(style)
+            if (row, column) in self._merges:
+                last_row, last_column = self._merges[(row, column)]
+                self.ws.merge_range(row, column, last_row, last_column, value, cell_format)
+            elif (row, column) in self._links:
+                self.ws.write_url(row, column, self._links[(row, column)], cell_format, value)
+            elif merged.get((row, column), (row, column)) == (row, column):
+                self.ws.write(row, column, value, cell_format)
+
+        self._cells, self._links, self._merges, self._heights = {}, {}, {}, {}
+
+    def write_frame(self, df, first_row, date_style, chunk_rows=DEFAULT_CHUNK_ROWS):
+        """Write df's rows from first_row down; must be the sheet's last rows."""
+        self.flush()
+        date_format = self._workbook._formats[date_style]
+        # Runs of non-date columns go through write_row (missing values are
+        # skipped there); dates need the date format and are written singly
+        dates = [col for col, column in enumerate(df.columns) if df[column].dtype.kind == 'M']
+        runs = []
+        for col in range(len(df.columns)):
+            if col in dates:
+                continue
+            if runs and runs[-1][1] == col:
+                runs[-1][1] = col + 1
+            else:
+                runs.append([col, col + 1])
+
+        write_row, write_datetime = self.ws.write_row, self.ws.write_datetime
+        row = first_row - 1
+        for start in range(0, len(df), chunk_rows):
+            chunk = df.iloc[start:start + chunk_rows]
+            columns = [_column_values(chunk[column]) for column in df.columns]
+            for values in zip(*columns):
+                for first, last in runs:
+                    write_row(row, first, values[first:last])
+                for col in dates:
+                    if values[col] is not None:
+                        write_datetime(row, col, values[col], date_format)
+                row += 1
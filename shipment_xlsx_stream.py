@@ -0,0 +1,204 @@
+import copy
+import os
+import re
+import shutil
+import struct
+import tempfile
+import zipfile
+from xml.sax.saxutils import escape
+
+import numpy as np
+import pandas as pd
+from openpyxl.utils import get_column_letter
+
+# Excel's day zero for the 1900 date system
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+DEFAULT_CHUNK_ROWS = 10_000
+
+# Control characters that are not allowed anywhere in an XML document
+ILLEGAL_XML = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def column_widths(df, date_columns=(), date_width=10, chunk_rows=100_000, max_width=50):
+    """Auto-fit widths (longest text + 2, capped) from vectorized string lengths.
+
+    Matches walking every cell and measuring len(str(value)) for non-empty
+    values, but works chunk by chunk on the source columns. Date columns are
+    measured as their displayed mm/dd/yyyy text.
+    """
+    longest = [len(str(column)) for column in df.columns]
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        for idx, column in enumerate(df.columns):
+            values = chunk[column].dropna()
+            if column in date_columns:
+                length = date_width if len(values) > 0 else 0
+            else:
+                # Falsy values (0, '', False) are skipped like in the cell walk
+                values = values[values.astype(bool)]
+                length = values.astype(str).str.len().max() if len(values) > 0 else 0
+            longest[idx] = max(longest[idx], int(length))
+    return [min(length + 2, max_width) for length in longest]
+
+
+def _text_cells(refs, values):
+    text = np.array([ILLEGAL_XML.sub('', escape(str(value))) for value in values], dtype=object)
+    return _inline_cells(refs, text)
+
+
+def _inline_cells(refs, text):
+    return '<c r="' + refs + '" t="inlineStr"><is><t xml:space="preserve">' + text + '</t></is></c>'
+
+
+def _number_cells(refs, values, style):
+    # Integral floats are written without the trailing .0, as openpyxl does
+    numbers = np.array([repr(value).removesuffix('.0') for value in values.tolist()], dtype=object)
+    return '<c r="' + refs + '"' + style + '><v>' + numbers + '</v></c>'
+
+
+def _column_cells(values, refs, date_style):
+    # XML for one column of a chunk; empty cells become ''
+    cells = np.full(len(values), '', dtype=object)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+
+    present = values.notna().to_numpy().copy()
+    if not present.any():
+        return cells
+
+    kind = values.dtype.kind
+    if kind == 'M':
+        serials = ((values[present] - EXCEL_EPOCH) / pd.Timedelta(days=1)).to_numpy(dtype='float64')
+        cells[present] = _number_cells(refs[present], serials, f' s="{date_style}"')
+    elif kind == 'b':
+        cells[present] = '<c r="' + refs[present] + '" t="b"><v>' + np.where(values[present].to_numpy(), '1', '0').astype(object) + '</v></c>'
+    elif kind in 'iuf':
+        numbers = values[present].to_numpy()
+        finite = np.isfinite(numbers) if kind == 'f' else np.ones(len(numbers), dtype=bool)
+        present[present] = finite
+        cells[present] = _number_cells(refs[present], numbers[finite], '')
+    elif pd.api.types.infer_dtype(values, skipna=True) == 'string':
+        text = (
+            values[present].astype(str)
+            .str.replace('&', '&amp;', regex=False)
+            .str.replace('<', '&lt;', regex=False)
+            .str.replace('>', '&gt;', regex=False)
+            .str.replace(ILLEGAL_XML, '', regex=True)
+        )
+        cells[present] = _inline_cells(refs[present], text.to_numpy(dtype=object))
+    else:
+        for row in np.flatnonzero(present):
+            value = values.iat[row]
+            if isinstance(value, (bool, np.bool_)):
+                cells[row] = f'<c r="{refs[row]}" t="b"><v>{int(value)}</v></c>'
+            elif isinstance(value, (int, np.integer)):
+                cells[row] = f'<c r="{refs[row]}"><v>{int(value)}</v></c>'
+            elif isinstance(value, (float, np.floating)):
+                # numpy 2 scalars repr as np.float64(...); go through a Python float
+                if np.isfinite(value):
+                    cells[row] = f'<c r="{refs[row]}"><v>{repr(float(value)).removesuffix(".0")}</v></c>'
+            elif isinstance(value, pd.Timestamp):
+                serial = float((value - EXCEL_EPOCH) / pd.Timedelta(days=1))
+                cells[row] = f'<c r="{refs[row]}" s="{date_style}"><v>{serial!r}</v></c>'
+            else:
+                cells[row] = _text_cells(refs[row:row + 1], [value])[0]
+    return cells
+
+
+def frame_rows_xml(df, first_row, date_style, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield <row> elements for df, chunk_rows rows at a time, as UTF-8 bytes.
+
+    Strings are written inline (no shared-string table to hold in memory),
+    datetimes as serial numbers with the cell style date_style.
+    """
+    letters = [get_column_letter(idx) for idx in range(1, len(df.columns) + 1)]
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        row_numbers = np.arange(first_row + start, first_row + start + len(chunk)).astype(str).astype(object)
+
+        columns = [
+            _column_cells(chunk[column], letter + row_numbers, date_style)
+            for column, letter in zip(df.columns, letters)
+        ]
+        rows = [
+            f'<row r="{row_number}">{"".join(cells)}</row>'
+            for row_number, cells in zip(row_numbers, zip(*columns))
+        ]
+        yield ''.join(rows).encode('utf-8')
+
+
+def _copy_raw(source, target, info):
+    # Copy a zip entry's compressed bytes as they are, without inflating and
+    # deflating them again; sizes and CRC go in the local header
+    source.fp.seek(info.header_offset)
+    header = source.fp.read(zipfile.sizeFileHeader)
+    name_length, extra_length = struct.unpack('<HH', header[26:30])
+    source.fp.seek(name_length + extra_length, os.SEEK_CUR)
+
+    entry = copy.copy(info)
+    entry.flag_bits &= ~0x08
+    entry.header_offset = target.fp.tell()
+    target.fp.write(entry.FileHeader())
+    remaining = info.compress_size
+    while remaining:
+        block = source.fp.read(min(remaining, 1024 ** 2))
+        if not block:
+            raise zipfile.BadZipFile(f"Truncated entry {info.filename}")
+        target.fp.write(block)
+        remaining -= len(block)
+    target.filelist.append(entry)
+    target.NameToInfo[entry.filename] = entry
+    target.start_dir = target.fp.tell()
+
+
+def _splice_part(xml, target, part, rows, dimension, first_row):
+    xml = re.sub(r'<dimension ref="[^"]*"\s*/>', f'<dimension ref="{dimension}"/>', xml, count=1)
+    if '</sheetData>' in xml:
+        head, tail = xml.split('</sheetData>', 1)
+        tail = '</sheetData>' + tail
+    else:
+        # openpyxl writes an empty sheet as <sheetData/>
+        head, tail = xml.split('<sheetData/>', 1)
+        head, tail = head + '<sheetData>', '</sheetData>' + tail
+    if first_row is not None:
+        placeholder = head.find(f'<row r="{first_row}"')
+        if placeholder >= 0:
+            head = head[:placeholder]
+
+    with target.open(part, 'w', force_zip64=True) as dst:
+        dst.write(head.encode('utf-8'))
+        for block in rows:
+            dst.write(block)
+        dst.write(tail.encode('utf-8'))
+
+
+def splice_sheet_rows(xlsx_path, sheets):
+    """Append streamed <row> elements to sheets of a saved workbook.
+
+    sheets maps a sheet's part name (worksheet.path after saving) to
+    (rows, dimension, first_row). All sheets are spliced in one rewrite of
+    the zip: their rows are inserted before </sheetData> one chunk at a
+    time, and every other entry is copied still compressed. Saved rows
+    from first_row on are placeholders and are dropped.
+    """
+    parts = {path.lstrip('/'): splice for path, splice in sheets.items()}
+    directory = os.path.dirname(os.path.abspath(xlsx_path))
+    fd, tmp_path = tempfile.mkstemp(suffix='.xlsx', dir=directory)
+    os.close(fd)
+
+    try:
+        with zipfile.ZipFile(xlsx_path) as source, \
+                zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as target:
+            for info in source.infolist():
+                if info.filename in parts:
+                    xml = source.read(info).decode('utf-8')
+                    _splice_part(xml, target, info.filename, *parts[info.filename])
+                else:
+                    _copy_raw(source, target, info)
+        # mkstemp creates the file as 0600; keep the saved workbook's permissions
+        shutil.copymode(xlsx_path, tmp_path)
+        os.replace(tmp_path, xlsx_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+_CENTER = dict(horizontal='center', vertical='center')
+_CENTER_WRAP = dict(horizontal='center', vertical='center', wrap_text=True)
+_CENTER_NO_WRAP = dict(horizontal='center', vertical='center', wrap_text=False)
+_BORDER = 'D3D3D3'
+
+# Every style the dashboard tables use, registered once per workbook (named
+# styles with openpyxl, formats with xlsxwriter); cells then only point at
+# one of these
+TABLE_STYLES = {
+    'Table Header': dict(fill='667eea', font=dict(bold=True, color='FFFFFF', size=11),
+                         alignment=_CENTER_WRAP, border=_BORDER),
+    'Table Cell': dict(alignment=_CENTER, border=_BORDER),
+    'Table Cell Striped': dict(fill='f8f9fa', alignment=_CENTER, border=_BORDER),
+    'Table Total Column': dict(fill='e9ecef', font=dict(bold=True), alignment=_CENTER, border=_BORDER),
+    'Table Percent': dict(fill='FFFFFF', font=dict(color='0066cc', bold=True, size=11),
+                          alignment=_CENTER_NO_WRAP, border=_BORDER, number_format='0.0%'),
+    'Table Percent Striped': dict(fill='f8f9fa', font=dict(color='0066cc', bold=True, size=11),
+                                  alignment=_CENTER_NO_WRAP, border=_BORDER, number_format='0.0%'),
+    'Table Total Row': dict(fill='ffd700', font=dict(bold=True, size=11), alignment=_CENTER, border=_BORDER),
+    'Table Total Row Percent': dict(fill='ffd700', font=dict(bold=True, size=11),
+                                    alignment=_CENTER_NO_WRAP, border=_BORDER, number_format='0.0%'),
+    'CarMax Header': dict(fill='f5576c', font=dict(bold=True, color='FFFFFF', size=11),
+                          alignment=_CENTER, border=_BORDER),
+    'CarMax Count': dict(font=dict(bold=True, color='f5576c'), alignment=_CENTER, border=_BORDER),
+    'CarMax Count Striped': dict(fill='f8f9fa', font=dict(bold=True, color='f5576c'),
+                                 alignment=_CENTER, border=_BORDER),
+    'CarMax Total Row': dict(fill='ffa502', font=dict(bold=True, color='FFFFFF'),
+                             alignment=_CENTER, border=_BORDER),
+    'List Header': dict(fill='667eea', font=dict(bold=True, color='FFFFFF', size=11), alignment=_CENTER),
+    'List Cell': dict(border=_BORDER),
+    'List Cell Striped': dict(fill='f8f9fa', border=_BORDER),
+}
+
+
+def register_table_styles(book, styles=TABLE_STYLES):
+    """Add the table styles to a shipment_xlsx_backends workbook."""
+    for name, attributes in styles.items():
+        book.add_style(name, **attributes)
+
+
+class TableSpec:
+    """Declarative layout of a table written by write_table.
+
+    Body cells use body_styles, a (plain, striped) pair of named styles, with
+    striping on even sheet rows. total_column and percent_columns name the
+    columns that get the total-column and percent styles instead, and
+    column_styles overrides the pair for any other column. When
+    blank_non_positive is set, zero and missing numbers outside the percent
+    columns are written as empty cells.
+    """
+
+    __slots__ = (
+        'header_style',
+        'header_height',
+        'body_styles',
+        'total_column',
+        'percent_columns',
+        'column_styles',
+        'total_row_style',
+        'blank_non_positive',
+    )
+
+    def __init__(self, header_style='Table Header', header_height=30,
+                 body_styles=('Table Cell', 'Table Cell Striped'), total_column=None,
+                 percent_columns=(), column_styles=None, total_row_style='Table Total Row',
+                 blank_non_positive=True):
+        self.header_style = header_style
+        self.header_height = header_height
+        self.body_styles = body_styles
+        self.total_column = total_column
+        self.percent_columns = percent_columns
+        self.column_styles = column_styles or {}
+        self.total_row_style = total_row_style
+        self.blank_non_positive = blank_non_positive
+
+    def styles_for(self, name):
+        if name in self.percent_columns:
+            return ('Table Percent', 'Table Percent Striped')
+        if name == self.total_column:
+            return ('Table Total Column', 'Table Total Column')
+        return self.column_styles.get(name, self.body_styles)
+
+    def total_style_for(self, name):
+        if name in self.percent_columns:
+            return 'Table Total Row Percent'
+        return self.total_row_style
+
+
+def _blank_non_positive(values):
+    # Numbers that are not > 0 (including NaN) become '', text is kept
+    if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+        return values.astype(object).where(values > 0, '').tolist()
+    return [
+        '' if isinstance(value, (int, float, np.integer, np.floating)) and not value > 0 else value
+        for value in values.tolist()
+    ]
+
+
+def _blank_missing(values):
+    return values.astype(object).where(values.notna(), '').tolist()
+
+
+def write_table(sheet, df, row, column, spec, total_row=None):
+    """Write df (header, body, optional total row) at (row, column) of a sheet.
+
+    sheet is a shipment_xlsx_backends sheet; rows and columns are 1-based.
+
+    total_row is a list of values for the row below the body, or None.
+    Returns the row after the last one written.
+    """
+    for offset, header in enumerate(df.columns):
+        sheet.write(row, column + offset, header, spec.header_style)
+    if spec.header_height is not None:
+        sheet.set_row_height(row, spec.header_height)
+    row += 1
+
+    body = [
+        _blank_non_positive(df[name])
+        if spec.blank_non_positive and name not in spec.percent_columns else _blank_missing(df[name])
+        for name in df.columns
+    ]
+    styles = [spec.styles_for(name) for name in df.columns]
+
+    for values in zip(*body):
+        stripe = 1 if row % 2 == 0 else 0
+        for offset, value in enumerate(values):
+            sheet.write(row, column + offset, value, styles[offset][stripe])
+        row += 1
+
+    if total_row is not None:
+        for offset, (name, value) in enumerate(zip(df.columns, total_row)):
+            sheet.write(row, column + offset, value, spec.total_style_for(name))
+        row += 1
+
+    return row
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+# The shipment_* modules are flat scripts in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from shipment_synthetic import ExportSpec, generate_exports  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def exports(tmp_path_factory):
+    """(main export, Update-2 export) of a small synthetic export pair."""
+    spec = ExportSpec(rows=3000, seed=7, days=12, customers=40, tag_combinations=6)
+    return generate_exports(spec, tmp_path_factory.mktemp('exports'))
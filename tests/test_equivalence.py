@@ -0,0 +1,130 @@
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shipment_incremental import update_incremental
+from shipment_ingest import load_eod, read_carmax
+from shipment_metrics import compute_dashboard
+from shipment_streaming import stream_dashboard
+
+
+def baseline_metrics(csv_file):
+    """The numbers of the original single-script Excel dashboard, computed the way it did."""
+    df = pd.read_csv(csv_file)
+    df['Created Date'] = pd.to_datetime(df['Created Date'])
+    initial_count = len(df)
+    df = df[~df['Tags'].str.contains('Quote', case=False, na=False)]
+    today = df['Created Date'].max().date()
+    df_today = df[df['Created Date'].dt.date == today]
+
+    def pivot(frame):
+        table = pd.pivot_table(frame, values='VIN #', index='Customer Business Name', columns='Tags',
+                               aggfunc='count', fill_value=0)
+        table['Total'] = table.sum(axis=1)
+        return table.sort_values('Total', ascending=False)
+
+    return {
+        'initial_count': initial_count,
+        'filtered_count': len(df),
+        'today': today,
+        'total_today': len(df_today),
+        'weighted_avg_distance': pd.to_numeric(df['Distance'], errors='coerce').mean(),
+        'pivot_table': pivot(df),
+        'pivot_table_today': pivot(df_today),
+        'tag_distribution': df.groupby('Tags').size().sort_values(ascending=False),
+        'top_vehicles': df['Vehicle Info'].value_counts().head(10),
+    }
+
+
+def baseline_carmax(update2_file):
+    df_update2 = pd.read_csv(update2_file)
+    rows = df_update2[
+        df_update2['Customer Business Name'].str.contains('CarMax', case=False, na=False)
+        & df_update2['Vehicle Status'].str.contains('New', case=False, na=False)
+        & (df_update2['Tags'].isna() | (df_update2['Tags'].str.strip() == ''))
+    ].copy()
+    rows['Created Date'] = pd.to_datetime(rows['Created Date'])
+    by_date = rows.groupby(rows['Created Date'].dt.date)['VIN #'].nunique().reset_index()
+    by_date.columns = ['Created Date', 'Unique VINs']
+    return by_date.sort_values('Created Date'), rows['VIN #'].nunique()
+
+
+def default_mode(csv_file, tmp_path):
+    df, initial_count, _ = load_eod(csv_file)
+    return compute_dashboard(df, initial_count)
+
+
+def streaming_mode(csv_file, tmp_path):
+    return stream_dashboard(csv_file, chunksize=700)[0]
+
+
+def incremental_mode(csv_file, tmp_path):
+    # Fold the export in two runs: a prefix first, then the appended rows
+    grown = tmp_path / 'grown.csv'
+    state_file = tmp_path / 'state.pkl'
+    with open(csv_file, 'rb') as f:
+        data = f.read()
+    grown.write_bytes(data[:len(data) // 2])
+    assert update_incremental(str(grown), str(state_file), chunksize=700)[2]
+    with open(grown, 'ab') as f:
+        f.write(data[len(data) // 2:])
+    metrics, _, rebuilt = update_incremental(str(grown), str(state_file), chunksize=700)
+    assert not rebuilt
+    return metrics
+
+
+@pytest.mark.parametrize('mode', [default_mode, streaming_mode, incremental_mode],
+                         ids=['default', 'streaming', 'incremental'])
+def test_matches_baseline(exports, tmp_path, mode):
+    csv_file = exports[0]
+    expected = baseline_metrics(csv_file)
+    metrics = mode(csv_file, tmp_path)
+
+    assert metrics.initial_count == expected['initial_count']
+    assert metrics.filtered_count == expected['filtered_count']
+    assert metrics.today == expected['today']
+    assert metrics.total_today == expected['total_today']
+    assert metrics.weighted_avg_distance == pytest.approx(expected['weighted_avg_distance'])
+    for name in ('pivot_table', 'pivot_table_today'):
+        pd.testing.assert_frame_equal(getattr(metrics, name), expected[name], check_column_type=False,
+                                      check_index_type=False)
+    assert metrics.tag_totals.to_dict() == expected['tag_distribution'].to_dict()
+    assert list(metrics.top_vehicles.index) == list(expected['top_vehicles'].index)
+    assert list(metrics.top_vehicles) == list(expected['top_vehicles'])
+    assert metrics.top_vehicles_error == 0
+
+
+# The original script let pandas guess each date's format
+@pytest.mark.filterwarnings('ignore:Could not infer format')
+def test_carmax_matches_baseline(exports):
+    expected_by_date, expected_total = baseline_carmax(exports[1])
+    by_date, total = read_carmax(exports[1])
+
+    assert total == expected_total
+    assert list(by_date['Created Date']) == list(expected_by_date['Created Date'])
+    assert np.array_equal(by_date['Unique VINs'].to_numpy(), expected_by_date['Unique VINs'].to_numpy())
+
+
+def test_incremental_keeps_quoted_newlines_whole(exports, tmp_path):
+    # Cut the export right after a newline inside a quoted field; the next
+    # run must fold that record whole rather than parse half of it
+    df = pd.read_csv(exports[0], dtype=str, keep_default_na=False)
+    df.loc[::5, 'Vehicle Info'] += '\n"trim" line'
+    full = tmp_path / 'full.csv'
+    df.to_csv(full, index=False)
+    data = full.read_bytes()
+    cut = data.index(b'\n""trim', len(data) // 2) + 1
+
+    grown = tmp_path / 'grown.csv'
+    state_file = tmp_path / 'state.pkl'
+    grown.write_bytes(data[:cut])
+    update_incremental(str(grown), str(state_file), chunksize=700)
+    shutil.copyfile(full, grown)
+    metrics, _, rebuilt = update_incremental(str(grown), str(state_file), chunksize=700)
+
+    assert not rebuilt
+    expected = stream_dashboard(str(full), chunksize=700)[0]
+    assert metrics.initial_count == expected.initial_count == len(df)
+    pd.testing.assert_frame_equal(metrics.pivot_table, expected.pivot_table)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from shipment_heavy_hitters import SpaceSaving
+
+
+def _stream(seed=3, rows=20_000, distinct=500):
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, distinct + 1) ** 1.2
+    values = rng.choice(distinct, size=rows, p=weights / weights.sum())
+    return pd.Series([f"vehicle {value}" for value in values])
+
+
+def _check_bounds(summary, values):
+    true = values.value_counts()
+    counted = summary.counts.index
+    assert (summary.counts - summary.errors <= true.reindex(counted)).all()
+    assert (true.reindex(counted) <= summary.counts).all()
+    assert (true.drop(counted) <= summary.floor).all()
+    assert summary.total == len(values)
+
+
+def test_exact_below_capacity():
+    values = _stream(distinct=50)
+    summary = SpaceSaving(capacity=100)
+    for start in range(0, len(values), 1000):
+        summary.update(values.iloc[start:start + 1000])
+
+    assert summary.exact
+    assert summary.max_error(10) == 0
+    expected = values.value_counts().head(10)
+    assert summary.top(10).to_dict() == expected.to_dict()
+
+
+def test_error_bounds_when_evicting():
+    values = _stream()
+    summary = SpaceSaving(capacity=40)
+    for start in range(0, len(values), 500):
+        summary.update(values.iloc[start:start + 500])
+
+    assert not summary.exact
+    assert len(summary.counts) <= 40
+    _check_bounds(summary, values)
+    # The heaviest values of a skewed stream are still found
+    assert list(summary.top(3).index) == list(values.value_counts().head(3).index)
+
+
+def test_merge_keeps_bounds():
+    values = _stream(seed=5)
+    halves = []
+    for part in (values.iloc[:10_000], values.iloc[10_000:]):
+        summary = SpaceSaving(capacity=40)
+        for start in range(0, len(part), 500):
+            summary.update(part.iloc[start:start + 500])
+        halves.append(summary)
+
+    merged = halves[0].merge(halves[1])
+    _check_bounds(merged, values)
+    assert merged.max_error(10) <= merged.floor
+
+
+def test_merge_into_empty_summary_keeps_floor():
+    # 'x' is evicted from the full summary; after merging it into an empty
+    # one, the floor must still cover x's three occurrences
+    values = pd.Series(['a'] * 10 + ['b'] * 10 + ['c'] * 10 + ['x'] * 3)
+    full = SpaceSaving(capacity=3)
+    for start in range(0, len(values), 11):
+        full.update(values.iloc[start:start + 11])
+    assert 'x' not in full.counts.index
+
+    merged = SpaceSaving(capacity=3).merge(full)
+    _check_bounds(merged, values)
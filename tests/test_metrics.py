@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from shipment_ingest import load_eod
+from shipment_metrics import count_cube
+
+
+@pytest.fixture(scope='module')
+def frame(exports):
+    return load_eod(exports[0])[0]
+
+
+def test_pivot_matches_pivot_table():
+    df = pd.DataFrame({
+        'Created Date': pd.to_datetime(['2025-11-01', '2025-11-01', '2025-11-02', '2025-11-02', '2025-11-02', None]),
+        'Customer Business Name': ['B', 'A', 'A', None, 'B', 'A'],
+        'Tags': ['x', 'y', 'x', 'x', None, 'y'],
+        'VIN #': ['v1', None, 'v3', 'v4', 'v5', 'v6'],
+        'Distance': [10.0, np.nan, 30.0, 40.0, 50.0, 60.0],
+    })
+    expected = pd.pivot_table(df, values='VIN #', index='Customer Business Name', columns='Tags',
+                              aggfunc='count', fill_value=0)
+    expected['Total'] = expected.sum(axis=1)
+    expected = expected.sort_values('Total', ascending=False)
+
+    cube = count_cube(df)
+    pd.testing.assert_frame_equal(cube.pivot(), expected, check_column_type=False, check_index_type=False)
+    # Rows without a customer, tag or date still count towards the totals
+    assert cube.total() == 6
+    assert cube.total(pd.Timestamp('2025-11-02')) == 3
+    assert cube.pivot(pd.Timestamp('2025-11-02')).loc['A', 'x'] == 1
+
+
+def test_merge_equals_whole(frame):
+    # Sorted, so the chunks bring customers, tags and days the others lack
+    frame = frame.sort_values(['Customer Business Name', 'Created Date'], kind='stable')
+    whole = count_cube(frame)
+    parts = [count_cube(frame.iloc[start:start + 700]) for start in range(0, len(frame), 700)]
+    merged = parts[0]
+    for part in parts[1:]:
+        merged = merged.merge(part)
+
+    assert merged.total() == whole.total() == len(frame)
+    pd.testing.assert_frame_equal(merged.pivot(), whole.pivot())
+    today = frame['Created Date'].max().normalize()
+    pd.testing.assert_frame_equal(merged.pivot(today), whole.pivot(today))
+    pd.testing.assert_series_equal(merged.tag_totals(), whole.tag_totals())
+    assert merged.distance_sum.sum() == pytest.approx(whole.distance_sum.sum())
+    assert merged.distance_count.sum() == whole.distance_count.sum()
+
+
+def test_merge_is_order_independent(frame):
+    frame = frame.sort_values('Customer Business Name', kind='stable')
+    first, second = count_cube(frame.iloc[:1000]), count_cube(frame.iloc[1000:])
+    pd.testing.assert_frame_equal(first.merge(second).pivot(), second.merge(first).pivot())
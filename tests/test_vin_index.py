@@ -0,0 +1,48 @@
+import numpy as np
+
+from shipment_dates import MISSING_DAY, day_number
+from shipment_vin_index import VinIndex
+
+
+def _days(*dates):
+    return np.array([day_number(value) for value in dates], dtype=np.int32)
+
+
+def test_first_seen_days(tmp_path):
+    index = VinIndex(tmp_path / 'index')
+    new = index.update(['1HGCM82633A004352', 'JH4KA8260MC000000', '1HGCM82633A004352'],
+                       _days('2025-11-03', '2025-11-02', '2025-11-05'))
+    assert new == 2
+    assert len(index) == 2
+
+    # An older export indexed later moves first seen back; case and spaces are ignored
+    assert index.update([' 1hgcm82633a004352 '], _days('2025-11-01')) == 0
+
+    days = index.first_seen_days(['1HGCM82633A004352', 'JH4KA8260MC000000', 'UNKNOWNVIN0000000'])
+    assert days.tolist() == [day_number('2025-11-01'), day_number('2025-11-02'), MISSING_DAY]
+
+
+def test_reopened_index_is_unchanged_by_reindexing(tmp_path):
+    vins = ['A1', 'B2', 'C3', None, '']
+    days = _days('2025-11-01', '2025-11-02', '2025-11-03', '2025-11-03', '2025-11-03')
+    index = VinIndex(tmp_path / 'index')
+    assert index.update(vins, days) == 3
+
+    reopened = VinIndex(tmp_path / 'index')
+    assert len(reopened) == 3
+    assert reopened.update(vins, days) == 0
+    assert reopened.first_seen_days(['C3', 'A1']).tolist() == _days('2025-11-03', '2025-11-01').tolist()
+
+
+def test_order_of_exports_does_not_matter(tmp_path):
+    first = (['A1', 'B2'], _days('2025-11-04', '2025-11-05'))
+    second = (['A1', 'C3'], _days('2025-11-02', '2025-11-06'))
+    forward, backward = VinIndex(tmp_path / 'forward'), VinIndex(tmp_path / 'backward')
+    for vins, days in (first, second):
+        forward.update(vins, days)
+    for vins, days in (second, first):
+        backward.update(vins, days)
+
+    query = ['A1', 'B2', 'C3']
+    assert forward.first_seen_days(query).tolist() == backward.first_seen_days(query).tolist()
+    assert np.array_equal(forward.last_seen, backward.last_seen)
@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+import pytest
+
+from shipment_ingest import load_eod, read_carmax
+from shipment_metrics import compute_dashboard
+from shipment_warehouse import Warehouse
+
+TABLES = ('customers', 'tags', 'daily_totals', 'daily_counts', 'daily_tags', 'carmax_daily')
+
+
+@pytest.fixture
+def metrics(exports):
+    df, initial_count, _ = load_eod(exports[0])
+    metrics = compute_dashboard(df, initial_count)
+    metrics.carmax_vins_by_date, metrics.carmax_unique_vins_total = read_carmax(exports[1])
+    return metrics
+
+
+def _dump(warehouse):
+    return {table: sorted(warehouse.db.execute(f'SELECT * FROM {table}').fetchall()) for table in TABLES}
+
+
+def test_recording_twice_changes_nothing(tmp_path, metrics):
+    warehouse = Warehouse(str(tmp_path / 'warehouse.sqlite'))
+    try:
+        days = warehouse.record(metrics, 'export.csv')
+        first = _dump(warehouse)
+        assert warehouse.record(metrics, 'export.csv') == days
+        assert _dump(warehouse) == first
+    finally:
+        warehouse.close()
+
+
+def test_recorded_days_add_up(tmp_path, metrics):
+    warehouse = Warehouse(str(tmp_path / 'warehouse.sqlite'))
+    try:
+        warehouse.record(metrics)
+        end = warehouse.last_day()
+        assert end == metrics.today
+        trend = warehouse.trend(end - timedelta(days=365), end)
+        assert trend['Shipments'].sum() == metrics.filtered_count
+        by_customer = warehouse.trend(end - timedelta(days=365), end, customer='')
+        assert by_customer['Shipments'].sum() == metrics.filtered_count
+        top = warehouse.top_customers(end - timedelta(days=365), end, limit=1)
+        assert top['Customer'].iloc[0] == metrics.pivot_table.index[0]
+    finally:
+        warehouse.close()
+
+
+def test_older_export_does_not_replace_newer_days(tmp_path, metrics):
+    warehouse = Warehouse(str(tmp_path / 'warehouse.sqlite'))
+    try:
+        warehouse.record(metrics)
+        before = _dump(warehouse)
+        today = metrics.today
+        metrics.today = today - timedelta(days=1)
+        try:
+            assert warehouse.record(metrics) == 0
+        finally:
+            metrics.today = today
+        assert _dump(warehouse)['daily_counts'] == before['daily_counts']
+    finally:
+        warehouse.close()